@@ -1,21 +1,44 @@
 import os
 import json
+import time
+import argparse
 import datetime
-import requests
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
-from googleapiclient.discovery import build
 from dotenv import load_dotenv
 
+import http_client
+from backtest_store import BacktestStore, LEGACY_JSON_FILE, convert_json
+from youtube_quota import (YouTubeData, QuotaExceededError, get_ledger,
+                           plan_run, print_plan, video_published_at)
+
 load_dotenv()
 
 # YouTube API key from .env
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+_youtube = None
+
+def get_youtube():
+    """The YouTube API client, built on first use."""
+    global _youtube
+    if _youtube is None:
+        from googleapiclient.discovery import build
+        _youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+    return _youtube
 
 # Path to niche definitions file
 NICHE_FILE = "niches.json"
 BACKTEST_DIR = "backtest_data"
 os.makedirs(BACKTEST_DIR, exist_ok=True)
+# Append-only progress log used to resume an interrupted harvest.
+CHECKPOINT_FILE = os.path.join(BACKTEST_DIR, "harvest_checkpoint.jsonl")
+TRANSCRIPT_WORKERS = int(os.getenv("TRANSCRIPT_WORKERS", "8"))
+# Per-channel high-water marks (last publish time and video ids) for incremental runs.
+STATE_FILE = os.path.join(BACKTEST_DIR, "harvest_state.json")
+MARK_VIDEO_IDS = 20
+MAX_NEW_PER_CHANNEL = 50
 
 # Text-generation-webui endpoint (update if necessary)
 TGW_API_URL = os.getenv("TGW_API_URL", "http://localhost:7860/api/v1/completions")  # example endpoint
@@ -32,66 +55,230 @@ def load_niches():
 
 def fetch_channel_videos(channel_id, max_results=5):
     """
-    Fetches the top 'max_results' recent videos from a channel.
+    Fetches the 'max_results' most viewed of a channel's recent uploads.
+    Reads the uploads playlist (~2 quota units) rather than search (100).
     """
     try:
-        request = youtube.search().list(
-            part="snippet",
-            channelId=channel_id,
-            order="viewCount",   # ordering by view count; adjust as needed
-            maxResults=max_results,
-            type="video"
-        )
-        response = request.execute()
-        videos = response.get("items", [])
-        return videos
+        return YouTubeData(get_youtube()).channel_top_videos(channel_id, max_results)
+    except QuotaExceededError as e:
+        print(f"Skipping channel {channel_id}: {e}")
+        return []
     except Exception as e:
         print(f"Error fetching videos for channel {channel_id}: {e}")
         return []
 
-def fetch_video_transcript(video_id):
-    """Attempts to fetch transcript for a given video ID."""
+def load_state():
+    """Loads the per-channel high-water marks."""
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+def save_state(state):
+    tmp_path = STATE_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_FILE)
+
+def channel_staleness(state, channel_id):
+    """Seconds since the newest upload harvested from a channel (inf if never harvested)."""
+    mark = state.get(channel_id)
+    if not mark:
+        return float("inf")
+    newest = datetime.datetime.fromisoformat(mark["last_published_at"].replace("Z", "+00:00"))
+    if newest.tzinfo is None:
+        newest = newest.replace(tzinfo=datetime.timezone.utc)
+    return (datetime.datetime.now(datetime.timezone.utc) - newest).total_seconds()
+
+def high_water_mark(uploads, previous=None):
+    """Advances a channel's mark past the given newest-first uploads."""
+    if not uploads:
+        return previous
+    ids = [item["contentDetails"]["videoId"] for item in uploads]
+    newest = max(video_published_at(item) for item in uploads)
+    if previous:
+        ids += previous["last_video_ids"]
+        newest = max(newest, previous["last_published_at"])
+    return {"last_published_at": newest, "last_video_ids": ids[:MARK_VIDEO_IDS]}
+
+def fetch_new_channel_videos(channel_id, mark=None, max_results=5):
+    """
+    Returns (videos to harvest, updated high-water mark) for a channel.
+    Both modes pick the top 'max_results' by views: without a mark among the
+    recent uploads (the full fetch), with one among the uploads newer than
+    the mark, usually for two quota units. The mark always advances past
+    every upload listed, harvested or not.
+    """
+    try:
+        data = YouTubeData(get_youtube())
+        if mark is None:
+            videos = data.channel_top_videos(channel_id, max_results)
+            uploads = data.recent_uploads(channel_id)  # served from cache
+        else:
+            uploads = data.uploads_since(channel_id, mark["last_published_at"],
+                                         mark["last_video_ids"], MAX_NEW_PER_CHANNEL)
+            videos = data.top_videos(uploads, max_results)
+        return videos, high_water_mark(uploads, mark)
+    except QuotaExceededError as e:
+        print(f"Skipping channel {channel_id}: {e}")
+    except Exception as e:
+        print(f"Error fetching videos for channel {channel_id}: {e}")
+    return [], mark
+
+def fetch_transcript_with_status(video_id):
+    """
+    Fetches the transcript for a video and reports how it went.
+    Returns (text, status) where status is "ok", "disabled", "not_found"
+    or "error:<ExceptionName>".
+    """
     try:
         transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-        transcript_text = " ".join([t["text"] for t in transcript_list])
-        return transcript_text
-    except (TranscriptsDisabled, NoTranscriptFound):
-        return ""
+        return " ".join([t["text"] for t in transcript_list]), "ok"
+    except TranscriptsDisabled:
+        return "", "disabled"
+    except NoTranscriptFound:
+        return "", "not_found"
     except Exception as e:
         print(f"Error fetching transcript for video {video_id}: {e}")
-        return ""
+        return "", f"error:{type(e).__name__}"
+
+def fetch_video_transcript(video_id):
+    """Attempts to fetch transcript for a given video ID."""
+    return fetch_transcript_with_status(video_id)[0]
+
+def load_checkpoint(store):
+    """
+    Replays the progress log of an interrupted harvest.
+    Returns the (niche, channel_id) pairs that were finished. Harvested videos
+    themselves live in the store, so they need no replay.
+    """
+    done_channels = set()
+    if not os.path.exists(CHECKPOINT_FILE):
+        return done_channels
+    with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from a crash
+            if entry["type"] == "channel":
+                done_channels.add((entry["niche"], entry["channel_id"]))
+            elif entry["type"] == "video" and entry["record"]["video_id"] not in store:
+                # Logs written before the JSONL store carried the records themselves.
+                store.append(entry["niche"], entry["record"])
+    return done_channels
 
-def harvest_data():
+def harvest_data(workers=TRANSCRIPT_WORKERS, incremental=False):
     """
     Harvests backtest data for all niches and channels.
-    Saves collected data in a JSON file for later analysis.
+    Transcripts are fetched in a bounded worker pool and every finished video
+    is appended straight to the JSONL store, so memory stays flat however big
+    the dataset grows. Finished channels go to a checkpoint log, so an
+    interrupted run resumes where it stopped; a video_id already in the store
+    is never fetched again. Videos whose transcript fetch failed with a
+    transient error are not recorded, and neither is their channel, so the
+    next run retries them.
+    With incremental=True only videos newer than each channel's high-water
+    mark are listed.
+    Only the channels that fit in today's quota are harvested, stalest first
+    (never-harvested channels lead); the rest wait for the next run.
     """
     niches = load_niches()
-    all_data = {}
-    for niche, channels in niches.items():
-        all_data[niche] = []
-        for channel in channels:
-            channel_name = channel.get("channel_name", "Unknown Channel")
-            channel_id = channel.get("channel_id", "")
-            print(f"Fetching videos for '{channel_name}' ({channel_id}) in niche '{niche}'...")
-            videos = fetch_channel_videos(channel_id)
-            for video in videos:
-                video_id = video["id"]["videoId"]
-                snippet = video["snippet"]
-                video_data = {
-                    "video_id": video_id,
-                    "title": snippet.get("title", ""),
-                    "description": snippet.get("description", ""),
-                    "published_at": snippet.get("publishedAt", ""),
-                    "channel_name": channel_name,
-                    "transcript": fetch_video_transcript(video_id)
-                }
-                all_data[niche].append(video_data)
-    
-    output_file = os.path.join(BACKTEST_DIR, "backtest_data.json")
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(all_data, f, indent=4)
-    print(f"Backtest data saved to {output_file}")
+    store = BacktestStore()
+    if not len(store) and os.path.exists(LEGACY_JSON_FILE):
+        convert_json(LEGACY_JSON_FILE, store)
+    done_channels = load_checkpoint(store)
+    if done_channels:
+        print(f"Resuming harvest: {len(done_channels)} channels already done.")
+    harvested = store.video_ids()
+    state = load_state()
+    new_videos = 0
+
+    todo = [(niche, channel) for niche, channels in niches.items() for channel in channels
+            if (niche, channel.get("channel_id", "")) not in done_channels]
+    plan = plan_run(channels=todo,
+                    channel_priority=lambda item: channel_staleness(state, item[1].get("channel_id", "")))
+    print_plan(plan)
+    for niche, channel in plan["skipped_channels"]:
+        print(f"  ⏭️ Over budget, left for the next run: '{channel.get('channel_name', 'Unknown Channel')}' "
+              f"({channel.get('channel_id', '')}) in niche '{niche}'")
+
+    statuses = Counter()
+    remaining = {}
+    failed_channels = set()
+    previous_marks = {}
+    lock = threading.Lock()
+    started = time.monotonic()
+
+    with open(CHECKPOINT_FILE, "a", encoding="utf-8") as log:
+        def checkpoint(entry):
+            log.write(json.dumps(entry) + "\n")
+            log.flush()
+
+        def on_done(future, niche, channel_id, video_data):
+            transcript, status = future.result()
+            if not status.startswith("error:"):
+                # "disabled" and "not_found" are permanent; errors get retried.
+                video_data["transcript"] = transcript
+                store.append(niche, video_data)
+            with lock:
+                statuses[status.split(":")[0]] += 1
+                if status.startswith("error:"):
+                    statuses[status] += 1
+                    failed_channels.add((niche, channel_id))
+                remaining[(niche, channel_id)] -= 1
+                if not remaining[(niche, channel_id)] and (niche, channel_id) not in failed_channels:
+                    checkpoint({"type": "channel", "niche": niche, "channel_id": channel_id})
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for niche, channel in plan["channels"]:
+                channel_name = channel.get("channel_name", "Unknown Channel")
+                channel_id = channel.get("channel_id", "")
+                print(f"Fetching videos for '{channel_name}' ({channel_id}) in niche '{niche}'...")
+                previous_marks[channel_id] = state.get(channel_id)
+                mark = previous_marks[channel_id] if incremental else None
+                videos, state[channel_id] = fetch_new_channel_videos(channel_id, mark)
+                if state[channel_id] is None:
+                    del state[channel_id]
+                videos = [v for v in videos if v["id"]["videoId"] not in harvested]
+                new_videos += len(videos)
+                with lock:
+                    remaining[(niche, channel_id)] = len(videos)
+                    if not videos:
+                        checkpoint({"type": "channel", "niche": niche, "channel_id": channel_id})
+                for video in videos:
+                    video_id = video["id"]["videoId"]
+                    harvested.add(video_id)
+                    snippet = video["snippet"]
+                    video_data = {
+                        "video_id": video_id,
+                        "title": snippet.get("title", ""),
+                        "description": snippet.get("description", ""),
+                        "published_at": snippet.get("publishedAt", ""),
+                        "channel_name": channel_name,
+                    }
+                    future = pool.submit(fetch_transcript_with_status, video_id)
+                    future.add_done_callback(
+                        lambda f, n=niche, c=channel_id, d=video_data: on_done(f, n, c, d))
+
+    store.close()
+    os.remove(CHECKPOINT_FILE)
+    for _, channel_id in failed_channels:
+        # Keep the old mark so the failed videos are listed again next run.
+        if previous_marks[channel_id] is None:
+            state.pop(channel_id, None)
+        else:
+            state[channel_id] = previous_marks[channel_id]
+    save_state(state)
+    print(f"Backtest data saved to {store.path} ({len(store)} videos, {new_videos} new this run)")
+
+    elapsed = time.monotonic() - started
+    fetched = sum(n for status, n in statuses.items() if ":" not in status)
+    rate = fetched / elapsed if elapsed else 0.0
+    print(f"Transcripts: {fetched} videos in {elapsed:.1f}s ({rate:.2f} videos/s) with {workers} workers")
+    for status, count in statuses.most_common():
+        print(f"  {status}: {count}")
+    get_ledger().print_stats()
 
 def generate_refined_script_with_tgw(prompt_text):
     """
@@ -107,7 +294,7 @@ def generate_refined_script_with_tgw(prompt_text):
         "stop": ["\n\n"]
     }
     try:
-        response = requests.post(TGW_API_URL, json=payload, timeout=30)
+        response = http_client.post(TGW_API_URL, json=payload, timeout=(5, 30))
         if response.status_code == 200:
             result = response.json()
             # Adjust extraction based on API response structure
@@ -120,7 +307,13 @@ def generate_refined_script_with_tgw(prompt_text):
         return ""
 
 if __name__ == "__main__":
-    harvest_data()
+    parser = argparse.ArgumentParser(description="Harvest backtest data for all channels in niches.json")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only fetch videos newer than each channel's last harvest")
+    parser.add_argument("--workers", type=int, default=TRANSCRIPT_WORKERS,
+                        help="Concurrent transcript fetches")
+    args = parser.parse_args()
+    harvest_data(workers=args.workers, incremental=args.incremental)
 
     # Example: Generate a refined script for backtest analysis using TGW
     sample_prompt = ("Write a compelling, human-like YouTube video script in the Finance niche "
@@ -0,0 +1,196 @@
+"""
+Append-only JSONL storage for backtest data.
+
+Each harvested video is one line in backtest_data/backtest_data.jsonl
+({"niche": ..., "video_id": ..., "title": ..., "transcript": ...}). A compact
+sidecar index maps video_id -> byte offset and niche -> offsets, so readers
+can seek straight to one record or stream a single niche without parsing the
+rest of the file, and writers only ever append.
+
+If the process dies between an append and an index save, the index is caught
+up on next open by scanning only the bytes past the last indexed offset.
+
+Usage:
+    python backtest_store.py convert [backtest_data/backtest_data.json]
+    python backtest_store.py get <video_id>
+    python backtest_store.py stats
+"""
+import os
+import sys
+import json
+import threading
+
+BACKTEST_DIR = "backtest_data"
+DATA_FILE = os.path.join(BACKTEST_DIR, "backtest_data.jsonl")
+INDEX_FILE = os.path.join(BACKTEST_DIR, "backtest_data.idx.json")
+LEGACY_JSON_FILE = os.path.join(BACKTEST_DIR, "backtest_data.json")
+INDEX_SAVE_EVERY = 100   # appends between index writes
+
+
+class BacktestStore:
+    def __init__(self, path=DATA_FILE, index_path=INDEX_FILE):
+        self.path = path
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.index = self._load_index()
+        self._catch_up()
+
+    # ---------- index ----------
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError):
+                print("⚠️ Backtest index unreadable; rebuilding it.")
+        return {"size": 0, "videos": {}, "niches": {}}
+
+    def _index_record(self, record, offset):
+        self.index["videos"][record["video_id"]] = offset
+        self.index["niches"].setdefault(record["niche"], []).append(offset)
+
+    def _catch_up(self):
+        """Index any complete lines written after the last index save."""
+        if not os.path.exists(self.path):
+            return
+        size = os.path.getsize(self.path)
+        if self.index["size"] > size:
+            # Data file was replaced; start over.
+            self.index = {"size": 0, "videos": {}, "niches": {}}
+        if self.index["size"] == size:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self.index["size"])
+            offset = self.index["size"]
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn write; the next append starts after it
+                try:
+                    self._index_record(json.loads(line), offset)
+                except (json.JSONDecodeError, KeyError):
+                    pass
+                offset += len(line)
+            self.index["size"] = offset
+        self.save_index()
+
+    def save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, separators=(",", ":"))
+        os.replace(tmp_path, self.index_path)
+        self._unsaved = 0
+
+    # ---------- writing ----------
+
+    def append(self, niche, record):
+        """Append one video record under `niche`; returns its byte offset."""
+        line = (json.dumps(dict(record, niche=niche), ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            with open(self.path, "ab") as f:
+                if f.tell() != self.index["size"]:
+                    # Drop a torn tail left by a crash so offsets stay valid.
+                    f.truncate(self.index["size"])
+                    f.seek(self.index["size"])
+                offset = f.tell()
+                f.write(line)
+            self._index_record({"niche": niche, "video_id": record["video_id"]}, offset)
+            self.index["size"] = offset + len(line)
+            self._unsaved += 1
+            if self._unsaved >= INDEX_SAVE_EVERY:
+                self.save_index()
+        return offset
+
+    def close(self):
+        with self._lock:
+            if self._unsaved:
+                self.save_index()
+
+    # ---------- reading ----------
+
+    def __contains__(self, video_id):
+        return video_id in self.index["videos"]
+
+    def __len__(self):
+        return len(self.index["videos"])
+
+    def video_ids(self):
+        return set(self.index["videos"])
+
+    def niches(self):
+        return list(self.index["niches"])
+
+    def _read_at(self, f, offset):
+        f.seek(offset)
+        return json.loads(f.readline())
+
+    def get(self, video_id):
+        """Seek to and return a single record, or None."""
+        offset = self.index["videos"].get(video_id)
+        if offset is None:
+            return None
+        with open(self.path, "rb") as f:
+            return self._read_at(f, offset)
+
+    def iter_records(self, niche=None):
+        """
+        Lazily yield records (latest copy of each video), optionally for one
+        niche only. Only one record is held in memory at a time.
+        """
+        if not os.path.exists(self.path):
+            return
+        latest = self.index["videos"]
+        with open(self.path, "rb") as f:
+            if niche is not None:
+                for offset in self.index["niches"].get(niche, []):
+                    record = self._read_at(f, offset)
+                    if latest.get(record["video_id"]) == offset:
+                        yield record
+                return
+            offset = 0
+            for line in f:
+                if offset >= self.index["size"]:
+                    break
+                record = json.loads(line)
+                if latest.get(record["video_id"]) == offset:
+                    yield record
+                offset += len(line)
+
+
+def convert_json(json_path=LEGACY_JSON_FILE, store=None):
+    """One-shot import of the old indented backtest_data.json into the store."""
+    if store is None:
+        store = BacktestStore()
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    added = 0
+    for niche, records in data.items():
+        for record in records:
+            if record.get("video_id") and record["video_id"] not in store:
+                store.append(niche, record)
+                added += 1
+    store.close()
+    print(f"✅ Imported {added} records from {json_path} into {store.path}")
+    return added
+
+
+def main(argv):
+    command = argv[0] if argv else "stats"
+    if command == "convert":
+        convert_json(argv[1] if len(argv) > 1 else LEGACY_JSON_FILE)
+    elif command == "get" and len(argv) > 1:
+        record = BacktestStore().get(argv[1])
+        print(json.dumps(record, indent=2, ensure_ascii=False) if record else f"❌ {argv[1]} not found")
+    elif command == "stats":
+        store = BacktestStore()
+        print(f"📦 {len(store)} videos in {store.path} ({store.index['size'] / 1024:.0f} KiB)")
+        for niche, offsets in store.index["niches"].items():
+            print(f"  {niche}: {len(offsets)}")
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
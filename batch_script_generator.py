@@ -1,34 +1,23 @@
-from local_script_generator import load_local_model, generate_script
-from combine_sources import combine_sources
 import os
 
+from local_script_generator import load_local_model, generate_script, generate_scripts_batch, PrefixCache
+
 # Set mode to "fast" which means using GPT-Neo 1.3B (adjust if needed)
 model_name = "EleutherAI/gpt-neo-1.3B"
 
-# Fetch live trending titles (real headlines)
-titles = combine_sources()
-
-if not titles:
-    print("No trending titles found. Please check your sources.")
-    exit()
-
-print("Live Trending Titles:")
-for i, t in enumerate(titles, 1):
-    print(f"{i}. {t}")
+# Number of scripts to generate for testing
+limit = 3
 
-# Load the selected model
-generator = load_local_model(model_name)
-print("Model loaded. Generating scripts...")
+# Prompts per generate() call; None sizes batches to available RAM.
+batch_size = None
 
-# Create folder to save generated scripts
-os.makedirs("scripts", exist_ok=True)
+# More than 1 spreads headlines over forked model replicas (inference_pool.py).
+replicas = 1
 
-# Number of scripts to generate for testing
-limit = 3
+# One prompt at a time, reusing the cached key/values of PROMPT_PREFIX.
+use_prefix_cache = False
 
-for i, title in enumerate(titles[:limit], start=1):
-    print(f"\n📌 Generating Script {i} for headline:\n{title}\n")
-    prompt = f"""
+PROMPT_TEMPLATE = """
 You are a skilled YouTube scriptwriter specializing in tech content.
 
 Write an engaging, complete, and compelling YouTube script based on the following headline:
@@ -44,18 +33,62 @@ Guidelines:
 Keep the entire script under 250 words.
 Begin now:
 """
-    script = generate_script(prompt, generator)
-
-    # Clean-up: Remove everything before (or including) "Begin now:" if echoed back.
-    if "Begin now:" in script:
-        script = script.split("Begin now:")[-1].strip()
-    
-    # Append a call to action if missing
-    if "subscribe" not in script.lower():
-        script += "\n\n💬 Don't forget to like, comment, and subscribe!"
-    
-    filename = f"script_{i}.txt"
-    with open(os.path.join("scripts", filename), "w", encoding="utf-8") as f:
-        f.write(f"{title}\n\n{script}")
-
-    print(f"✅ Script {i} saved as {filename}")
+# Everything before the headline is the same for every prompt.
+PROMPT_PREFIX = PROMPT_TEMPLATE.split("{title}")[0]
+
+def main():
+    from combine_sources import combine_sources
+
+    # Fetch live trending titles (real headlines)
+    titles = combine_sources()
+
+    if not titles:
+        print("No trending titles found. Please check your sources.")
+        return
+
+    print("Live Trending Titles:")
+    for i, t in enumerate(titles, 1):
+        print(f"{i}. {t}")
+
+    # Load the selected model
+    generator = load_local_model(model_name)
+    print("Model loaded. Generating scripts...")
+
+    # Create folder to save generated scripts
+    os.makedirs("scripts", exist_ok=True)
+
+    selected = titles[:limit]
+    prompts = [PROMPT_TEMPLATE.format(title=title) for title in selected]
+    if replicas > 1:
+        from inference_pool import ReplicaPool
+        print(f"\n📌 Generating {len(selected)} scripts on {replicas} replicas...")
+        with ReplicaPool(generator, replicas) as pool:
+            prefix = {"prefix": PROMPT_PREFIX} if use_prefix_cache else {}
+            scripts = [script or "" for script in pool.map(prompts, **prefix)]
+    elif use_prefix_cache:
+        print(f"\n📌 Generating {len(selected)} scripts with the cached preamble...")
+        cache = PrefixCache(generator)
+        scripts = [generate_script(prompt, generator, prefix_cache=cache, prefix=PROMPT_PREFIX)
+                   for prompt in prompts]
+        cache.print_stats()
+    else:
+        print(f"\n📌 Generating {len(selected)} scripts in batches...")
+        scripts = generate_scripts_batch(prompts, generator, batch_size=batch_size)
+
+    for i, (title, script) in enumerate(zip(selected, scripts), start=1):
+        # Clean-up: Remove everything before (or including) "Begin now:" if echoed back.
+        if "Begin now:" in script:
+            script = script.split("Begin now:")[-1].strip()
+
+        # Append a call to action if missing
+        if "subscribe" not in script.lower():
+            script += "\n\n💬 Don't forget to like, comment, and subscribe!"
+
+        filename = f"script_{i}.txt"
+        with open(os.path.join("scripts", filename), "w", encoding="utf-8") as f:
+            f.write(f"{title}\n\n{script}")
+
+        print(f"✅ Script {i} saved as {filename}")
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,14 @@
 import os
 import json
-import requests
-import feedparser
-import praw
 from dotenv import load_dotenv
 
-import json
-
-USED_TITLES_FILE = "used_titles.json"
-
-def load_used_titles():
-    if os.path.exists(USED_TITLES_FILE):
-        with open(USED_TITLES_FILE, "r", encoding="utf-8") as f:
-            return set(json.load(f))
-    return set()
-
-def save_used_titles(titles):
-    with open(USED_TITLES_FILE, "w", encoding="utf-8") as f:
-        json.dump(list(titles), f, ensure_ascii=False, indent=2)
+import http_client
+from hn_client import HackerNewsClient
+from http_cache import cached_get, parse_feed
+from dedupe import dedupe_titles
+from rank_titles import RankingIndex
+from seen_titles import SeenTitles
+from tagger import KeywordTagger, get_tagger
 
 # Load environment variables
 load_dotenv()
@@ -30,7 +21,7 @@ REDDIT_CLIENT_SECRET = os.getenv("REDDIT_CLIENT_SECRET")
 def fetch_newsdata_titles():
     try:
         url = f"https://newsdata.io/api/1/news?apikey={NEWSDATA_API_KEY}&country=us&language=en&category=top"
-        response = requests.get(url)
+        response = cached_get(url)
         data = response.json()
         articles = data.get("results", [])
         titles = [article["title"] for article in articles if "title" in article]
@@ -41,6 +32,7 @@ def fetch_newsdata_titles():
         return []
 
 def fetch_reddit_titles():
+    import praw
     print("🔍 Fetching Reddit trending titles with PRAW...")
     reddit = praw.Reddit(
         client_id=REDDIT_CLIENT_ID,
@@ -59,7 +51,7 @@ def fetch_reddit_titles():
 def fetch_google_rss_titles():
     try:
         url = "https://news.google.com/rss?hl=en-US&gl=US&ceid=US:en"
-        feed = feedparser.parse(url)
+        feed = parse_feed(url)
         titles = [entry.title for entry in feed.entries]
         print("Google RSS titles:", titles)
         return titles
@@ -70,23 +62,12 @@ def fetch_google_rss_titles():
 def fetch_hackernews_titles(limit=15):
     print("🔐 Fetching Hacker News top stories...")
     try:
-        url = "https://hacker-news.firebaseio.com/v0/topstories.json"
-        top_ids = requests.get(url).json()[:100]
-
         # Cybersecurity keywords
-        keywords = set(k.lower() for k in ["cyber", "hacking", "breach", "exploit", "vulnerability", "cve", "security", "ransomware", "malware", "encryption", "phishing", "tor", "pentest", "infosec", "cyber attack", "zero-day", "ctf", "ddos", "reverse engineering", "firewall", "siem", "defcon", "blackhat", "cyberwarfare", "botnet", "spyware", "tls", "kerberos", "ssh", "sql injection", "mitre", "patch", "token", "sandbox", "zero trust", "firmware", "man-in-the-middle", "session hijack", "payload", "auth", "prompt injection", "data poisoning", "tracking", "facial recognition", "anonymity", "dark web", "privacy", "surveillance"])
+        keywords = KeywordTagger({"Cybersecurity": ["cyber", "hacking", "breach", "exploit", "vulnerability", "cve", "security", "ransomware", "malware", "encryption", "phishing", "tor", "pentest", "infosec", "cyber attack", "zero-day", "ctf", "ddos", "reverse engineering", "firewall", "siem", "defcon", "blackhat", "cyberwarfare", "botnet", "spyware", "tls", "kerberos", "ssh", "sql injection", "mitre", "patch", "token", "sandbox", "zero trust", "firmware", "man-in-the-middle", "session hijack", "payload", "auth", "prompt injection", "data poisoning", "tracking", "facial recognition", "anonymity", "dark web", "privacy", "surveillance"]}, prefix=True)
         
-        titles = []
-        for story_id in top_ids:
-            story_url = f"https://hacker-news.firebaseio.com/v0/item/{story_id}.json"
-            story = requests.get(story_url).json()
-            if story and "title" in story:
-                title = story["title"]
-                if any(k in title.lower() for k in keywords):
-                    titles.append(title)
-            if len(titles) >= limit:
-                break
-        print(f"✅ Hacker News titles: {len(titles)}")
+        client = HackerNewsClient()
+        titles = client.find_titles(keywords.matches, limit)
+        print(f"✅ Hacker News titles: {len(titles)} ({client.fetched} fetched, {client.cache_hits} cached)")
         return titles
     except Exception as e:
         print(f"❌ Hacker News fetch error: {e}")
@@ -95,25 +76,7 @@ def fetch_hackernews_titles(limit=15):
 # ========== Tagging Logic ==========
 
 def categorize_title(title: str) -> list[str]:
-    title = title.lower()
-    tags = []
-    if any(k in title for k in ["hack", "cyber", "malware", "phishing", "breach", "exploit", "cve", "security"]):
-        tags.append("Cybersecurity")
-    if any(k in title for k in ["trump", "biden", "congress", "election", "senate", "parliament", "government"]):
-        tags.append("Politics")
-    if any(k in title for k in ["nasa", "space", "neutrino", "physics", "experiment", "galaxy", "brain", "science"]):
-        tags.append("Science")
-    if any(k in title for k in ["ai", "gpt", "openai", "machine learning", "chatgpt", "deep learning"]):
-        tags.append("AI")
-    if any(k in title for k in ["stock", "economy", "inflation", "tariff", "market", "recession", "interest rate"]):
-        tags.append("Finance")
-    if any(k in title for k in ["vaccine", "covid", "measles", "tumor", "health", "als", "clinic", "hospital"]):
-        tags.append("Health")
-    if any(k in title for k in ["actor", "movie", "film", "show", "euphoria", "grey’s anatomy", "netflix"]):
-        tags.append("Entertainment")
-    if any(k in title for k in ["football", "nba", "nfl", "match", "game", "sports", "draft", "ufc", "mclaren"]):
-        tags.append("Sports")
-    return tags or ["Uncategorized"]
+    return get_tagger().tag(title) or ["Uncategorized"]
 
 # ========== Main Combine Logic ==========
 
@@ -134,18 +97,24 @@ def combine_sources():
     hn_titles = fetch_hackernews_titles()
     all_titles.extend(hn_titles)
 
-    # ✅ Load used titles and filter them
-    used_titles = load_used_titles()
-    new_titles = [t for t in all_titles if t not in used_titles]
+    # ✅ Feed the ranking index per source, so stories several sources agree on rank higher
+    ranking = RankingIndex()
+    for source, titles in (("newsdata", newsdata_titles), ("reddit", reddit_titles),
+                           ("google_news", rss_titles), ("hackernews", hn_titles)):
+        ranking.add(titles, source=source)
+    ranking.close()
 
-    # ✅ Update used titles set
-    updated_used = used_titles.union(new_titles)
-    save_used_titles(updated_used)
+    # ✅ Filter out titles used within the TTL and record the new ones
+    seen_titles = SeenTitles()
+    new_titles = seen_titles.filter_new(all_titles)
+    seen_titles.add_many(new_titles)
+    seen_titles.close()
 
-    # ✅ Deduplicate new only
-    unique_titles = list(dict.fromkeys(new_titles))
+    # ✅ Deduplicate new only: one representative per near-duplicate story
+    unique_titles = dedupe_titles(new_titles)
 
-    print(f"\nTotal unique new titles: {len(unique_titles)}")
+    print(f"\nTotal unique new titles: {len(unique_titles)} "
+          f"({len(set(new_titles)) - len(unique_titles)} near-duplicates dropped)")
     if unique_titles:
         print("\n📰 Sample Trending Titles:")
         for idx, title in enumerate(unique_titles[:15], 1):
@@ -167,3 +136,4 @@ if __name__ == "__main__":
     topics = combine_sources()
     if not topics:
         print("⚠️ No trending titles found.")
+    http_client.print_stats()
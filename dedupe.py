@@ -0,0 +1,257 @@
+"""
+Near-duplicate headline detection with MinHash + LSH.
+
+The same story shows up from NewsData, Google RSS and Reddit with different
+publisher suffixes (" - The Washington Post") and small wording changes.
+Titles are normalised (publisher suffix and the "(Published: ...)",
+"(Reddit)", "(Tweet)" markers stripped, HTML entities decoded, hashtags
+dropped, case and punctuation folded), turned into word shingles and MinHash
+signatures, and banded into LSH buckets. Only titles sharing a bucket are
+compared exactly: their word-shingle Jaccard must reach THRESHOLD and they
+must carry the same numbers and dates ("Season 3" vs "Season 4", "Friday,
+April 18" vs "Wednesday, April 16" are different stories). Clustering is
+roughly linear in the number of titles.
+
+Google Trends titles are bare niche keywords ("eco friendly trending on
+Google Trends") and are never merged with anything but identical titles.
+
+    dedupe_titles(titles)  -> one representative per cluster, input order
+    cluster_titles(titles) -> clusters as lists of indices
+
+Run `python dedupe.py` to measure precision and recall against the
+hand-labelled pairs in dedupe_labels.json, and LSH recall and speed against
+brute-force pairwise comparison on the topic store corpus.
+"""
+import re
+import sys
+import html
+import json
+import time
+import random
+import hashlib
+import unicodedata
+
+# ---------- CONFIGURATION ----------
+SHINGLE_SIZE = 1            # words per shingle
+NUM_PERM = 96
+BANDS = 32                  # 32 bands x 3 rows: ~99% of 0.5-similar pairs become candidates
+THRESHOLD = 0.7             # Jaccard (on word shingles) needed to join a cluster
+SEED = 1
+LABELS_FILE = "dedupe_labels.json"
+# -----------------------------------
+
+# Shingle hashes are already uniform, so XOR with a random mask is a cheap
+# stand-in for a full permutation.
+_rng = random.Random(SEED)
+_MASKS = [_rng.getrandbits(64) for _ in range(NUM_PERM)]
+
+_MARKERS = re.compile(r"\s*(?:\((?:Published: [^)]*|Reddit|Tweet)\)|trending on Google Trends)\s*$")
+_TRENDS_MARKER = "trending on Google Trends"
+# " - Publisher", " | Publisher", " — Publisher" with a short publisher name.
+# Words are separated by mandatory whitespace, so matching stays linear.
+_PUBLISHER = re.compile(r"\s+[-|–—]\s+(?:[^\s|–—-]+\s+){0,4}[^\s|–—-]+$")
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+_HASHTAG = re.compile(r"#\w+")
+_DATE_WORDS = {
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december",
+    "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+}
+
+
+def normalize_title(title, strip_publisher=True):
+    """Strip fetcher markers and publisher suffixes; fold case, accents and punctuation."""
+    title = _MARKERS.sub("", title.strip())
+    if strip_publisher:
+        title = _PUBLISHER.sub("", title)
+    title = unicodedata.normalize("NFKD", title)
+    title = "".join(ch for ch in title if not unicodedata.combining(ch))
+    title = title.replace("’", "").replace("'", "")
+    title = _NON_WORD.sub(" ", title.lower())
+    return _SPACES.sub(" ", title).strip()
+
+
+def title_words(title, strip_publisher=True):
+    """The words dedupe compares: the normalised title without hashtags."""
+    return normalize_title(_HASHTAG.sub(" ", html.unescape(title)), strip_publisher).split()
+
+
+def shingles(words, size=SHINGLE_SIZE):
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _guard(words):
+    """Numbers and dates; titles must agree on these to be duplicates."""
+    return frozenset(w for w in words if w in _DATE_WORDS or any(ch.isdigit() for ch in w))
+
+
+def _features(title):
+    """(shingles, guard), or None for titles that are never fuzzy-matched."""
+    words = title_words(title)
+    if not words or title.rstrip().endswith(_TRENDS_MARKER):
+        return None
+    # Numbers in a dash-separated suffix ("| Part 2") count too.
+    return shingles(words), _guard(title_words(title, strip_publisher=False))
+
+
+def _matches(a, b, threshold):
+    return a[1] == b[1] and jaccard(a[0], b[0]) >= threshold
+
+
+def is_duplicate(a, b, threshold=THRESHOLD):
+    """Exact pairwise check, the same test LSH candidates must pass."""
+    if a == b:
+        return True
+    fa, fb = _features(a), _features(b)
+    return fa is not None and fb is not None and _matches(fa, fb, threshold)
+
+
+def _hash64(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def minhash(shingle_set):
+    hashes = [_hash64(s) for s in shingle_set]
+    return tuple(min([h ^ mask for h in hashes]) for mask in _MASKS)
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, x):
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            # Keep the earliest index as root so it becomes the representative.
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def candidate_pairs(signatures, bands=BANDS):
+    """Index pairs that share at least one LSH band."""
+    rows = len(signatures[0]) // bands if signatures else 0
+    pairs = set()
+    for band in range(bands):
+        buckets = {}
+        for idx, sig in enumerate(signatures):
+            buckets.setdefault(sig[band * rows:(band + 1) * rows], []).append(idx)
+        for members in buckets.values():
+            for i in range(len(members)):
+                for j in range(i + 1, len(members)):
+                    pairs.add((members[i], members[j]))
+    return pairs
+
+
+def similar_pairs(titles, threshold=THRESHOLD):
+    """LSH candidate pairs that pass the exact check (is_duplicate)."""
+    features = [_features(t) for t in titles]
+    eligible = [i for i, f in enumerate(features) if f is not None]
+    signatures = [minhash(features[i][0]) for i in eligible]
+    return {
+        (eligible[a], eligible[b]) for a, b in candidate_pairs(signatures)
+        if _matches(features[eligible[a]], features[eligible[b]], threshold)
+    }
+
+
+def cluster_titles(titles, threshold=THRESHOLD):
+    """Group near-identical titles; returns lists of indices, each sorted."""
+    uf = _UnionFind(len(titles))
+    for i, j in similar_pairs(titles, threshold):
+        uf.union(i, j)
+    clusters = {}
+    for idx in range(len(titles)):
+        clusters.setdefault(uf.find(idx), []).append(idx)
+    return sorted(clusters.values(), key=lambda members: members[0])
+
+
+def dedupe_titles(titles, threshold=THRESHOLD):
+    """One representative (the first occurrence) per near-duplicate cluster."""
+    titles = list(dict.fromkeys(titles))
+    return [titles[members[0]] for members in cluster_titles(titles, threshold)]
+
+
+def evaluate(titles, threshold=THRESHOLD):
+    """
+    LSH pairs vs brute-force pairwise checks with the same test. Both apply
+    identical verification, so this measures LSH recall (pairs it failed to
+    make candidates) and speed, not whether the pairs are real duplicates.
+    """
+    titles = list(dict.fromkeys(titles))
+    started = time.perf_counter()
+    predicted = similar_pairs(titles, threshold)
+    lsh_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    features = [_features(t) for t in titles]
+    truth = {(i, j) for i in range(len(titles)) for j in range(i + 1, len(titles))
+             if features[i] is not None and features[j] is not None
+             and _matches(features[i], features[j], threshold)}
+    exact_seconds = time.perf_counter() - started
+
+    return {
+        "titles": len(titles),
+        "exact_pairs": len(truth),
+        "lsh_pairs": len(predicted),
+        "lsh_recall": len(predicted & truth) / len(truth) if truth else 1.0,
+        "lsh_seconds": lsh_seconds,
+        "exact_seconds": exact_seconds,
+    }
+
+
+def evaluate_labels(path=LABELS_FILE, threshold=THRESHOLD):
+    """Precision and recall of is_duplicate() on hand-labelled title pairs."""
+    with open(path, "r", encoding="utf-8") as f:
+        labels = json.load(f)
+    tp = fp = fn = 0
+    mistakes = []
+    for pair in labels:
+        predicted = is_duplicate(pair["a"], pair["b"], threshold)
+        tp += predicted and pair["duplicate"]
+        fp += predicted and not pair["duplicate"]
+        fn += pair["duplicate"] and not predicted
+        if predicted != pair["duplicate"]:
+            mistakes.append(pair)
+    return {
+        "pairs": len(labels),
+        "duplicates": sum(pair["duplicate"] for pair in labels),
+        "precision": tp / (tp + fp) if tp + fp else 1.0,
+        "recall": tp / (tp + fn) if tp + fn else 1.0,
+        "mistakes": mistakes,
+    }
+
+
+if __name__ == "__main__":
+    from topic_store import get_store
+
+    labelled = evaluate_labels()
+    print(f"🏷️ {labelled['pairs']} labelled pairs ({labelled['duplicates']} duplicates): "
+          f"precision {labelled['precision']:.3f}, recall {labelled['recall']:.3f}")
+    for pair in labelled["mistakes"]:
+        kind = "missed" if pair["duplicate"] else "false merge"
+        print(f"   {kind}: {pair['a']}\n{' ' * (len(kind) + 5)}{pair['b']}")
+
+    corpus = [topic["title"] for topic in get_store().select_topics(status=None)]
+    if not corpus:
+        print("⚠️ Topic store is empty; nothing to evaluate.")
+        sys.exit(0)
+    report = evaluate(corpus)
+    print(f"\n🔁 {report['titles']} titles: {report['exact_pairs']} duplicate pairs by brute force")
+    print(f"   LSH found {report['lsh_pairs']} pairs — LSH recall {report['lsh_recall']:.3f}")
+    print(f"   LSH {report['lsh_seconds']:.2f}s vs exact all-pairs {report['exact_seconds']:.2f}s")
+    clusters = [c for c in cluster_titles(list(dict.fromkeys(corpus))) if len(c) > 1]
+    unique = list(dict.fromkeys(corpus))
+    for members in clusters[:5]:
+        print("\n📦 " + "\n   ".join(unique[i] for i in members))
@@ -1,7 +1,8 @@
 import os
-import requests
 from dotenv import load_dotenv
 
+import http_client
+
 # Load environment variables from .env
 load_dotenv()
 PEXELS_API_KEY = os.getenv("PEXELS_API_KEY")
@@ -10,12 +11,13 @@ def search_pexels_video(query, per_page=5):
     url = "https://api.pexels.com/videos/search"
     headers = {"Authorization": PEXELS_API_KEY}
     params = {"query": query, "per_page": per_page}
-    response = requests.get(url, headers=headers, params=params)
+    response = http_client.get(url, headers=headers, params=params)
     response.raise_for_status()
     return response.json()
 
 def download_video(video_url, output_path):
-    response = requests.get(video_url, stream=True)
+    # Large file: keep the connect timeout, allow slow chunks.
+    response = http_client.get(video_url, stream=True, timeout=(5, 120))
     response.raise_for_status()
     with open(output_path, "wb") as f:
         for chunk in response.iter_content(chunk_size=8192):
@@ -59,6 +61,7 @@ def main():
         download_video(best_video_url, output_path)
     except Exception as e:
         print(f"❌ An error occurred: {e}")
+    http_client.print_stats()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,226 @@
+"""
+On-disk sentence-embedding cache and nearest-neighbour search for headlines.
+
+Topic titles and harvested video titles are encoded on CPU with a small
+sentence-transformer (mean-pooled, L2-normalised) through `transformers`.
+Each distinct text is encoded once: vectors are appended to a raw float32
+file that's read back through a NumPy memmap, and a tab-separated key file
+(one "<hash>\\t<kind>\\t<text>" line per row) maps text hashes to rows.
+Vectors are written before their key line, so a crash can only leave an
+unreferenced vector behind.
+
+similar() is a brute-force BLAS scan (one matrix-vector product over the
+memmap), which answers in milliseconds up to a few hundred thousand titles.
+
+Usage:
+    python embeddings.py index
+    python embeddings.py similar "some headline" [-k 10] [--kind video]
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+
+import numpy as np
+
+# ---------- CONFIGURATION ----------
+MODEL_NAME = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+STORE_DIR = os.path.join("cache", "embeddings")
+ENCODE_BATCH = 64
+MAX_TOKENS = 64
+# -----------------------------------
+
+
+def text_hash(text):
+    return hashlib.blake2b(text.strip().encode("utf-8"), digest_size=16).hexdigest()
+
+
+class EmbeddingStore:
+    def __init__(self, model_name=MODEL_NAME, store_dir=STORE_DIR):
+        self.model_name = model_name
+        self.path = os.path.join(store_dir, model_name.replace("/", "__"))
+        self.vectors_path = os.path.join(self.path, "vectors.f32")
+        self.keys_path = os.path.join(self.path, "keys.tsv")
+        self.meta_path = os.path.join(self.path, "meta.json")
+        self._lock = threading.Lock()
+        self._tokenizer = None
+        self._model = None
+        self._matrix = None
+        self._kinds = None
+        self.dim = None
+        self.rows = {}        # text hash -> row
+        self.texts = []
+        self.kinds = []
+        self._load()
+
+    # ---------- storage ----------
+
+    def _load(self):
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+        if not self.dim or not os.path.exists(self.keys_path):
+            return
+        stored = os.path.getsize(self.vectors_path) // (self.dim * 4) if os.path.exists(self.vectors_path) else 0
+        with open(self.keys_path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t", 2)
+                if len(parts) != 3 or len(self.texts) >= stored:
+                    break
+                key, kind, text = parts
+                self.rows[key] = len(self.texts)
+                self.texts.append(text)
+                self.kinds.append(kind)
+        # Drop any vectors written after the last complete key line.
+        if stored > len(self.texts):
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(len(self.texts) * self.dim * 4)
+
+    def _append(self, texts, kinds, vectors):
+        os.makedirs(self.path, exist_ok=True)
+        if not os.path.exists(self.meta_path):
+            with open(self.meta_path, "w", encoding="utf-8") as f:
+                json.dump({"model": self.model_name, "dim": self.dim}, f)
+        with open(self.vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(self.keys_path, "a", encoding="utf-8") as f:
+            for text, kind in zip(texts, kinds):
+                clean = " ".join(text.split())
+                f.write(f"{text_hash(text)}\t{kind}\t{clean}\n")
+                self.rows[text_hash(text)] = len(self.texts)
+                self.texts.append(clean)
+                self.kinds.append(kind)
+        self._matrix = None
+        self._kinds = None
+
+    @property
+    def matrix(self):
+        """All stored vectors as a read-only (n, dim) memmap."""
+        if self._matrix is None:
+            if not self.texts:
+                return np.zeros((0, self.dim or 0), dtype=np.float32)
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                     shape=(len(self.texts), self.dim))
+        return self._matrix
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __contains__(self, text):
+        return text_hash(text) in self.rows
+
+    # ---------- encoding ----------
+
+    def _load_model(self):
+        if self._model is None:
+            from transformers import AutoTokenizer, AutoModel
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self._model = AutoModel.from_pretrained(self.model_name).eval()
+
+    def encode(self, texts):
+        """Encode texts without caching them; returns an (n, dim) float32 array."""
+        import torch
+        self._load_model()
+        out = []
+        for start in range(0, len(texts), ENCODE_BATCH):
+            batch = texts[start:start + ENCODE_BATCH]
+            enc = self._tokenizer(batch, padding=True, truncation=True, max_length=MAX_TOKENS,
+                                  return_tensors="pt")
+            with torch.no_grad():
+                hidden = self._model(**enc).last_hidden_state
+            mask = enc["attention_mask"].unsqueeze(-1).float()
+            pooled = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+            out.append(torch.nn.functional.normalize(pooled, dim=1).numpy().astype(np.float32))
+        vectors = np.vstack(out) if out else np.zeros((0, self.dim or 0), dtype=np.float32)
+        if self.dim is None and len(vectors):
+            self.dim = vectors.shape[1]
+        return vectors
+
+    def embed(self, texts, kind="topic"):
+        """
+        Vectors for `texts`, encoding and storing only the ones not cached yet.
+        `kind` ("topic", "video", ...) tags newly stored texts for filtered search.
+        """
+        texts = [t.strip() for t in texts]
+        with self._lock:
+            missing = list(dict.fromkeys(t for t in texts if text_hash(t) not in self.rows))
+            if missing:
+                self._append(missing, [kind] * len(missing), self.encode(missing))
+            matrix = self.matrix
+            return np.asarray(matrix[[self.rows[text_hash(t)] for t in texts]])
+
+    # ---------- search ----------
+
+    def similar(self, query, k=10, kind=None, exclude_self=True):
+        """
+        The k stored texts closest to `query` (a string or a vector) by
+        cosine similarity, best first, as (text, kind, score) tuples.
+        """
+        if isinstance(query, str):
+            key = text_hash(query)
+            vector = self.matrix[self.rows[key]] if key in self.rows else self.encode([query])[0]
+        else:
+            key, vector = None, np.asarray(query, dtype=np.float32)
+        matrix = self.matrix
+        if not len(matrix):
+            return []
+        scores = matrix @ vector
+        if kind is not None:
+            if self._kinds is None:
+                self._kinds = np.array(self.kinds)
+            scores = np.where(self._kinds == kind, scores, -np.inf)
+        if exclude_self and key in self.rows:
+            scores[self.rows[key]] = -np.inf
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.texts[i], self.kinds[i], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_embedding_store():
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = EmbeddingStore()
+        return _default_store
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Headline embedding cache and similarity search.")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("index", help="embed every topic and harvested video title")
+    similar = sub.add_parser("similar", help="find stored titles similar to a query")
+    similar.add_argument("query")
+    similar.add_argument("-k", type=int, default=10)
+    similar.add_argument("--kind", choices=["topic", "video"], default=None)
+    args = parser.parse_args(argv)
+
+    store = get_embedding_store()
+    if args.command == "index":
+        from topic_store import get_store
+        from backtest_store import BacktestStore
+        started = time.perf_counter()
+        before = len(store)
+        store.embed([t["title"] for t in get_store().select_topics(status=None)], kind="topic")
+        store.embed([r["title"] for r in BacktestStore().iter_records() if r.get("title")], kind="video")
+        print(f"✅ Encoded {len(store) - before} new titles in {time.perf_counter() - started:.1f}s "
+              f"({len(store)} cached in {store.path})")
+    elif args.command == "similar":
+        started = time.perf_counter()
+        results = store.similar(args.query, args.k, args.kind)
+        print(f"🔎 {len(results)} matches in {(time.perf_counter() - started) * 1000:.1f} ms")
+        for text, kind, score in results:
+            print(f"  {score:.3f} [{kind}] {text}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
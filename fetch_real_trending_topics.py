@@ -2,28 +2,19 @@
 import os
 import re
 import json
-import time
-import random
+import threading
 from datetime import datetime, timedelta, timezone
 from urllib.parse import quote_plus
 
-import feedparser
-import praw
-import pandas as pd
-from pytrends.request import TrendReq
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 from dotenv import load_dotenv
 
-# -----------------------------------------
-# Try to import snscrape; if it fails, disable Twitter scraping
-# -----------------------------------------
-try:
-    import snscrape.modules.twitter as sntwitter
-    SNTWITTER_AVAILABLE = True
-except Exception as e:
-    print(f"⚠️ snscrape import failed ({e}); Twitter topics will be skipped.")
-    SNTWITTER_AVAILABLE = False
+import http_client
+from dedupe import dedupe_titles
+from http_cache import get_cache, parse_feed
+from topic_store import get_store
+from trending_harvester import TrendingHarvester
+from trends_engine import get_trends_engine
+from youtube_quota import YouTubeData, QuotaExceededError, cached_response, get_ledger, plan_run, print_plan
 
 # Load environment variables
 load_dotenv()
@@ -33,12 +24,14 @@ REDDIT_CLIENT_SECRET  = os.getenv("REDDIT_CLIENT_SECRET")
 REDDIT_USER_AGENT     = os.getenv("REDDIT_USER_AGENT")
 
 # ---------- CONFIGURATION ----------
-BASE_TRENDING_DIR      = "trending_topics"
 NEWS_THRESHOLD        = 10
 MAX_RESULTS_PER_SOURCE = 5
-# Use a timezone‑aware datetime string for publishedAfter
+# Use a timezone‑aware datetime string for publishedAfter. Truncated to the day
+# so repeat runs hit the YouTube response cache.
 PUBLISHED_AFTER       = (datetime.now(timezone.utc) - timedelta(days=30))\
+                            .replace(hour=0, minute=0, second=0, microsecond=0)\
                             .isoformat().replace("+00:00", "Z")
+PREVIOUS_RUN_FILE     = "backtest_data/trending_data.json"
 # -----------------------------------
 
 # List of candidate niches (you can extend this later or generate dynamically)
@@ -62,10 +55,6 @@ candidate_niches = [
     "rugby", "boxing", "mma", "business"
 ]
 
-def initialize_base_folders():
-    """Create the base folder for trending topics."""
-    os.makedirs(BASE_TRENDING_DIR, exist_ok=True)
-
 def sanitize_query(query):
     """Sanitize query strings by replacing whitespace with '+'."""
     return re.sub(r'\s+', '+', query)
@@ -73,14 +62,24 @@ def sanitize_query(query):
 def get_youtube_service():
     """Initialize and return the YouTube API service."""
     try:
+        from googleapiclient.discovery import build
         return build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
     except Exception as e:
         print(f"⚠️ YouTube service error: {e}")
         return None
 
+_thread_local = threading.local()
+
+def get_thread_youtube_service():
+    """Return a YouTube service owned by the calling thread (the client isn't thread-safe)."""
+    if not hasattr(_thread_local, "youtube"):
+        _thread_local.youtube = get_youtube_service()
+    return _thread_local.youtube
+
 def get_reddit_instance():
     """Return a PRAW Reddit instance."""
     try:
+        import praw
         return praw.Reddit(
             client_id=REDDIT_CLIENT_ID,
             client_secret=REDDIT_CLIENT_SECRET,
@@ -95,7 +94,7 @@ def fetch_google_news_topics(niche):
     topics = []
     try:
         rss_url = f"https://news.google.com/rss/search?q={quote_plus(niche)}&hl=en-US&gl=US&ceid=US:en"
-        feed = feedparser.parse(rss_url)
+        feed = parse_feed(rss_url)
         for entry in feed.entries[:MAX_RESULTS_PER_SOURCE]:
             title = entry.get("title", "").strip()
             published = entry.get("published", "unknown")
@@ -105,25 +104,31 @@ def fetch_google_news_topics(niche):
         print(f"❌ News error for '{niche}': {e}")
     return topics
 
+def youtube_search_params(niche):
+    """search().list parameters for a niche; also the key of its cached response."""
+    return {
+        "part": "snippet",
+        "q": sanitize_query(niche),
+        "maxResults": MAX_RESULTS_PER_SOURCE,
+        "order": "viewCount",
+        "type": "video",
+        "publishedAfter": PUBLISHED_AFTER,
+    }
+
 def fetch_youtube_topics(youtube, niche):
-    """Fetch topics from YouTube API using a query search."""
+    """Fetch topics from YouTube API using a query search (cached, quota-checked)."""
+    from googleapiclient.errors import HttpError
     topics = []
     try:
-        request = youtube.search().list(
-            part="snippet",
-            q=sanitize_query(niche),
-            maxResults=MAX_RESULTS_PER_SOURCE,
-            order="viewCount",
-            type="video",
-            publishedAfter=PUBLISHED_AFTER
-        )
-        response = request.execute()
-        for item in response.get("items", []):
+        items = YouTubeData(youtube).search_videos(**youtube_search_params(niche))
+        for item in items:
             snip = item.get("snippet", {})
             title = snip.get("title", "").strip()
             pub_at = snip.get("publishedAt", "unknown")
             if title:
                 topics.append(f"{title} (Published: {pub_at})")
+    except QuotaExceededError as e:
+        print(f"⚠️ Skipping YouTube for '{niche}': {e}")
     except HttpError as e:
         print(f"❌ YouTube error for '{niche}': {e}")
     except Exception as e:
@@ -142,9 +147,27 @@ def fetch_reddit_topics(reddit, niche):
         print(f"❌ Reddit error for '{niche}': {e}")
     return topics
 
+_sntwitter = None
+
+def twitter_scraper():
+    """
+    The snscrape Twitter module, imported on first use, or None (with a
+    one-time warning) if snscrape isn't usable.
+    """
+    global _sntwitter
+    if _sntwitter is None:
+        try:
+            import snscrape.modules.twitter as sntwitter
+            _sntwitter = sntwitter
+        except Exception as e:
+            print(f"⚠️ snscrape import failed ({e}); Twitter topics will be skipped.")
+            _sntwitter = False
+    return _sntwitter or None
+
 def fetch_twitter_topics(niche):
     """Fetch recent tweets using snscrape (if available)."""
-    if not SNTWITTER_AVAILABLE:
+    sntwitter = twitter_scraper()
+    if sntwitter is None:
         return []
     topics = []
     query = f'"{niche}" lang:en'
@@ -159,19 +182,15 @@ def fetch_twitter_topics(niche):
     return topics
 
 def fetch_google_trends_topics(niche):
-    """Fetch Google Trends interest over time and flag if trending."""
-    topics = []
+    """
+    Flag the niche if it is trending on Google Trends. Queries are batched,
+    anchor-normalised, cached and rate-limited by trends_engine.
+    """
     try:
-        pytrend = TrendReq(hl='en-US', tz=360)
-        pytrend.build_payload([niche], timeframe='now 7-d', geo='', gprop='')
-        df = pytrend.interest_over_time()
-        if not df.empty and df[niche].max() > 50:
-            topics.append(f"{niche} trending on Google Trends")
-        # brief random sleep to avoid rate‑limit bursts
-        time.sleep(random.uniform(1, 3))
+        return get_trends_engine().trending_topics(niche)
     except Exception as e:
         print(f"❌ Google Trends error for '{niche}': {e}")
-    return topics
+        return []
 
 def fetch_trending_topics_for_niche(niche, youtube, reddit):
     """Combine all sources for the given niche."""
@@ -197,29 +216,67 @@ def fetch_trending_topics_for_niche(niche, youtube, reddit):
     return list(topics)
 
 def save_topics(niche, topics):
-    """Save each topic into its own .txt under trending_topics/<niche>/."""
-    niche_dir = os.path.join(BASE_TRENDING_DIR, niche.replace(" ", "_"))
-    os.makedirs(niche_dir, exist_ok=True)
-    unique_sorted = sorted(set(topics))
-    for idx, topic in enumerate(unique_sorted, start=1):
-        fn = f"{niche.replace(' ', '_')}_{idx:03d}.txt"
-        path = os.path.join(niche_dir, fn)
-        try:
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(topic)
-            print(f"✅ Saved topic: {path}")
-        except Exception as e:
-            print(f"❌ Error saving {path}: {e}")
+    """Save the niche's topics into the topic store (existing ones are kept as-is)."""
+    try:
+        unique = dedupe_titles(sorted(set(topics)))
+        added = get_store().add_topics(niche, unique)
+        print(f"✅ Saved {added} new topics for '{niche}' ({len(unique) - added} already known, "
+              f"{len(set(topics)) - len(unique)} near-duplicates dropped)")
+    except Exception as e:
+        print(f"❌ Error saving topics for '{niche}': {e}")
+
+def previous_topic_counts():
+    """Topic counts per niche from the last run, used to rank YouTube searches."""
+    try:
+        with open(PREVIOUS_RUN_FILE, "r", encoding="utf-8") as f:
+            return {niche: len(topics) for niche, topics in json.load(f).items()}
+    except (OSError, json.JSONDecodeError):
+        return {}
 
-def process_niches(niches):
+def plan_youtube_niches(niches):
+    """Pick the niches whose YouTube search fits in today's remaining quota."""
+    counts = previous_topic_counts()
+    plan = plan_run(niches=niches, priority=lambda niche: counts.get(niche, 0),
+                    cached=lambda niche: cached_response("search.list", youtube_search_params(niche)) is not None)
+    print_plan(plan)
+    return set(plan["niches"])
+
+def build_harvest_sources(youtube, reddit, youtube_niches=None):
+    """Map source names to blocking fetchers for the concurrent harvester."""
+    sources = {"news": fetch_google_news_topics}
+    if youtube:
+        def fetch_youtube(niche):
+            if youtube_niches is not None and niche not in youtube_niches:
+                return []
+            return fetch_youtube_topics(get_thread_youtube_service(), niche)
+        sources["youtube"] = fetch_youtube
+    if reddit:
+        sources["reddit"] = lambda niche: fetch_reddit_topics(reddit, niche)
+    if twitter_scraper():
+        sources["twitter"] = fetch_twitter_topics
+    sources["trends"] = fetch_google_trends_topics
+    return sources
+
+def process_niches(niches, record_run=True):
+    """
+    Harvest and score niches, saving the ones over NEWS_THRESHOLD. With
+    record_run=False (streaming one niche at a time) the run isn't written to
+    PREVIOUS_RUN_FILE, which ranks the next full run's YouTube searches.
+    """
     youtube = get_youtube_service()
     reddit  = get_reddit_instance()
     all_trending = {}
 
     print("🔎 Evaluating candidate niches based on available trending topics...\n")
+    # Let Trends lookups share payloads across niches.
+    get_trends_engine().warm(niches)
+    youtube_niches = plan_youtube_niches(niches) if youtube else None
+    harvester = TrendingHarvester(build_harvest_sources(youtube, reddit, youtube_niches))
+    harvested = harvester.harvest(niches)
+
     for niche in niches:
         print(f"🔍 Processing niche: {niche}")
-        topics = fetch_trending_topics_for_niche(niche, youtube, reddit)
+        topics = harvested[niche]
         score  = len(topics)
         print(f"  - '{niche}' scored {score} topics")
         if score >= NEWS_THRESHOLD:
@@ -229,15 +286,20 @@ def process_niches(niches):
             print(f"⚠️ Not enough topics for '{niche}' (found {score}); skipping.\n")
 
     # Save raw backtest data
-    os.makedirs("backtest_data", exist_ok=True)
-    with open("backtest_data/trending_data.json", "w", encoding="utf-8") as f:
-        json.dump(all_trending, f, indent=2)
+    if record_run:
+        os.makedirs("backtest_data", exist_ok=True)
+        with open(PREVIOUS_RUN_FILE, "w", encoding="utf-8") as f:
+            json.dump(all_trending, f, indent=2)
 
+    harvester.print_summary()
+    get_cache().print_stats()
+    get_trends_engine().print_stats()
+    get_ledger().print_stats()
+    http_client.print_stats()
     return all_trending
 
 def main():
     print("🚀 Fetching trending topics for candidate niches...\n")
-    initialize_base_folders()
     trending = process_niches(candidate_niches)
 
     if trending:
@@ -1,8 +1,7 @@
-import os
 import json
-import requests
-import feedparser
-import hashlib
+
+from http_cache import parse_feed
+from topic_store import get_store
 
 HEADERS = {'User-Agent': 'Mozilla/5.0'}
 GOOGLE_NEWS_TEMPLATE = "https://news.google.com/rss/search?q={}&hl=en-US&gl=US&ceid=US:en"
@@ -11,13 +10,9 @@ def load_niches(json_path="niches.json"):
     with open(json_path, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def safe_filename(text):
-    """Create a safe hashed filename for each topic."""
-    return hashlib.md5(text.encode()).hexdigest()[:12] + ".txt"
-
 def fetch_google_news(keyword):
     url = GOOGLE_NEWS_TEMPLATE.format(keyword.replace(" ", "+"))
-    feed = feedparser.parse(url)
+    feed = parse_feed(url)
     titles = []
     for entry in feed.entries:
         title = entry.title.strip()
@@ -26,15 +21,8 @@ def fetch_google_news(keyword):
     return titles
 
 def save_titles(niche, titles):
-    folder = os.path.join("trending_topics", niche)
-    os.makedirs(folder, exist_ok=True)
-
-    for title in titles:
-        filename = safe_filename(title)
-        filepath = os.path.join(folder, filename)
-        if not os.path.exists(filepath):
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(title)
+    """Add titles to the topic store; titles already stored are skipped."""
+    get_store().add_topics(niche, titles, source="google_news")
 
 def main():
     print("🚀 Fetching trending topics for all niches in niches.json...")
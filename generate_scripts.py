@@ -2,9 +2,14 @@ import os
 import json
 import requests
 
+import http_client
+from topic_store import get_store
+
 # Configuration for the API endpoint for text generation.
 # Update this URL if your Text Generation Web UI is hosted elsewhere.
 TEXTGEN_API_URL = os.getenv("TEXTGEN_API_URL", "http://127.0.0.1:5000/v1/completions")
+# Generation can take minutes on CPU; only the connect phase should fail fast.
+TEXTGEN_TIMEOUT = (5, 600)
 
 # Define all current and future niches here. (You can later load/update from niches.json)
 niches = ["ai", "tech", "finance", "science", "cybersecurity"]
@@ -25,7 +30,7 @@ def call_textgen_api(prompt):
         "pad_token_id": None  # If needed, set this to the appropriate EOS token ID.
     }
     try:
-        response = requests.post(TEXTGEN_API_URL, json=payload)
+        response = http_client.post(TEXTGEN_API_URL, json=payload, timeout=TEXTGEN_TIMEOUT)
         response.raise_for_status()
     except requests.RequestException as e:
         print(f"❌ Error calling textgen API: {e}")
@@ -41,9 +46,8 @@ def call_textgen_api(prompt):
         print(f"❌ Full API response: {response.text}")
         return None
 
-def generate_refined_script(topic, niche):
-    """Generates a YouTube-ready script based on the input topic using the TextGen API."""
-    prompt = (
+def build_prompt(topic, niche):
+    return (
         f"Write a high-quality, human-like YouTube video script for the {niche} niche "
         f"based on this topic:\n\n"
         f"Title: {topic.strip()}\n\n"
@@ -51,6 +55,10 @@ def generate_refined_script(topic, niche):
         f"Use a friendly tone and a storytelling style with facts, structure, and personality.\n\n"
         f"Script:\n"
     )
+
+def generate_refined_script(topic, niche):
+    """Generates a YouTube-ready script based on the input topic using the TextGen API."""
+    prompt = build_prompt(topic, niche)
     generated = call_textgen_api(prompt)
     if generated is None:
         return None
@@ -59,27 +67,18 @@ def generate_refined_script(topic, niche):
         return generated[len(prompt):].strip()
     return generated.strip()
 
-def process_niche(niche):
-    """Processes all topic files under a niche and generates refined scripts."""
-    niche_dir = os.path.join("trending_topics", niche)
+def process_niche(niche, topics=None):
+    """Generates refined scripts for the niche's new topics and marks them scripted."""
+    store = get_store()
+    if topics is None:
+        topics = store.select_topics(niche, status="new")
     output_dir = os.path.join("generated_scripts", niche)
     os.makedirs(output_dir, exist_ok=True)
 
-    # Process all .txt files in the niche directory
-    for filename in os.listdir(niche_dir):
-        if not filename.endswith(".txt"):
-            continue
-        filepath = os.path.join(niche_dir, filename)
-        with open(filepath, "r", encoding="utf-8") as f:
-            topic = f.read().strip()
-
-        # Check for placeholders: if the topic is still the default (or very short), skip it.
-        if "Example topic for" in topic or len(topic) < 10:
-            print(f"⚠️ Placeholder topic in {filename}, skipping...")
-            continue
-
+    for topic in topics:
+        filename = f"{topic['topic_key']}.txt"
         print(f"📝 Generating script for: {filename}")
-        refined_script = generate_refined_script(topic, niche)
+        refined_script = generate_refined_script(topic["title"], niche)
         if refined_script is None:
             print(f"❌ Failed to generate script for: {filename}")
             continue
@@ -87,35 +86,21 @@ def process_niche(niche):
         output_path = os.path.join(output_dir, filename)
         with open(output_path, "w", encoding="utf-8") as f:
             f.write(refined_script)
+        store.set_status(topic["id"], "scripted", forward_only=True)
         print(f"✅ Saved: {output_path}")
 
-def initialize_folders():
-    """Creates missing folders for all niches and adds a placeholder if empty."""
-    for niche in niches:
-        niche_dir = os.path.join("trending_topics", niche)
-        os.makedirs(niche_dir, exist_ok=True)
-
-        # Add a placeholder topic if folder is empty
-        if not os.listdir(niche_dir):
-            placeholder_path = os.path.join(niche_dir, "sample_topic.txt")
-            with open(placeholder_path, "w", encoding="utf-8") as f:
-                f.write(f"Example topic for {niche} niche")
-            print(f"ℹ️ Created placeholder in {niche_dir}")
-
 def main():
     print("\n🚀 Generating refined YouTube scripts...\n")
-    initialize_folders()
+    store = get_store()
 
     for niche in niches:
         print(f"\n🔍 Niche: {niche}")
-        niche_dir = os.path.join("trending_topics", niche)
-        # Check if there is at least one non-placeholder topic file
-        files = [fn for fn in os.listdir(niche_dir) if fn.endswith(".txt")]
-        if not files:
-            print(f"⚠️ No topics found in {niche_dir}. Skipping...")
+        topics = store.select_topics(niche, status="new")
+        if not topics:
+            print(f"⚠️ No new topics for {niche}. Skipping...")
             continue
 
-        process_niche(niche)
+        process_niche(niche, topics)
 
 if __name__ == "__main__":
     main()
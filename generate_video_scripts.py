@@ -3,16 +3,12 @@ import os
 import argparse
 from pathlib import Path
 
-import openai
 from dotenv import load_dotenv
 
+from topic_store import get_store
+
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    print("⚠️  Please set OPENAI_API_KEY in your .env")
-    exit(1)
-
-openai.api_key = OPENAI_API_KEY
 
 def generate_script(topic: str, fast: bool = False) -> str:
     """
@@ -40,36 +36,38 @@ def generate_script(topic: str, fast: bool = False) -> str:
     if fast:
         params["max_tokens"] = 300  # example: shorter scripts in fast mode
 
+    import openai
+    openai.api_key = OPENAI_API_KEY
     resp = openai.chat.completions.create(**params)
     # pick the first choice:
     return resp.choices[0].message["content"]
 
 def main(fast: bool):
-    src_root  = Path("trending_topics")
+    if not OPENAI_API_KEY:
+        print("⚠️  Please set OPENAI_API_KEY in your .env")
+        return
+
     out_root  = Path("video_scripts")
     out_root.mkdir(exist_ok=True)
 
-    for niche_dir in src_root.iterdir():
-        if not niche_dir.is_dir():
-            continue
-        for txt_file in sorted(niche_dir.glob("*.txt")):
-            topic = txt_file.read_text(encoding="utf-8", errors="ignore").strip()
-            short_name = f"{niche_dir.name}__{txt_file.stem}"
-            print(f"✍️  Generating script for {short_name}…", end=" ")
+    # One indexed query instead of walking trending_topics/ file by file.
+    for topic in get_store().select_topics(status=None):
+        short_name = f"{topic['niche']}__{topic['topic_key']}"
+        print(f"✍️  Generating script for {short_name}…", end=" ")
 
-            try:
-                script = generate_script(topic, fast=fast)
-                out_path = out_root / f"{short_name}.md"
-                out_path.write_text(script, encoding="utf-8")
-                print("✅")
-            except Exception as e:
-                print("❌\n   ", e)
+        try:
+            script = generate_script(topic["title"], fast=fast)
+            out_path = out_root / f"{short_name}.md"
+            out_path.write_text(script, encoding="utf-8")
+            print("✅")
+        except Exception as e:
+            print("❌\n   ", e)
 
     print("\n🏁 All done. Scripts are in:", out_root)
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser(
-        description="Generate video scripts from trending-topic .txt files"
+        description="Generate video scripts for every topic in the topic store"
     )
     p.add_argument(
         "--fast", action="store_true",
@@ -1,10 +1,8 @@
-import feedparser
-
-import feedparser
+from http_cache import parse_feed
 
 def fetch_google_news_titles():
     rss_url = "https://news.google.com/rss?hl=en-US&gl=US&ceid=US:en"
-    feed = feedparser.parse(rss_url)
+    feed = parse_feed(rss_url)
 
     titles = []
     for entry in feed.entries[:10]:
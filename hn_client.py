@@ -0,0 +1,112 @@
+"""
+Batched Hacker News client.
+
+Item lookups run concurrently over one pooled keep-alive session, and every
+item fetched is remembered in an on-disk cache keyed by story id (item titles
+never change), so repeat runs only hit the network for ids not seen before.
+"""
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import http_client
+
+HN_API = "https://hacker-news.firebaseio.com/v0"
+CACHE_DIR = "cache"
+ITEM_CACHE_FILE = os.path.join(CACHE_DIR, "hn_items.json")
+MAX_WORKERS = 16
+BATCH_SIZE = 32
+REQUEST_TIMEOUT = (5, 10)  # (connect, read) seconds
+
+
+class HackerNewsClient:
+    def __init__(self, cache_file=ITEM_CACHE_FILE, max_workers=MAX_WORKERS):
+        self.cache_file = cache_file
+        self.max_workers = max_workers
+        self.http = http_client.get_client()
+        self.items = self._load_cache()
+        self._dirty = False
+        self.fetched = 0
+        self.cache_hits = 0
+
+    def _load_cache(self):
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ Ignoring unreadable HN cache {self.cache_file}: {e}")
+        return {}
+
+    def save_cache(self):
+        """Persist the item cache if anything new was fetched."""
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        tmp_path = self.cache_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.items, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_file)
+        self._dirty = False
+
+    def top_story_ids(self, limit=100):
+        response = self.http.get(f"{HN_API}/topstories.json", timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.json()[:limit]
+
+    def _fetch_item(self, story_id):
+        try:
+            response = self.http.get(f"{HN_API}/item/{story_id}.json", timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            return story_id, response.json(), True
+        except (requests.RequestException, ValueError) as e:
+            print(f"⚠️ HN item {story_id} fetch failed: {e}")
+            return story_id, None, False
+
+    def get_titles(self, story_ids, executor):
+        """Return {story_id: title or None}, fetching only uncached ids."""
+        titles = {}
+        missing = []
+        for story_id in story_ids:
+            key = str(story_id)
+            if key in self.items:
+                titles[story_id] = self.items[key]
+                self.cache_hits += 1
+            else:
+                missing.append(story_id)
+        for story_id, item, ok in executor.map(self._fetch_item, missing):
+            if not ok:
+                # Network failure: don't cache, try again next run.
+                titles[story_id] = None
+                continue
+            title = (item or {}).get("title")
+            self.items[str(story_id)] = title
+            self._dirty = True
+            self.fetched += 1
+            titles[story_id] = title
+        return titles
+
+    def find_titles(self, predicate, limit, scan=100):
+        """
+        Walk the top `scan` stories in rank order and return up to `limit`
+        titles for which `predicate(title)` is true. Items are fetched in
+        concurrent batches and the walk stops as soon as `limit` is reached.
+        """
+        story_ids = self.top_story_ids(scan)
+        matches = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for start in range(0, len(story_ids), BATCH_SIZE):
+                batch = story_ids[start:start + BATCH_SIZE]
+                titles = self.get_titles(batch, executor)
+                for story_id in batch:
+                    title = titles.get(story_id)
+                    if title and predicate(title):
+                        matches.append(title)
+                        if len(matches) >= limit:
+                            break
+                if len(matches) >= limit:
+                    break
+        self.save_cache()
+        return matches
@@ -0,0 +1,247 @@
+"""
+Shared on-disk HTTP cache for the RSS and JSON fetchers.
+
+Responses are stored under cache/http/ and revalidated with conditional GETs:
+a stored ETag is sent back as If-None-Match and a stored Last-Modified as
+If-Modified-Since, so an unchanged feed costs a bodiless 304. Freshness comes
+from Cache-Control (max-age / no-cache / no-store) and falls back to a
+configurable TTL; while an entry is fresh no request is made at all.
+
+The cache is bounded by total body size and evicts least recently used
+entries first. Feedparser-based fetchers can call parse_feed() in place of
+feedparser.parse(url).
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+
+import requests
+import feedparser
+
+import http_client
+
+CACHE_DIR = os.getenv("HTTP_CACHE_DIR", os.path.join("cache", "http"))
+DEFAULT_TTL = int(os.getenv("HTTP_CACHE_TTL", "900"))                  # seconds
+MAX_CACHE_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+REQUEST_TIMEOUT = (5, 15)  # (connect, read) seconds; retries/backoff come from http_client
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+class CachedResponse:
+    """The parts of a response the fetchers use, whether it came from disk or not."""
+
+    def __init__(self, url, status_code, content, headers, from_cache=False, revalidated=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.from_cache = from_cache
+        self.revalidated = revalidated
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error for {self.url}")
+
+
+def _parse_cache_control(value):
+    directives = {}
+    for part in (value or "").split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        name, _, arg = part.partition("=")
+        directives[name.strip()] = arg.strip().strip('"')
+    return directives
+
+
+class HTTPCache:
+    def __init__(self, cache_dir=CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=MAX_CACHE_BYTES, client=None):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.client = client or http_client.get_client()
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self._lock = threading.Lock()
+        self.index = self._load_index()
+        self.stats = {"fresh": 0, "not_modified": 0, "downloaded": 0, "stale_served": 0, "errors": 0,
+                      "bytes_downloaded": 0, "bytes_saved": 0}
+
+    # ---------- index bookkeeping ----------
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ Resetting unreadable HTTP cache index: {e}")
+        return {}
+
+    def _save_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, key + ".body")
+
+    def _read_body(self, key):
+        try:
+            with open(self._body_path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        total = sum(entry["size"] for entry in self.index.values())
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(self.index.items(), key=lambda kv: kv[1]["last_access"]):
+            try:
+                os.remove(self._body_path(key))
+            except OSError:
+                pass
+            total -= entry["size"]
+            del self.index[key]
+            if total <= self.max_bytes:
+                break
+
+    def _expires_at(self, headers, ttl, now):
+        directives = _parse_cache_control(headers.get("Cache-Control"))
+        if "no-cache" in directives:
+            return now
+        if ttl is not None:
+            return now + ttl
+        for name in ("s-maxage", "max-age"):
+            if re.fullmatch(r"\d+", directives.get(name, "")):
+                return now + int(directives[name])
+        return now + self.ttl
+
+    # ---------- public API ----------
+
+    def get(self, url, headers=None, ttl=None, timeout=REQUEST_TIMEOUT):
+        """
+        GET `url` through the cache. `ttl` (seconds) overrides the server's
+        freshness lifetime. Serves a stale copy if the network request fails.
+        """
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        now = time.time()
+        with self._lock:
+            entry = self.index.get(key)
+        body = self._read_body(key) if entry else None
+        if entry and body is None:
+            entry = None
+
+        if entry and now < entry["expires_at"]:
+            with self._lock:
+                entry["last_access"] = now
+                self.stats["fresh"] += 1
+                self.stats["bytes_saved"] += entry["size"]
+            return CachedResponse(url, entry["status"], body, entry["headers"], from_cache=True)
+
+        request_headers = dict(HEADERS, **(headers or {}))
+        if entry:
+            if entry["headers"].get("ETag"):
+                request_headers["If-None-Match"] = entry["headers"]["ETag"]
+            if entry["headers"].get("Last-Modified"):
+                request_headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+
+        try:
+            response = self.client.get(url, headers=request_headers, timeout=timeout)
+        except requests.RequestException:
+            with self._lock:
+                self.stats["errors"] += 1
+                if entry:
+                    self.stats["stale_served"] += 1
+            if entry:
+                print(f"⚠️ Network error, serving stale cache for {url}")
+                return CachedResponse(url, entry["status"], body, entry["headers"], from_cache=True)
+            raise
+
+        if response.status_code >= 500 and entry:
+            with self._lock:
+                self.stats["errors"] += 1
+                self.stats["stale_served"] += 1
+            print(f"⚠️ Server error {response.status_code}, serving stale cache for {url}")
+            return CachedResponse(url, entry["status"], body, entry["headers"], from_cache=True)
+
+        with self._lock:
+            if response.status_code == 304 and entry:
+                entry["expires_at"] = self._expires_at(response.headers, ttl, now)
+                entry["last_access"] = now
+                self.stats["not_modified"] += 1
+                self.stats["bytes_saved"] += entry["size"]
+                self._save_index()
+                return CachedResponse(url, entry["status"], body, entry["headers"],
+                                      from_cache=True, revalidated=True)
+
+            self.stats["downloaded"] += 1
+            self.stats["bytes_downloaded"] += len(response.content)
+            directives = _parse_cache_control(response.headers.get("Cache-Control"))
+            kept_headers = {name: response.headers[name]
+                            for name in ("ETag", "Last-Modified", "Content-Type", "Cache-Control")
+                            if name in response.headers}
+            if response.status_code == 200 and "no-store" not in directives:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(self._body_path(key), "wb") as f:
+                    f.write(response.content)
+                self.index[key] = {
+                    "status": response.status_code,
+                    "headers": kept_headers,
+                    "size": len(response.content),
+                    "expires_at": self._expires_at(response.headers, ttl, now),
+                    "last_access": now,
+                }
+                self._evict()
+                self._save_index()
+        return CachedResponse(url, response.status_code, response.content, kept_headers)
+
+    def print_stats(self):
+        s = self.stats
+        print(f"🗄️ HTTP cache: {s['fresh']} fresh, {s['not_modified']} revalidated (304), "
+              f"{s['downloaded']} downloaded, {s['stale_served']} stale, {s['errors']} errors; "
+              f"{s['bytes_downloaded'] / 1024:.0f} KiB downloaded, {s['bytes_saved'] / 1024:.0f} KiB saved")
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide cache shared by all fetchers."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = HTTPCache()
+        return _default_cache
+
+
+def cached_get(url, headers=None, ttl=None, timeout=REQUEST_TIMEOUT):
+    """GET through the shared cache; returns a CachedResponse."""
+    return get_cache().get(url, headers=headers, ttl=ttl, timeout=timeout)
+
+
+def parse_feed(url, ttl=None):
+    """
+    Drop-in for feedparser.parse(url) that goes through the shared cache.
+    Like feedparser, network failures yield an empty feed rather than raising.
+    """
+    try:
+        response = cached_get(url, ttl=ttl)
+    except requests.RequestException as e:
+        print(f"⚠️ Feed fetch failed for {url}: {e}")
+        return feedparser.parse(b"")
+    return feedparser.parse(response.content)
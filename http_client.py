@@ -0,0 +1,216 @@
+"""
+Shared pooled HTTP client.
+
+One requests.Session (keep-alive connection pools) for every fetcher, with:
+
+- default connect/read timeouts, so a slow host can't stall the pipeline,
+- a token-bucket rate limit per host,
+- jittered exponential backoff on 429/5xx and connection errors
+  (Retry-After is honoured when the server sends one),
+- per-host latency and error counters, printable at the end of a run.
+
+Use the module-level get()/post() helpers, or get_client() for the shared
+HTTPClient instance.
+"""
+import time
+import random
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ---------- CONFIGURATION ----------
+DEFAULT_TIMEOUT = (5, 30)          # (connect, read) seconds
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5                 # seconds; doubled on every attempt
+BACKOFF_MAX = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# A POST may already have been acted on after a 5xx/connection error, so only
+# retry it when the server clearly refused it.
+POST_RETRY_STATUSES = {429, 503}
+POOL_CONNECTIONS = 16              # distinct hosts kept pooled
+POOL_MAXSIZE = 32                  # connections per host
+
+# Per-host token buckets: (requests per second, burst size).
+HOST_RATE_LIMITS = {
+    "www.reddit.com": (1.0, 2),
+    "newsdata.io": (0.5, 2),
+    "news.google.com": (5.0, 10),
+    "hacker-news.firebaseio.com": (50.0, 50),
+    "api.pexels.com": (2.0, 4),
+}
+DEFAULT_RATE_LIMIT = (10.0, 10)
+UNLIMITED_HOSTS = {"localhost", "127.0.0.1", "::1"}
+# -----------------------------------
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "errors": self.errors,
+            "avg_latency": self.total_latency / self.requests if self.requests else 0.0,
+            "max_latency": self.max_latency,
+        }
+
+
+def _retry_after(response):
+    """Seconds the server asked us to wait, capped at BACKOFF_MAX."""
+    value = response.headers.get("Retry-After", "")
+    return min(float(value), BACKOFF_MAX) if value.isdigit() else None
+
+
+class HTTPClient:
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_retries=MAX_RETRIES, rate_limits=None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.rate_limits = dict(HOST_RATE_LIMITS, **(rate_limits or {}))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._buckets = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _host_state(self, host):
+        with self._lock:
+            if host not in self._stats:
+                self._stats[host] = HostStats()
+                if host not in UNLIMITED_HOSTS:
+                    self._buckets[host] = TokenBucket(*self.rate_limits.get(host, DEFAULT_RATE_LIMIT))
+            return self._buckets.get(host), self._stats[host]
+
+    def request(self, method, url, timeout=None, retries=None, **kwargs):
+        """
+        Send a request with rate limiting, timeouts and retry/backoff.
+        Returns the final requests.Response; raises the last exception if
+        every attempt failed at the connection level.
+        """
+        host = urlsplit(url).hostname or ""
+        bucket, stats = self._host_state(host)
+        retries = self.max_retries if retries is None else retries
+        idempotent = method.upper() in ("GET", "HEAD")
+        retry_statuses = RETRY_STATUSES if idempotent else POST_RETRY_STATUSES
+        kwargs["timeout"] = timeout or self.timeout
+
+        for attempt in range(retries + 1):
+            if bucket:
+                bucket.acquire()
+            started = time.monotonic()
+            response = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+                error = None
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            elapsed = time.monotonic() - started
+            with self._lock:
+                stats.requests += 1
+                stats.total_latency += elapsed
+                stats.max_latency = max(stats.max_latency, elapsed)
+
+            if error is not None:
+                retryable = idempotent
+            else:
+                retryable = response.status_code in retry_statuses
+            if not retryable or attempt == retries:
+                if error is not None or response.status_code >= 400:
+                    with self._lock:
+                        stats.errors += 1
+                if error is not None:
+                    raise error
+                return response
+
+            delay = None
+            if response is not None:
+                delay = _retry_after(response)
+                # Hand the connection back to the pool before sleeping on it.
+                response.close()
+            if delay is None:
+                delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+            with self._lock:
+                stats.retries += 1
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get_stats(self):
+        """Return {host: {requests, retries, errors, avg_latency, max_latency}}."""
+        with self._lock:
+            return {host: stats.as_dict() for host, stats in self._stats.items()}
+
+    def print_stats(self):
+        stats = self.get_stats()
+        if not stats:
+            return
+        print("\n🌐 HTTP hosts")
+        print(f"  {'host':<32} {'reqs':>5} {'retry':>5} {'err':>4} {'avg s':>6} {'max s':>6}")
+        for host, s in sorted(stats.items(), key=lambda kv: -kv[1]["requests"]):
+            print(f"  {host[:32]:<32} {s['requests']:>5} {s['retries']:>5} {s['errors']:>4} "
+                  f"{s['avg_latency']:>6.2f} {s['max_latency']:>6.2f}")
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide client shared by all fetchers."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HTTPClient()
+        return _default_client
+
+
+def get(url, **kwargs):
+    return get_client().get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return get_client().post(url, **kwargs)
+
+
+def get_stats():
+    return get_client().get_stats()
+
+
+def print_stats():
+    get_client().print_stats()
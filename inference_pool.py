@@ -0,0 +1,233 @@
+"""
+Multi-core replica pool for local CPU inference.
+
+One PyTorch process stops scaling after a handful of intra-op threads. The
+pool loads the model once in the parent and forks N replicas. Each replica
+gets its own slice of cores (sched_setaffinity) and a pinned
+torch.set_num_threads(). The parent hands each replica one headline at a
+time through its own inbox and sends the next as soon as it answers, so the
+work spreads across replicas as they free up and the parent always knows
+which prompt a replica holds (and can fail it if the replica dies).
+
+The weights are not copied: forked children share the parent's tensor
+pages copy-on-write, and inference never writes to them. gc.freeze() keeps
+the collector from touching (and so copying) the parent's object pages.
+memory() reports the summed PSS (shared pages split between the processes
+using them) next to RSS to show it.
+
+Fork the pool before the parent runs any inference itself: a forked child
+can't reuse the parent's OpenMP thread pool. Linux only (fork +
+/proc/<pid>/smaps_rollup).
+
+Usage:
+    python inference_pool.py [--replicas 4] [--threads 2]   # generate BENCH_TITLES
+    python inference_pool.py bench [--titles 8]             # sweep replicas x threads
+"""
+import os
+import gc
+import sys
+import time
+import queue
+import argparse
+from collections import deque
+import multiprocessing as mp
+
+# ---------- CONFIGURATION ----------
+MODEL_NAME = "EleutherAI/gpt-neo-1.3B"
+POLL_SECONDS = 1.0    # how often map() checks that the replicas are still alive
+# -----------------------------------
+
+_generator = None   # set in the parent before forking; inherited by the replicas
+
+
+def _replica_main(index, threads, cpus, tasks, results):
+    import torch
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    torch.set_num_threads(threads)
+    from local_script_generator import generate_script, PrefixCache
+    prefix_cache = None
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        batch, position, prompt, kwargs = task
+        if kwargs.get("prefix"):
+            # Each replica keeps its own cached preamble.
+            prefix_cache = prefix_cache or PrefixCache(_generator)
+            kwargs = dict(kwargs, prefix_cache=prefix_cache)
+        try:
+            results.put((batch, position, index, generate_script(prompt, _generator, **kwargs), None))
+        except Exception as e:
+            results.put((batch, position, index, None, f"{type(e).__name__}: {e}"))
+
+
+def _memory_kb(pid):
+    """(rss, pss) in kB from /proc/<pid>/smaps_rollup, or (0, 0) if unavailable."""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Rss", "Pss"):
+                    values[key] = int(rest.split()[0])
+    except OSError:
+        pass
+    return values.get("Rss", 0), values.get("Pss", 0)
+
+
+class ReplicaPool:
+    def __init__(self, generator, replicas=None, threads_per_replica=None, pin=True):
+        global _generator
+        cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        self.replicas = replicas or max(1, len(cpus) // (threads_per_replica or 1))
+        self.threads = threads_per_replica or max(1, len(cpus) // self.replicas)
+
+        generator.model.eval()
+        _generator = generator
+        gc.collect()
+        gc.freeze()
+
+        ctx = mp.get_context("fork")
+        self._inboxes = [ctx.Queue() for _ in range(self.replicas)]
+        self._results = ctx.Queue()
+        self._processes = []
+        for index in range(self.replicas):
+            pinned = [cpus[(index * self.threads + k) % len(cpus)] for k in range(self.threads)] if pin else None
+            process = ctx.Process(target=_replica_main, name=f"replica-{index}", daemon=True,
+                                  args=(index, self.threads, pinned, self._inboxes[index], self._results))
+            process.start()
+            self._processes.append(process)
+        self.per_replica = [0] * self.replicas
+        self._dead = set()
+        self._batch = 0     # tags results so a late answer from an earlier map() is ignored
+
+    def map(self, prompts, **kwargs):
+        """
+        Scripts for `prompts`, in order (None where generation failed).
+        A replica that dies fails the prompt it was working on; prompts not
+        yet handed out go to the replicas still alive, and fail only if none
+        are left.
+        """
+        self._batch += 1
+        todo = deque(enumerate(prompts))
+        scripts = [None] * len(prompts)
+        assigned = {}   # replica index -> position it is working on
+        self._dispatch(todo, assigned, kwargs)
+        while assigned:
+            try:
+                batch, position, replica, script, error = self._results.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                self._reap(assigned)
+                self._dispatch(todo, assigned, kwargs)
+                continue
+            if batch != self._batch or assigned.get(replica) != position:
+                continue
+            del assigned[replica]
+            self.per_replica[replica] += 1
+            if error:
+                print(f"❌ Replica {replica} failed on prompt {position}: {error}")
+            scripts[position] = script
+            self._reap(assigned)
+            self._dispatch(todo, assigned, kwargs)
+        if todo:
+            print(f"❌ No replicas left; {len(todo)} prompts not generated")
+        return scripts
+
+    def _dispatch(self, todo, assigned, kwargs):
+        """Give the next prompt to every live replica that is idle."""
+        for index, inbox in enumerate(self._inboxes):
+            if todo and index not in assigned and index not in self._dead:
+                position, prompt = todo.popleft()
+                assigned[index] = position
+                inbox.put((self._batch, position, prompt, kwargs))
+
+    def _reap(self, assigned):
+        """Fail the prompts held by replicas that have died."""
+        for index, process in enumerate(self._processes):
+            if index in self._dead or process.is_alive():
+                continue
+            self._dead.add(index)
+            position = assigned.pop(index, None)
+            print(f"❌ Replica {index} died (exit code {process.exitcode})"
+                  + (f" on prompt {position}" if position is not None else ""))
+
+    def memory(self):
+        """Resident and proportional memory (MB) of the parent plus all replicas."""
+        pids = [os.getpid()] + [p.pid for p in self._processes]
+        rss, pss = zip(*(_memory_kb(pid) for pid in pids))
+        return {"rss_mb": round(sum(rss) / 1024), "pss_mb": round(sum(pss) / 1024),
+                "parent_rss_mb": round(rss[0] / 1024)}
+
+    def close(self):
+        for inbox in self._inboxes:
+            inbox.put(None)
+        for process in self._processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        gc.unfreeze()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def sweep_configs(cores):
+    """(replicas, threads) pairs with powers of two and replicas * threads <= cores."""
+    powers = [1 << k for k in range(cores.bit_length()) if 1 << k <= cores]
+    return [(r, t) for r in powers for t in powers if r * t <= cores]
+
+
+def benchmark(generator, titles, configs=None, max_length=300):
+    from batch_script_generator import PROMPT_TEMPLATE
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    prompts = [PROMPT_TEMPLATE.format(title=title) for title in titles]
+    print(f"📊 {len(prompts)} headlines on {cores} cores\n")
+    print(f"  {'replicas':>8} {'threads':>7} {'seconds':>8} {'scripts/min':>11} {'RSS MB':>8} {'PSS MB':>8}")
+    report = []
+    for replicas, threads in configs or sweep_configs(cores):
+        with ReplicaPool(generator, replicas, threads) as pool:
+            started = time.perf_counter()
+            pool.map(prompts, max_length=max_length)
+            elapsed = time.perf_counter() - started
+            memory = pool.memory()
+        row = {"replicas": replicas, "threads": threads, "seconds": round(elapsed, 1),
+               "scripts_per_min": round(len(prompts) / elapsed * 60, 2), **memory}
+        report.append(row)
+        print(f"  {replicas:>8} {threads:>7} {row['seconds']:>8} {row['scripts_per_min']:>11} "
+              f"{memory['rss_mb']:>8} {memory['pss_mb']:>8}")
+    return report
+
+
+def main(argv=None):
+    from local_script_generator import load_local_model, BENCH_TITLES
+
+    parser = argparse.ArgumentParser(description="Generate scripts on a pool of forked model replicas.")
+    parser.add_argument("command", nargs="?", choices=["generate", "bench"], default="generate")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--replicas", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=None, help="intra-op threads per replica")
+    parser.add_argument("--precision", choices=["fp32", "int8", "bf16"], default=None)
+    parser.add_argument("--titles", type=int, default=len(BENCH_TITLES))
+    args = parser.parse_args(argv)
+
+    titles = BENCH_TITLES[:args.titles]
+    generator = load_local_model(args.model, args.precision)
+    if args.command == "bench":
+        benchmark(generator, titles)
+        return
+
+    from batch_script_generator import PROMPT_TEMPLATE
+    with ReplicaPool(generator, args.replicas, args.threads) as pool:
+        print(f"🚀 {pool.replicas} replicas x {pool.threads} threads")
+        scripts = pool.map([PROMPT_TEMPLATE.format(title=title) for title in titles])
+        print(f"📊 Scripts per replica: {pool.per_replica}; memory {pool.memory()}")
+    for title, script in zip(titles, scripts):
+        print(f"\n📌 {title}\n{(script or '').split('Begin now:')[-1].strip()}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
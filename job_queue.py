@@ -0,0 +1,390 @@
+"""
+Durable job queue for script and render workers.
+
+Jobs live in an SQLite database (jobs.db, or $JOB_DB) that any number of
+worker processes can share, on one machine or several mounting the same
+file. The database must sit on a filesystem with working POSIX locks; SQLite
+over a network share without them is not safe.
+
+Each job is one topic for one queue ("script" or "render") and moves through
+
+    queued -> leased -> done
+                     -> queued (retry, after a backoff)  -> ... -> dead
+
+A worker claims a job in a single IMMEDIATE transaction, so two workers can
+never lease the same job. The lease lasts LEASE_SECONDS and is renewed by a
+heartbeat thread while the job runs. If a worker crashes or loses its
+machine, its lease expires and the job goes back to another worker. Every
+claim counts as an attempt. After MAX_ATTEMPTS the job is moved to the
+dead-letter list with its last error, where `retry-dead` can requeue it.
+
+Jobs run through the incremental Pipeline (pipeline.py), so a retried or
+re-enqueued topic only rebuilds what is missing or stale.
+
+Usage:
+    python job_queue.py enqueue script|render [--niche ai] [--new] [--limit N] [--force]
+    python job_queue.py work script|render [--drain] [--engine textgen|local]
+    python job_queue.py stats
+    python job_queue.py dead [script|render]
+    python job_queue.py retry-dead script|render
+"""
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+from dataclasses import dataclass
+
+# ---------- CONFIGURATION ----------
+DB_FILE = os.getenv("JOB_DB", "jobs.db")
+LEASE_SECONDS = 300
+HEARTBEAT_SECONDS = 60
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 30          # doubled after every failed attempt
+POLL_SECONDS = 5
+# Pipeline stage each queue brings its topics up to.
+QUEUE_STAGES = {"script": "script", "render": "video"}
+# -----------------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            INTEGER PRIMARY KEY,
+    queue         TEXT NOT NULL,
+    key           TEXT NOT NULL,
+    payload       TEXT NOT NULL,
+    state         TEXT NOT NULL DEFAULT 'queued',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    max_attempts  INTEGER NOT NULL,
+    available_at  REAL NOT NULL,
+    lease_owner   TEXT,
+    lease_expires REAL,
+    last_error    TEXT,
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL,
+    UNIQUE (queue, key)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (queue, state, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs (queue, state, lease_expires);
+"""
+
+
+class LeaseLost(Exception):
+    """The job's lease expired and another worker may now own it."""
+
+
+@dataclass
+class Job:
+    id: int
+    queue: str
+    key: str
+    payload: dict
+    attempts: int
+    max_attempts: int
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        # Autocommit mode: claim() manages its own IMMEDIATE transaction.
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self.conn.executescript(SCHEMA)
+
+    def enqueue(self, queue, items, max_attempts=MAX_ATTEMPTS, force=False):
+        """
+        Add (key, payload) pairs to `queue`. A key already in the queue is
+        left alone unless `force`, which resets finished and dead jobs to
+        queued (leased ones keep running). Returns jobs added or reset.
+        """
+        now = time.time()
+        rows = [(queue, key, json.dumps(payload), max_attempts, now, now, now) for key, payload in items]
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self.conn.total_changes
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO jobs (queue, key, payload, max_attempts, available_at, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                if force:
+                    self.conn.executemany(
+                        "UPDATE jobs SET state = 'queued', attempts = 0, available_at = ?, last_error = NULL, "
+                        "max_attempts = ?, updated_at = ? WHERE queue = ? AND key = ? AND state IN ('done', 'dead')",
+                        [(now, max_attempts, now, queue, key) for key, _ in items])
+                changed = self.conn.total_changes - before
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return changed
+
+    def claim(self, queue, owner, lease_seconds=LEASE_SECONDS):
+        """
+        Lease the next ready job: a queued one past its backoff, or one whose
+        previous lease expired. Returns a Job or None if nothing is ready.
+        """
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                job = self._claim_locked(queue, owner, lease_seconds, time.time())
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return job
+
+    def _claim_locked(self, queue, owner, lease_seconds, now):
+        while True:
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE queue = ? AND ("
+                "(state = 'queued' AND available_at <= ?) OR (state = 'leased' AND lease_expires < ?)"
+                ") ORDER BY available_at, id LIMIT 1", (queue, now, now)).fetchone()
+            if row is None:
+                return None
+            if row["state"] == "leased" and row["attempts"] >= row["max_attempts"]:
+                # Its last worker died mid-job on the final attempt.
+                self.conn.execute(
+                    "UPDATE jobs SET state = 'dead', lease_owner = NULL, lease_expires = NULL, "
+                    "last_error = ?, updated_at = ? WHERE id = ?",
+                    (f"lease expired (worker {row['lease_owner']})", now, row["id"]))
+                continue
+            self.conn.execute(
+                "UPDATE jobs SET state = 'leased', attempts = attempts + 1, lease_owner = ?, "
+                "lease_expires = ?, updated_at = ? WHERE id = ?",
+                (owner, now + lease_seconds, now, row["id"]))
+            return Job(row["id"], row["queue"], row["key"], json.loads(row["payload"]),
+                       row["attempts"] + 1, row["max_attempts"])
+
+    def _update_leased(self, job, owner, sql, params):
+        """Run an UPDATE guarded by the lease; raises LeaseLost if it isn't ours any more."""
+        with self._lock:
+            cursor = self.conn.execute(
+                sql + " WHERE id = ? AND state = 'leased' AND lease_owner = ?", params + (job.id, owner))
+        if cursor.rowcount != 1:
+            raise LeaseLost(f"job {job.id} ({job.queue}:{job.key}) is no longer leased by {owner}")
+
+    def heartbeat(self, job, owner, lease_seconds=LEASE_SECONDS):
+        now = time.time()
+        self._update_leased(job, owner, "UPDATE jobs SET lease_expires = ?, updated_at = ?",
+                            (now + lease_seconds, now))
+
+    def complete(self, job, owner):
+        self._update_leased(job, owner,
+                            "UPDATE jobs SET state = 'done', lease_owner = NULL, lease_expires = NULL, "
+                            "last_error = NULL, updated_at = ?", (time.time(),))
+
+    def fail(self, job, owner, error):
+        """Requeue with exponential backoff, or dead-letter after the last attempt."""
+        now = time.time()
+        if job.attempts >= job.max_attempts:
+            state, available_at = "dead", now
+        else:
+            state, available_at = "queued", now + RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+        self._update_leased(job, owner,
+                            "UPDATE jobs SET state = ?, available_at = ?, lease_owner = NULL, "
+                            "lease_expires = NULL, last_error = ?, updated_at = ?",
+                            (state, available_at, str(error)[:2000], now))
+        return state
+
+    def stats(self):
+        """{queue: {state: count}}, with expired leases counted as 'expired'."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT queue, CASE WHEN state = 'leased' AND lease_expires < ? THEN 'expired' ELSE state END, "
+                "COUNT(*) FROM jobs GROUP BY 1, 2", (time.time(),)).fetchall()
+        result = {}
+        for queue, state, count in rows:
+            result.setdefault(queue, {})[state] = count
+        return result
+
+    def dead_letters(self, queue=None):
+        sql, params = "SELECT * FROM jobs WHERE state = 'dead'", ()
+        if queue is not None:
+            sql, params = sql + " AND queue = ?", (queue,)
+        with self._lock:
+            rows = self.conn.execute(sql + " ORDER BY updated_at", params).fetchall()
+        return [dict(row, payload=json.loads(row["payload"])) for row in rows]
+
+    def retry_dead(self, queue):
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET state = 'queued', attempts = 0, available_at = ?, updated_at = ? "
+                "WHERE queue = ? AND state = 'dead'", (now, now, queue))
+        return cursor.rowcount
+
+    def close(self):
+        self.conn.close()
+
+
+class _Heartbeat(threading.Thread):
+    """Renews a job's lease until stopped; records the loss if it can't."""
+
+    def __init__(self, queue, job, owner, lease_seconds, interval):
+        super().__init__(daemon=True, name=f"heartbeat-{job.id}")
+        self.queue, self.job, self.owner = queue, job, owner
+        self.lease_seconds, self.interval = lease_seconds, interval
+        self.stopped = threading.Event()
+        self.lost = None
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.queue.heartbeat(self.job, self.owner, self.lease_seconds)
+            except LeaseLost as e:
+                self.lost = e
+                return
+            except sqlite3.Error as e:
+                # Transient (e.g. database busy); the lease has slack until the next beat.
+                print(f"⚠️ Heartbeat for job {self.job.id} failed: {e}")
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_worker(queue, name, handler, owner=None, drain=False, lease_seconds=LEASE_SECONDS,
+               heartbeat_seconds=HEARTBEAT_SECONDS, poll_seconds=POLL_SECONDS):
+    """
+    Claim and run jobs from queue `name` until interrupted (or, with `drain`,
+    until none are ready). `handler(job)` raises to fail the job.
+    Returns {"done": n, "failed": n, "dead": n, "lost": n}.
+    """
+    owner = owner or worker_id()
+    counts = {"done": 0, "failed": 0, "dead": 0, "lost": 0}
+    print(f"👷 Worker {owner} on '{name}' queue ({queue.path})")
+    try:
+        while True:
+            job = queue.claim(name, owner, lease_seconds)
+            if job is None:
+                if drain:
+                    break
+                time.sleep(poll_seconds)
+                continue
+            print(f"▶️ Job {job.id} {job.key} (attempt {job.attempts}/{job.max_attempts})")
+            beat = _Heartbeat(queue, job, owner, lease_seconds, heartbeat_seconds)
+            beat.start()
+            error = None
+            try:
+                handler(job)
+            except Exception as e:
+                error = e
+            finally:
+                beat.stop()
+            try:
+                if beat.lost is not None:
+                    raise beat.lost
+                if error is None:
+                    queue.complete(job, owner)
+                    counts["done"] += 1
+                    print(f"✅ Job {job.id} done")
+                else:
+                    state = queue.fail(job, owner, error)
+                    counts["dead" if state == "dead" else "failed"] += 1
+                    print(f"❌ Job {job.id} failed: {error}" + (" (dead-lettered)" if state == "dead" else ""))
+            except LeaseLost as e:
+                # Another worker may already be redoing it; don't overwrite its state.
+                counts["lost"] += 1
+                print(f"⚠️ {e}")
+    except KeyboardInterrupt:
+        # The current job's lease simply expires and another worker picks it up.
+        print("\n🛑 Worker stopped")
+    return counts
+
+
+# ---------- topic jobs ----------
+
+def topic_jobs(niches, status=None, limit=None):
+    from topic_store import get_store
+    store = get_store()
+    for niche in niches:
+        for topic in store.select_topics(niche, status=status, limit=limit):
+            yield f"{topic['niche']}/{topic['topic_key']}", {"topic_id": topic["id"]}
+
+
+def pipeline_handler(name, script_engine="textgen"):
+    """Handler bringing a job's topic up to its queue's stage through the Pipeline."""
+    from pipeline import Pipeline
+    from topic_store import get_store
+    pipeline = Pipeline(until=QUEUE_STAGES[name], script_engine=script_engine)
+
+    def handle(job):
+        topic = get_store().get_topic(job.payload["topic_id"])
+        if topic is None:
+            raise ValueError(f"topic {job.payload['topic_id']} no longer exists")
+        failed_before = {stage: c["failed"] for stage, c in pipeline.counts.items()}
+        try:
+            ok = pipeline.run_topic(topic)
+        finally:
+            pipeline.manifest.save()
+        if not ok:
+            stage = next(s for s, c in pipeline.counts.items() if c["failed"] > failed_before[s])
+            raise RuntimeError(f"{stage} stage failed for '{topic['title']}'")
+    return handle
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Durable script/render job queue.")
+    sub = parser.add_subparsers(dest="command", metavar="command")
+
+    enqueue = sub.add_parser("enqueue", help="queue topics for a script or render queue")
+    enqueue.add_argument("queue", choices=sorted(QUEUE_STAGES))
+    enqueue.add_argument("--niche", action="append")
+    enqueue.add_argument("--new", action="store_true", help="only topics not yet scripted")
+    enqueue.add_argument("--limit", type=int, default=None, help="topics per niche")
+    enqueue.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+    enqueue.add_argument("--force", action="store_true", help="requeue topics whose jobs are done or dead")
+
+    work = sub.add_parser("work", help="run a worker until interrupted")
+    work.add_argument("queue", choices=sorted(QUEUE_STAGES))
+    work.add_argument("--drain", action="store_true", help="exit once no job is ready")
+    work.add_argument("--engine", choices=["textgen", "local"], default="textgen")
+    work.add_argument("--lease", type=int, default=LEASE_SECONDS)
+
+    sub.add_parser("stats", help="job counts per queue and state")
+    dead = sub.add_parser("dead", help="list dead-lettered jobs")
+    dead.add_argument("queue", nargs="?", choices=sorted(QUEUE_STAGES))
+    retry = sub.add_parser("retry-dead", help="requeue a queue's dead-lettered jobs")
+    retry.add_argument("queue", choices=sorted(QUEUE_STAGES))
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        parser.print_help()
+        return
+    queue = JobQueue()
+    if args.command == "enqueue":
+        from generate_scripts import niches as default_niches
+        items = list(topic_jobs(args.niche or default_niches, "new" if args.new else None, args.limit))
+        added = queue.enqueue(args.queue, items, args.max_attempts, args.force)
+        print(f"✅ Queued {added} of {len(items)} topics on '{args.queue}' ({DB_FILE})")
+    elif args.command == "work":
+        counts = run_worker(queue, args.queue, pipeline_handler(args.queue, args.engine),
+                            drain=args.drain, lease_seconds=args.lease,
+                            heartbeat_seconds=max(1, args.lease // 5))
+        print(f"📊 {counts['done']} done, {counts['failed']} to retry, {counts['dead']} dead, "
+              f"{counts['lost']} leases lost")
+    elif args.command == "stats":
+        stats = queue.stats()
+        if not stats:
+            print(f"🗃️ No jobs in {DB_FILE}")
+        for name, states in sorted(stats.items()):
+            print(f"🗃️ {name}: " + ", ".join(f"{state} {count}" for state, count in sorted(states.items())))
+    elif args.command == "dead":
+        for job in queue.dead_letters(args.queue):
+            print(f"💀 {job['queue']} {job['key']} after {job['attempts']} attempts: {job['last_error']}")
+    else:
+        print(f"✅ Requeued {queue.retry_dead(args.queue)} dead jobs on '{args.queue}'")
+    queue.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
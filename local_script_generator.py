@@ -1,20 +1,145 @@
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+"""
+Local script generation with GPT-Neo (Hugging Face transformers).
+
+generate_script() runs one prompt through the text-generation pipeline.
+generate_scripts_batch() takes a list of prompts, groups them by token length
+so little padding is wasted, and generates each group in one batched
+model.generate() call (one forward pass per step for the whole group). The
+batch size defaults to what fits in available RAM (auto_batch_size).
+
+load_local_model() can load the model at reduced precision (PRECISION, or
+$LOCAL_MODEL_PRECISION):
+
+    fp32  - the full-precision checkpoint (about 5 GB for GPT-Neo 1.3B)
+    int8  - dynamic int8 quantization of every nn.Linear
+    bf16  - bfloat16 weights, on CPUs with native bf16 (avx512_bf16/amx)
+
+Converted models are cached under cache/quantized/, so only the first load
+pays for the conversion. quantization_report() compares the modes on a
+fixed set of trending_topics/ headlines: load time, weight size, tokens/s,
+perplexity and how often greedy output matches fp32.
+
+Every script prompt opens with the same scriptwriter preamble. A
+PrefixCache encodes that preamble once, keeps its past_key_values, and
+hands a copy to generate() for each headline, so only the rest of the
+prompt is encoded per script. It tracks hit rates and time-to-first-token
+with and without a cached prefix.
+
+Usage:
+    python local_script_generator.py                  # one example script
+    python local_script_generator.py bench [N] [BATCH] # tokens/s, serial vs batched
+    python local_script_generator.py quant-report [N]  # fp32 vs int8 vs bf16
+    python local_script_generator.py prefix-bench [N]  # time-to-first-token, prefix cache on/off
+"""
+import os
+import gc
+import sys
+import copy
+import json
+import time
+from collections import OrderedDict
+
+# ---------- CONFIGURATION ----------
+MAX_BATCH_SIZE = 16
+DEFAULT_BATCH_SIZE = 4           # when available RAM can't be read
+RAM_FRACTION = 0.5               # share of available RAM batches may use
+PRECISION = os.getenv("LOCAL_MODEL_PRECISION", "fp32")
+PRECISIONS = ("fp32", "int8", "bf16")
+QUANTIZED_DIR = os.path.join("cache", "quantized")
+REPORT_NEW_TOKENS = 64
+REPORT_FILE = os.path.join("cache", "quantization_report.json")
+PREFIX_CACHE_ENTRIES = 4         # distinct prefixes kept (LRU)
+BENCH_TITLES = [
+    "Tech giants announce breakthrough in quantum computing innovation.",
+    "New AI model beats doctors at reading chest X-rays",
+    "Major ransomware attack shuts down hospital network",
+    "Apple unveils its thinnest iPhone yet",
+    "Bitcoin hits record high as ETF inflows surge",
+    "SpaceX launches 60 more Starlink satellites",
+    "Researchers find critical flaw in popular VPN software",
+    "Open-source chatbot rivals commercial models on reasoning tests",
+]
+# -----------------------------------
+
+
+def cpu_supports_bf16():
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def _quantized_path(model_name, precision):
+    import torch
+    import transformers
+    safe_name = model_name.replace("/", "__")
+    if precision == "int8":
+        # The pickled module references torch and transformers classes by name.
+        return os.path.join(QUANTIZED_DIR, f"{safe_name}-int8-torch{torch.__version__}"
+                                           f"-transformers{transformers.__version__}.pt")
+    return os.path.join(QUANTIZED_DIR, f"{safe_name}-{precision}")
+
+
+def _load_model(model_name, precision):
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    if precision == "fp32":
+        return AutoModelForCausalLM.from_pretrained(model_name)
+    path = _quantized_path(model_name, precision)
+    if precision == "bf16":
+        if os.path.isdir(path):
+            return AutoModelForCausalLM.from_pretrained(path, torch_dtype=torch.bfloat16)
+        model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=torch.bfloat16)
+        tmp_path = path + ".tmp"
+        model.save_pretrained(tmp_path)
+        os.replace(tmp_path, path)
+        return model
+    if os.path.exists(path):
+        try:
+            return torch.load(path, weights_only=False)
+        except Exception as e:
+            print(f"⚠️ Could not load {path} ({type(e).__name__}: {e}); quantizing again.")
+            os.remove(path)
+    model = AutoModelForCausalLM.from_pretrained(model_name)
+    model.eval()
+    model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    os.makedirs(QUANTIZED_DIR, exist_ok=True)
+    tmp_path = path + ".tmp"
+    torch.save(model, tmp_path)
+    os.replace(tmp_path, path)
+    return model
 
-def load_local_model(model_name = "EleutherAI/gpt-neo-1.3B"):
+
+def load_local_model(model_name = "EleutherAI/gpt-neo-1.3B", precision=None):
     """
     Loads a strong text-generation model.
     Default is GPT-J 6B which is more powerful than GPT-Neo 1.3B.
+    `precision` is one of PRECISIONS (default: PRECISION).
     """
-    print(f"Loading model: {model_name}")
+    from transformers import AutoTokenizer, pipeline
+    precision = precision or PRECISION
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}")
+    if precision == "bf16" and not cpu_supports_bf16():
+        print("⚠️ This CPU has no native bf16; loading fp32 instead.")
+        precision = "fp32"
+    print(f"Loading model: {model_name} ({precision})")
     tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForCausalLM.from_pretrained(model_name)
+    model = _load_model(model_name, precision)
     print("✅ Model loaded. (This may take a while on CPU.)")
     return pipeline("text-generation", model=model, tokenizer=tokenizer)
 
-def generate_script(prompt, generator, max_length=300, temperature=0.7):
+def generate_script(prompt, generator, max_length=300, temperature=0.7, prefix_cache=None, prefix=None):
     """
     Generate a YouTube script from the prompt using the given generator.
+    With a PrefixCache and the prompt's shared `prefix`, the prefix's
+    key/values are reused instead of recomputed.
     """
+    if prefix_cache is not None and prefix:
+        return prefix_cache.generate(prompt, prefix, max_length=max_length, temperature=temperature)
     outputs = generator(
         prompt,
         max_length=max_length,
@@ -25,7 +150,348 @@ def generate_script(prompt, generator, max_length=300, temperature=0.7):
     )
     return outputs[0]["generated_text"]
 
-if __name__ == "__main__":
+
+def available_memory():
+    """Bytes of RAM available to new allocations, or None if unknown."""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def auto_batch_size(model, max_length=300):
+    """
+    Largest batch whose per-sequence working set fits in RAM_FRACTION of
+    available memory: the KV cache, the prompt pass's attention scores and
+    its full-vocabulary logits.
+    """
+    available = available_memory()
+    if available is None:
+        return DEFAULT_BATCH_SIZE
+    config = model.config
+    layers = getattr(config, "num_layers", None) or config.num_hidden_layers
+    heads = getattr(config, "num_heads", None) or config.num_attention_heads
+    dtype_bytes = next(model.parameters()).element_size()
+    kv_cache = 2 * layers * config.hidden_size * max_length * dtype_bytes
+    attention = heads * max_length * max_length * 4
+    logits = config.vocab_size * max_length * 4
+    per_sequence = kv_cache + attention + logits
+    return max(1, min(MAX_BATCH_SIZE, int(available * RAM_FRACTION // per_sequence)))
+
+
+def generate_scripts_batch(prompts, generator, batch_size=None, max_length=300, temperature=0.7,
+                           max_new_tokens=None, top_p=None, include_prompt=True):
+    """
+    Generate one script per prompt, batching prompts of similar token length.
+    Like generate_script(), each result includes its prompt and is capped at
+    max_length tokens overall; pass max_new_tokens to cap the continuation
+    instead, and include_prompt=False for the continuation alone. Results
+    come back in the order of `prompts`.
+    """
+    import torch
+
+    model, tokenizer = generator.model, generator.tokenizer
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    # Decoder-only models continue from the last position, so pad on the left.
+    tokenizer.padding_side = "left"
+    if max_new_tokens:
+        context = getattr(model.config, "max_position_embeddings", 2048)
+        max_length = context
+        prompt_limit = max(1, context - max_new_tokens)
+    else:
+        prompt_limit = max_length - 1
+    batch_size = batch_size or auto_batch_size(model, max_length)
+    sampling = {"temperature": temperature}
+    if top_p is not None:
+        sampling["top_p"] = top_p
+
+    lengths = [len(ids) for ids in tokenizer(list(prompts))["input_ids"]]
+    order = sorted(range(len(prompts)), key=lambda i: lengths[i])
+    results = [None] * len(prompts)
+    for start in range(0, len(order), batch_size):
+        group = order[start:start + batch_size]
+        inputs = tokenizer([prompts[i] for i in group], return_tensors="pt", padding=True,
+                           truncation=True, max_length=prompt_limit)
+        prompt_length = inputs["input_ids"].shape[1]
+        with torch.inference_mode():
+            outputs = model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens or max(1, max_length - prompt_length),
+                do_sample=True,
+                pad_token_id=tokenizer.pad_token_id,
+                **sampling,
+            )
+        for i, sequence in zip(group, outputs):
+            results[i] = tokenizer.decode(sequence if include_prompt else sequence[prompt_length:],
+                                          skip_special_tokens=True)
+    return results
+
+
+class _FirstTokenTimer:
+    """A generate() streamer that only notes when the first new token arrives."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token = None
+        self._prompt_seen = False
+
+    def put(self, value):
+        if not self._prompt_seen:       # generate() streams the prompt first
+            self._prompt_seen = True
+        elif self.first_token is None:
+            self.first_token = time.perf_counter() - self.started
+
+    def end(self):
+        pass
+
+
+class PrefixCache:
+    """
+    past_key_values of shared prompt prefixes, computed once per prefix and
+    reused for every prompt starting with it (LRU over PREFIX_CACHE_ENTRIES).
+    """
+
+    def __init__(self, generator, max_entries=PREFIX_CACHE_ENTRIES):
+        self.model, self.tokenizer = generator.model, generator.tokenizer
+        self.max_entries = max_entries
+        self.entries = OrderedDict()    # prefix -> (token ids, past_key_values, prefill seconds)
+        self.hits = self.misses = self.mismatches = 0
+        # "cached" is hits only; a miss pays the prefix prefill and counts apart.
+        self.ttft = {"cached": [], "miss": [], "uncached": []}
+
+    def _entry(self, prefix):
+        import torch
+        entry = self.entries.get(prefix)
+        if entry is not None:
+            self.entries.move_to_end(prefix)
+            return entry, True
+        ids = self.tokenizer(prefix, return_tensors="pt")["input_ids"]
+        started = time.perf_counter()
+        with torch.inference_mode():
+            past = self.model(ids, use_cache=True).past_key_values
+        entry = (ids[0].tolist(), past, time.perf_counter() - started)
+        self.entries[prefix] = entry
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry, False
+
+    def generate(self, prompt, prefix=None, max_length=300, temperature=0.7, max_new_tokens=None):
+        """Like generate_script(); prefix=None generates without the cache."""
+        import torch
+        inputs = self.tokenizer(prompt, return_tensors="pt")
+        past, bucket = None, "uncached"
+        timer = _FirstTokenTimer()      # started before any prefill this call pays for
+        if prefix and prompt.startswith(prefix):
+            (prefix_ids, cached_past, _), was_cached = self._entry(prefix)
+            ids = inputs["input_ids"][0]
+            # The prompt must tokenize to the prefix's tokens plus a suffix;
+            # a BPE merge across the boundary would make the cache wrong.
+            if len(prefix_ids) < len(ids) and ids[:len(prefix_ids)].tolist() == prefix_ids:
+                past = copy.deepcopy(cached_past)   # generate() extends the cache in place
+                bucket = "cached" if was_cached else "miss"
+                if was_cached:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            else:
+                self.mismatches += 1
+        length = {"max_new_tokens": max_new_tokens} if max_new_tokens else {"max_length": max_length}
+        with torch.inference_mode():
+            output = self.model.generate(**inputs, past_key_values=past, do_sample=True,
+                                         temperature=temperature, pad_token_id=50256,
+                                         streamer=timer, **length)
+        if timer.first_token is not None:
+            self.ttft[bucket].append(timer.first_token)
+        return self.tokenizer.decode(output[0], skip_special_tokens=True)
+
+    def stats(self):
+        def mean(values):
+            return sum(values) / len(values) if values else None
+
+        lookups = self.hits + self.misses + self.mismatches
+        prefill = [entry[2] for entry in self.entries.values()]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "mismatches": self.mismatches,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "prefix_tokens": [len(entry[0]) for entry in self.entries.values()],
+            "prefix_prefill_seconds": mean(prefill),
+            "ttft_cached_seconds": mean(self.ttft["cached"]),
+            "ttft_miss_seconds": mean(self.ttft["miss"]),
+            "ttft_uncached_seconds": mean(self.ttft["uncached"]),
+            # Each hit skips one prefill of its prefix.
+            "prefill_seconds_saved": round(self.hits * (mean(prefill) or 0.0), 2),
+        }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"🧠 Prefix cache: {s['hits']} hits, {s['misses']} misses, {s['mismatches']} boundary mismatches "
+              f"({s['hit_rate']:.0%} hit rate); ~{s['prefill_seconds_saved']}s of prefill saved")
+        if s["ttft_cached_seconds"] is not None and s["ttft_uncached_seconds"] is not None:
+            miss = f", {s['ttft_miss_seconds'] * 1000:.0f} ms on a miss" if s["ttft_miss_seconds"] is not None else ""
+            print(f"   time to first token: {s['ttft_cached_seconds'] * 1000:.0f} ms cached vs "
+                  f"{s['ttft_uncached_seconds'] * 1000:.0f} ms uncached{miss}")
+
+
+def prefix_benchmark(generator, titles=BENCH_TITLES):
+    """Time-to-first-token for each headline with and without the cached preamble."""
+    from batch_script_generator import PROMPT_TEMPLATE, PROMPT_PREFIX
+    cache = PrefixCache(generator)
+    for title in titles:
+        prompt = PROMPT_TEMPLATE.format(title=title)
+        cache.generate(prompt, None, max_new_tokens=1)
+        cache.generate(prompt, PROMPT_PREFIX, max_new_tokens=1)
+    print(f"\n📊 {len(titles)} headlines, preamble of {cache.stats()['prefix_tokens']} tokens:")
+    cache.print_stats()
+    return cache.stats()
+
+
+def _new_tokens(tokenizer, prompts, outputs):
+    return sum(max(0, len(tokenizer(out)["input_ids"]) - len(tokenizer(prompt)["input_ids"]))
+               for prompt, out in zip(prompts, outputs))
+
+
+def benchmark(generator, titles=BENCH_TITLES, batch_size=None):
+    """Generated tokens/s for the one-at-a-time path vs generate_scripts_batch()."""
+    from batch_script_generator import PROMPT_TEMPLATE
+    prompts = [PROMPT_TEMPLATE.format(title=title) for title in titles]
+    batch_size = batch_size or auto_batch_size(generator.model)
+
+    started = time.perf_counter()
+    serial = [generate_script(prompt, generator) for prompt in prompts]
+    serial_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batched = generate_scripts_batch(prompts, generator, batch_size=batch_size)
+    batched_seconds = time.perf_counter() - started
+
+    serial_rate = _new_tokens(generator.tokenizer, prompts, serial) / serial_seconds
+    batched_rate = _new_tokens(generator.tokenizer, prompts, batched) / batched_seconds
+    print(f"\n📊 {len(prompts)} prompts:")
+    print(f"  one at a time   {serial_seconds:7.1f}s  {serial_rate:7.1f} tokens/s")
+    print(f"  batch size {batch_size:<3}  {batched_seconds:7.1f}s  {batched_rate:7.1f} tokens/s "
+          f"({batched_rate / serial_rate:.1f}x)")
+    return {"serial_tokens_per_s": serial_rate, "batched_tokens_per_s": batched_rate, "batch_size": batch_size}
+
+def report_titles(count=8, base_dir="trending_topics"):
+    """The first usable headline from each niche directory, in sorted order."""
+    titles = []
+    for niche in sorted(os.listdir(base_dir)):
+        niche_dir = os.path.join(base_dir, niche)
+        if not os.path.isdir(niche_dir):
+            continue
+        for filename in sorted(os.listdir(niche_dir)):
+            if not filename.endswith(".txt"):
+                continue
+            with open(os.path.join(niche_dir, filename), "r", encoding="utf-8", errors="ignore") as f:
+                title = f.read().strip()
+            if "Example topic for" not in title and len(title) >= 10:
+                titles.append(title)
+                break
+        if len(titles) >= count:
+            break
+    return titles
+
+
+def weights_mb(model):
+    """Size of the model's weights, counting packed int8 Linear weights at one byte each."""
+    def size(value):
+        if hasattr(value, "element_size"):
+            return value.element_size() * value.nelement()
+        if isinstance(value, (tuple, list)):
+            return sum(size(v) for v in value)
+        return 0
+    return sum(size(v) for v in model.state_dict().values()) / (1 << 20)
+
+
+def quantization_report(model_name="EleutherAI/gpt-neo-1.3B", titles=None, precisions=PRECISIONS,
+                        new_tokens=REPORT_NEW_TOKENS):
+    """
+    Load each precision in turn and greedily continue the same prompts.
+    Quality is measured against fp32: perplexity on the fp32 continuations
+    and the share of generated tokens identical to fp32's.
+    """
+    import torch
+    from batch_script_generator import PROMPT_TEMPLATE
+
+    titles = titles or report_titles()
+    prompts = [PROMPT_TEMPLATE.format(title=title) for title in titles]
+    precisions = [p for p in precisions if p != "bf16" or cpu_supports_bf16()]
+    if "fp32" in precisions:
+        precisions = ["fp32"] + [p for p in precisions if p != "fp32"]
+    reference = None
+    report = {}
+    for precision in precisions:
+        started = time.perf_counter()
+        generator = load_local_model(model_name, precision)
+        load_seconds = time.perf_counter() - started
+        model, tokenizer = generator.model, generator.tokenizer
+
+        outputs, prompt_lengths, generated, gen_seconds = [], [], 0, 0.0
+        with torch.inference_mode():
+            for prompt in prompts:
+                inputs = tokenizer(prompt, return_tensors="pt")
+                started = time.perf_counter()
+                ids = model.generate(**inputs, max_new_tokens=new_tokens, do_sample=False,
+                                     pad_token_id=tokenizer.eos_token_id)[0]
+                gen_seconds += time.perf_counter() - started
+                prompt_lengths.append(inputs["input_ids"].shape[1])
+                generated += len(ids) - prompt_lengths[-1]
+                outputs.append(ids)
+            reference = reference or outputs
+            # Perplexity of every mode on the same (fp32) continuations; the
+            # prompt tokens are masked out of the loss.
+            nll = []
+            for ids, length in zip(reference, prompt_lengths):
+                labels = ids.clone()
+                labels[:length] = -100
+                nll.append(model(ids.unsqueeze(0), labels=labels.unsqueeze(0)).loss.item())
+        # Share of generated tokens (not prompt tokens) identical to fp32's.
+        agreement = [
+            sum(int(a == b) for a, b in zip(ours[length:].tolist(), ref[length:].tolist()))
+            / max(len(ref) - length, 1)
+            for ours, ref, length in zip(outputs, reference, prompt_lengths)
+        ]
+        report[precision] = {
+            "load_seconds": round(load_seconds, 1),
+            "weights_mb": round(weights_mb(model)),
+            "tokens_per_second": round(generated / gen_seconds, 2) if gen_seconds else 0,
+            "perplexity": round(float(torch.tensor(nll).mean().exp()), 3),
+            "token_agreement": round(sum(agreement) / len(agreement), 3),
+        }
+        del generator, model
+        gc.collect()
+
+    print(f"\n📊 {model_name} on {len(prompts)} trending_topics/ headlines, {new_tokens} greedy tokens each:")
+    print(f"  {'mode':<5} {'load s':>7} {'weights MB':>10} {'tokens/s':>9} {'perplexity':>10} {'= fp32':>7}")
+    for precision, r in report.items():
+        print(f"  {precision:<5} {r['load_seconds']:>7} {r['weights_mb']:>10} {r['tokens_per_second']:>9} "
+              f"{r['perplexity']:>10} {r['token_agreement']:>7.1%}")
+    os.makedirs(os.path.dirname(REPORT_FILE), exist_ok=True)
+    with open(REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump({"model": model_name, "titles": titles, "modes": report}, f, indent=2)
+    return report
+
+
+if __name__ == "__main__" and sys.argv[1:2] == ["prefix-bench"]:
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else len(BENCH_TITLES)
+    prefix_benchmark(load_local_model("EleutherAI/gpt-neo-1.3B"), BENCH_TITLES[:count])
+elif __name__ == "__main__" and sys.argv[1:2] == ["quant-report"]:
+    quantization_report(titles=report_titles(int(sys.argv[2]) if len(sys.argv) > 2 else 8))
+elif __name__ == "__main__" and sys.argv[1:2] == ["bench"]:
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else len(BENCH_TITLES)
+    batch = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    benchmark(load_local_model("EleutherAI/gpt-neo-1.3B"), BENCH_TITLES[:count], batch)
+elif __name__ == "__main__":
     # Example headline (tech-focused)
     headline = "Tech giants announce breakthrough in quantum computing innovation."
 
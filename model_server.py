@@ -0,0 +1,315 @@
+"""
+Warm local model server.
+
+Loads the local model (GPT-Neo 1.3B by default) once and serves
+OpenAI-style completions on localhost, so scripts stop paying the
+from_pretrained cost on every run. Requests arriving within
+BATCH_WINDOW_SECONDS of each other are generated together through
+local_script_generator.generate_scripts_batch().
+
+Endpoints:
+    POST /v1/completions, /api/v1/completions    {"prompt": ..., "max_tokens"|"max_length": ...}
+    POST /v1/chat/completions                    {"messages": [...]}
+    GET  /v1/models, /health, /metrics
+
+Completion responses carry both "choices" (OpenAI) and "results" (the
+text-generation-webui shape generate_scripts expects), so the existing
+clients work as they are once their URL points here:
+
+    TEXTGEN_API_URL=http://127.0.0.1:5000/v1/completions          generate_scripts
+    TGW_API_URL=http://127.0.0.1:5000/api/v1/completions          backtest_harvester
+    USE_LOCAL_LLM=True LOCAL_LLM_BASE_URL=http://127.0.0.1:5000/v1 script_generator
+
+/metrics reports startup-to-first-token (process start until a warm-up
+token is generated) and steady-state throughput (completion tokens per
+second of generation time), plus request, batch and queue counts.
+
+Usage:
+    python model_server.py [--model EleutherAI/gpt-neo-1.3B] [--port 5000] [--batch-size N] [--precision int8]
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import argparse
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROCESS_START = time.perf_counter()
+
+# ---------- CONFIGURATION ----------
+HOST = os.getenv("MODEL_SERVER_HOST", "127.0.0.1")
+PORT = int(os.getenv("MODEL_SERVER_PORT", "5000"))
+MODEL_NAME = os.getenv("LOCAL_MODEL", "EleutherAI/gpt-neo-1.3B")
+BATCH_WINDOW_SECONDS = 0.05     # how long a batch waits for more requests
+DEFAULT_MAX_TOKENS = 256
+DEFAULT_TEMPERATURE = 0.7
+REQUEST_TIMEOUT = 900
+# -----------------------------------
+
+COMPLETION_PATHS = ("/v1/completions", "/api/v1/completions", "/completions")
+CHAT_PATHS = ("/v1/chat/completions", "/chat/completions")
+
+
+@dataclass
+class CompletionRequest:
+    prompt: str
+    max_tokens: int
+    temperature: float
+    top_p: float = None
+    stop: list = field(default_factory=list)
+    future: Future = field(default_factory=Future)
+
+    @property
+    def sampling(self):
+        return (self.max_tokens, self.temperature, self.top_p)
+
+
+def chat_prompt(messages):
+    lines = [f"{m.get('role', 'user').capitalize()}: {m.get('content', '')}" for m in messages]
+    return "\n".join(lines) + "\nAssistant:"
+
+
+def parse_request(body, chat=False, context=2048):
+    """Normalise an OpenAI / text-generation-webui request body."""
+    if chat:
+        prompt = chat_prompt(body.get("messages") or [])
+    else:
+        prompt = body.get("prompt", "")
+        if isinstance(prompt, list):
+            if len(prompt) != 1:
+                raise ValueError("exactly one prompt per request is supported")
+            prompt = prompt[0]
+    if not isinstance(prompt, str) or not prompt:
+        raise ValueError("prompt is required")
+    max_tokens = body.get("max_tokens") or body.get("max_new_tokens") or body.get("max_length") or DEFAULT_MAX_TOKENS
+    # Sampling needs a positive temperature; treat 0 as (near) greedy.
+    temperature = max(float(body.get("temperature", DEFAULT_TEMPERATURE)), 1e-3)
+    top_p = body.get("top_p")
+    stop = body.get("stop") or []
+    return CompletionRequest(
+        prompt=prompt,
+        max_tokens=max(1, min(int(max_tokens), context - 1)),
+        temperature=temperature,
+        top_p=float(top_p) if top_p is not None else None,
+        stop=[stop] if isinstance(stop, str) else list(stop),
+    )
+
+
+def apply_stop(text, stop):
+    cut = min((text.find(s) for s in stop if s and s in text), default=-1)
+    return text[:cut] if cut >= 0 else text
+
+
+class ServerMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.load_seconds = None
+        self.first_token_seconds = None
+        self.requests = 0
+        self.failed = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+
+    def record_batch(self, size, prompt_tokens, completion_tokens, seconds):
+        with self._lock:
+            self.batches += 1
+            self.requests += size
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.busy_seconds += seconds
+
+    def record_failure(self, size):
+        with self._lock:
+            self.failed += size
+
+    def snapshot(self, queue_depth=0):
+        with self._lock:
+            uptime = time.perf_counter() - PROCESS_START
+            return {
+                "uptime_seconds": round(uptime, 1),
+                "load_seconds": self.load_seconds,
+                "startup_to_first_token_seconds": self.first_token_seconds,
+                "requests": self.requests,
+                "failed": self.failed,
+                "batches": self.batches,
+                "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "tokens_per_second": round(self.completion_tokens / self.busy_seconds, 2) if self.busy_seconds else 0,
+                "utilization": round(self.busy_seconds / uptime, 3),
+                "queue_depth": queue_depth,
+            }
+
+
+class Batcher(threading.Thread):
+    """Collects concurrent requests and generates them in batches on one thread."""
+
+    def __init__(self, generator, batch_size, window=BATCH_WINDOW_SECONDS, metrics=None):
+        super().__init__(daemon=True, name="model-batcher")
+        self.generator = generator
+        self.batch_size = batch_size
+        self.window = window
+        self.metrics = metrics or ServerMetrics()
+        self.pending = queue.Queue()
+
+    def submit(self, request):
+        self.pending.put(request)
+        return request.future
+
+    def _collect(self):
+        batch = [self.pending.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            batch = self._collect()
+            groups = {}
+            for request in batch:
+                groups.setdefault(request.sampling, []).append(request)
+            for (max_tokens, temperature, top_p), requests in groups.items():
+                self._generate(requests, max_tokens, temperature, top_p)
+
+    def _generate(self, requests, max_tokens, temperature, top_p):
+        from local_script_generator import generate_scripts_batch
+        tokenizer = self.generator.tokenizer
+        started = time.perf_counter()
+        try:
+            texts = generate_scripts_batch(
+                [r.prompt for r in requests], self.generator, batch_size=self.batch_size,
+                max_new_tokens=max_tokens, temperature=temperature, top_p=top_p, include_prompt=False)
+        except Exception as e:
+            print(f"❌ Generation failed for {len(requests)} requests: {e}")
+            self.metrics.record_failure(len(requests))
+            for request in requests:
+                request.future.set_exception(e)
+            return
+        elapsed = time.perf_counter() - started
+        prompt_tokens = completion_tokens = 0
+        for request, text in zip(requests, texts):
+            usage = {"prompt_tokens": len(tokenizer(request.prompt)["input_ids"]),
+                     "completion_tokens": len(tokenizer(text)["input_ids"])}
+            prompt_tokens += usage["prompt_tokens"]
+            completion_tokens += usage["completion_tokens"]
+            finish = "length" if usage["completion_tokens"] >= request.max_tokens else "stop"
+            request.future.set_result((apply_stop(text, request.stop), finish, usage))
+        self.metrics.record_batch(len(requests), prompt_tokens, completion_tokens, elapsed)
+
+
+def completion_response(model, text, finish, usage, chat=False):
+    usage = dict(usage, total_tokens=usage["prompt_tokens"] + usage["completion_tokens"])
+    base = {"id": f"cmpl-{uuid.uuid4().hex[:24]}", "created": int(time.time()), "model": model, "usage": usage}
+    if chat:
+        return dict(base, object="chat.completion", choices=[
+            {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": finish}])
+    return dict(base, object="text_completion",
+                choices=[{"index": 0, "text": text, "finish_reason": finish}],
+                results=[{"text": text}])
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "nekoflow-model-server/1.0"
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message):
+        self._send(status, {"error": {"message": message}})
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path == "/health":
+            self._send(200, {"status": "ok", "model": self.server.model_name})
+        elif path == "/metrics":
+            self._send(200, self.server.batcher.metrics.snapshot(self.server.batcher.pending.qsize()))
+        elif path in ("/v1/models", "/models"):
+            self._send(200, {"object": "list", "data": [{"id": self.server.model_name, "object": "model"}]})
+        else:
+            self._error(404, f"unknown path {path}")
+
+    def do_POST(self):
+        path = self.path.split("?")[0].rstrip("/")
+        chat = path in CHAT_PATHS
+        if not chat and path not in COMPLETION_PATHS:
+            return self._error(404, f"unknown path {path}")
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            request = parse_request(body, chat=chat, context=self.server.context)
+        except (ValueError, TypeError, AttributeError) as e:
+            return self._error(400, f"bad request: {e}")
+        try:
+            text, finish, usage = self.server.batcher.submit(request).result(timeout=REQUEST_TIMEOUT)
+        except Exception as e:
+            return self._error(500, str(e))
+        self._send(200, completion_response(self.server.model_name, text, finish, usage, chat=chat))
+
+    def log_message(self, format, *args):
+        pass    # one line per request would drown the startup/metrics output
+
+
+def serve(model_name=MODEL_NAME, host=HOST, port=PORT, batch_size=None, window=BATCH_WINDOW_SECONDS,
+          precision=None):
+    from local_script_generator import load_local_model, auto_batch_size, generate_scripts_batch
+
+    metrics = ServerMetrics()
+    generator = load_local_model(model_name, precision)
+    metrics.load_seconds = round(time.perf_counter() - PROCESS_START, 2)
+    generate_scripts_batch(["Hello"], generator, batch_size=1, max_new_tokens=1, include_prompt=False)
+    metrics.first_token_seconds = round(time.perf_counter() - PROCESS_START, 2)
+
+    context = getattr(generator.model.config, "max_position_embeddings", 2048)
+    batch_size = batch_size or auto_batch_size(generator.model, context)
+    batcher = Batcher(generator, batch_size, window, metrics)
+    batcher.start()
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.batcher, server.model_name, server.context = batcher, model_name, context
+    print(f"🚀 Serving {model_name} on http://{host}:{port}/v1 (batch size {batch_size}); "
+          f"loaded in {metrics.load_seconds}s, first token at {metrics.first_token_seconds}s")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Model server stopped")
+        print(json.dumps(metrics.snapshot(batcher.pending.qsize()), indent=2))
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the local model over an OpenAI-compatible API.")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--batch-size", type=int, default=None, help="default: sized to available RAM")
+    parser.add_argument("--precision", choices=["fp32", "int8", "bf16"], default=None,
+                        help="default: $LOCAL_MODEL_PRECISION or fp32")
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW_SECONDS * 1000,
+                        help="how long a batch waits for more requests")
+    args = parser.parse_args(argv)
+    serve(args.model, args.host, args.port, args.batch_size, args.window_ms / 1000, args.precision)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,20 +1,17 @@
 import os
 import asyncio
-import edge_tts
 
 # Directories: scripts (text) and audio (for output)
 SCRIPTS_DIR = "scripts"
 AUDIO_DIR = "audio"
 
-# Ensure the audio output folder exists
-os.makedirs(AUDIO_DIR, exist_ok=True)
-
 # TTS parameters: adjust these if you want different voice, rate, or style.
 VOICE = "en-US-AriaNeural"    # A natural, humanlike voice
 RATE = "+0%"                  # Normal speaking rate
 STYLE = "newscast-casual"     # Suitable for tech news narration
 
 async def generate_audio(text, output_file):
+    import edge_tts
     # Create an Edge TTS communicator and generate audio
     communicator = edge_tts.Communicate(text, voice=VOICE, rate=RATE, style=STYLE)
     await communicator.save(output_file)
@@ -29,6 +26,7 @@ def narrate_all_scripts():
     if not os.path.isdir(SCRIPTS_DIR) or not os.listdir(SCRIPTS_DIR):
         print("No script files found in the 'scripts' directory.")
         return
+    os.makedirs(AUDIO_DIR, exist_ok=True)
 
     # Process every .txt file in the scripts folder
     for filename in os.listdir(SCRIPTS_DIR):
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+nekoflow: one command for the whole pipeline.
+
+    python nekoflow.py ingest [trending|news|backtest]
+    python nekoflow.py rank [trending_topics.json] [--top 10] [--category AI]
+    python nekoflow.py script [--engine textgen|openai|local]
+    python nekoflow.py narrate
+    python nekoflow.py render
+    python nekoflow.py run [--niche ai] [--until video] [--dry-run] [--engine local] [--reupload]
+    python nekoflow.py stream [--niche ai] [--until video] [--fetch] [--new]
+    python nekoflow.py jobs enqueue|work|stats|dead|retry-dead ...
+    python nekoflow.py serve [--model EleutherAI/gpt-neo-1.3B] [--port 5000] [--precision int8]
+    python nekoflow.py upload VIDEO --title ... [--description ...] [--tags a,b]
+    python nekoflow.py bench-startup
+
+Each subcommand imports its subsystem (and so pandas, praw, googleapiclient,
+transformers, edge-tts, ...) only when it runs, so `--help` and the cheap
+subcommands start fast. bench-startup measures that against
+STARTUP_BUDGET_SECONDS.
+"""
+import sys
+import argparse
+
+STARTUP_BUDGET_SECONDS = 0.5
+# Modules behind each subcommand, timed by bench-startup in a fresh interpreter.
+SUBSYSTEM_MODULES = {
+    "ingest": ["fetch_real_trending_topics", "combine_sources", "backtest_harvester"],
+    "rank": ["rank_titles"],
+    "script": ["generate_scripts", "generate_video_scripts", "batch_script_generator"],
+    "narrate": ["narrate_script"],
+    "render": ["video_maker"],
+    "upload": ["youtube_uploader"],
+    "run": ["pipeline"],
+    "stream": ["streaming"],
+    "jobs": ["job_queue"],
+    "serve": ["model_server"],
+}
+
+
+def cmd_ingest(args):
+    if args.source == "trending":
+        import fetch_real_trending_topics
+        fetch_real_trending_topics.main()
+    elif args.source == "news":
+        from combine_sources import combine_sources
+        combine_sources()
+    else:
+        from backtest_harvester import harvest_data
+        harvest_data(workers=args.workers, incremental=args.incremental)
+
+
+def cmd_rank(args):
+    import rank_titles
+    argv = [args.input, "--top", str(args.top)]
+    if args.category:
+        argv += ["--category", args.category]
+    rank_titles.main(argv)
+
+
+def cmd_script(args):
+    if args.engine == "textgen":
+        import generate_scripts
+        generate_scripts.main()
+    elif args.engine == "openai":
+        import generate_video_scripts
+        generate_video_scripts.main(fast=args.fast)
+    else:
+        import batch_script_generator
+        batch_script_generator.main()
+
+
+def cmd_narrate(args):
+    from narrate_script import narrate_all_scripts
+    narrate_all_scripts()
+
+
+def cmd_render(args):
+    from video_maker import run_all_videos
+    run_all_videos()
+
+
+def cmd_run(args):
+    import pipeline
+    argv = ["--until", args.until, "--engine", args.engine] + \
+        [a for niche in args.niche or [] for a in ("--niche", niche)]
+    for flag in ("dry_run", "reupload"):
+        if getattr(args, flag):
+            argv.append("--" + flag.replace("_", "-"))
+    if args.limit:
+        argv += ["--limit", str(args.limit)]
+    pipeline.main(argv)
+
+
+def cmd_stream(args):
+    import streaming
+    argv = ["--until", args.until, "--engine", args.engine] + \
+        [a for niche in args.niche or [] for a in ("--niche", niche)]
+    for flag in ("fetch", "new"):
+        if getattr(args, flag):
+            argv.append(f"--{flag}")
+    if args.limit:
+        argv += ["--limit", str(args.limit)]
+    streaming.main(argv)
+
+
+def cmd_jobs(args):
+    import job_queue
+    job_queue.main(args.args)
+
+
+def cmd_serve(args):
+    import model_server
+    argv = ["--port", str(args.port)] + (["--model", args.model] if args.model else [])
+    if args.batch_size:
+        argv += ["--batch-size", str(args.batch_size)]
+    if args.precision:
+        argv += ["--precision", args.precision]
+    model_server.main(argv)
+
+
+def cmd_upload(args):
+    from youtube_uploader import upload_video
+    tags = [t.strip() for t in args.tags.split(",") if t.strip()]
+    upload_video(args.video, args.title, args.description, tags)
+
+
+def _best_time(argv, repeat=3):
+    import time
+    import subprocess
+    best, ok = None, True
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - started
+        ok = ok and result.returncode == 0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, ok
+
+
+def cmd_bench_startup(args):
+    """Time CLI startup and each subsystem's import, each in a fresh interpreter."""
+    baseline, _ = _best_time([sys.executable, "-c", "pass"], args.repeat)
+    print(f"⏱️ Interpreter baseline: {baseline:.3f}s; budget {args.budget:.2f}s on top of it\n")
+
+    over_budget = False
+    commands = [["--help"]] + [[name, "--help"] for name in SUBSYSTEM_MODULES]
+    print("CLI startup:")
+    for command in commands:
+        elapsed, ok = _best_time([sys.executable, __file__] + command, args.repeat)
+        cost = elapsed - baseline
+        within = ok and cost <= args.budget
+        over_budget = over_budget or not within
+        print(f"  {'✅' if within else '⚠️'} nekoflow {' '.join(command):<18} {cost:.3f}s")
+
+    print("\nSubsystem imports (paid only when that subcommand runs):")
+    for name, modules in SUBSYSTEM_MODULES.items():
+        for module in modules:
+            elapsed, ok = _best_time([sys.executable, "-c", f"import {module}"], 1)
+            status = f"{elapsed - baseline:.3f}s" if ok else "import failed (missing dependency?)"
+            print(f"  {name:<8} {module:<28} {status}")
+    return 1 if over_budget else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="nekoflow", description="Trending topics to uploaded videos.")
+    sub = parser.add_subparsers(dest="command", metavar="command")
+
+    ingest = sub.add_parser("ingest", help="fetch trending topics, news headlines or backtest data")
+    ingest.add_argument("source", nargs="?", choices=["trending", "news", "backtest"], default="trending")
+    ingest.add_argument("--incremental", action="store_true",
+                        help="backtest: only fetch videos newer than each channel's last harvest")
+    ingest.add_argument("--workers", type=int, default=8, help="backtest: concurrent transcript fetches")
+    ingest.set_defaults(func=cmd_ingest)
+
+    rank = sub.add_parser("rank", help="add titles to the ranking index and show the top ones")
+    rank.add_argument("input", nargs="?", default="trending_topics.json")
+    rank.add_argument("--top", type=int, default=10)
+    rank.add_argument("--category", default=None)
+    rank.set_defaults(func=cmd_rank)
+
+    script = sub.add_parser("script", help="write scripts for new topics")
+    script.add_argument("--engine", choices=["textgen", "openai", "local"], default="textgen")
+    script.add_argument("--fast", action="store_true", help="openai: shorter scripts")
+    script.set_defaults(func=cmd_script)
+
+    narrate = sub.add_parser("narrate", help="turn scripts/ into audio with edge-tts")
+    narrate.set_defaults(func=cmd_narrate)
+
+    render = sub.add_parser("render", help="render videos for generated scripts")
+    render.set_defaults(func=cmd_render)
+
+    upload = sub.add_parser("upload", help="upload a rendered video to YouTube")
+    upload.add_argument("video")
+    upload.add_argument("--title", required=True)
+    upload.add_argument("--description", default="")
+    upload.add_argument("--tags", default="")
+    upload.set_defaults(func=cmd_upload)
+
+    run = sub.add_parser("run", help="rebuild only the stale script/audio/video/upload artifacts")
+    run.add_argument("--niche", action="append")
+    run.add_argument("--until", choices=["script", "audio", "video", "upload"], default="video")
+    run.add_argument("--dry-run", action="store_true")
+    run.add_argument("--engine", choices=["textgen", "local"], default="textgen")
+    run.add_argument("--reupload", action="store_true", help="publish changed videos again")
+    run.add_argument("--limit", type=int, default=None)
+    run.set_defaults(func=cmd_run)
+
+    stream = sub.add_parser("stream", help="run ingest/script/audio/video/upload concurrently with bounded queues")
+    stream.add_argument("--niche", action="append")
+    stream.add_argument("--until", choices=["script", "audio", "video", "upload"], default="video")
+    stream.add_argument("--fetch", action="store_true", help="harvest fresh topics for each niche first")
+    stream.add_argument("--new", action="store_true", help="only topics not yet scripted")
+    stream.add_argument("--engine", choices=["textgen", "local"], default="textgen")
+    stream.add_argument("--limit", type=int, default=None)
+    stream.set_defaults(func=cmd_stream)
+
+    jobs = sub.add_parser("jobs", help="durable script/render job queue (see job_queue.py)")
+    jobs.add_argument("args", nargs=argparse.REMAINDER, help="job_queue.py arguments")
+    jobs.set_defaults(func=cmd_jobs)
+
+    serve = sub.add_parser("serve", help="keep the local model loaded behind an OpenAI-compatible API")
+    serve.add_argument("--model", default=None)
+    serve.add_argument("--port", type=int, default=5000)
+    serve.add_argument("--batch-size", type=int, default=None)
+    serve.add_argument("--precision", choices=["fp32", "int8", "bf16"], default=None)
+    serve.set_defaults(func=cmd_serve)
+
+    bench = sub.add_parser("bench-startup", help="measure CLI startup and per-subsystem import time")
+    bench.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS)
+    bench.add_argument("--repeat", type=int, default=3)
+    bench.set_defaults(func=cmd_bench_startup)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, "func", None):
+        parser.print_help()
+        return 0
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
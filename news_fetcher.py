@@ -1,14 +1,15 @@
 import os
-import requests
 from dotenv import load_dotenv
 
+from http_cache import cached_get
+
 load_dotenv()
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 
 def fetch_news_titles(category="technology", country="us", language="en"):
     url = f"https://newsdata.io/api/1/news?apikey={NEWS_API_KEY}&category={category}&country={country}&language={language}"
     try:
-        response = requests.get(url)
+        response = cached_get(url)
         data = response.json()
         articles = data.get("results", [])
         return [article["title"] for article in articles if "title" in article][:5]
@@ -0,0 +1,383 @@
+"""
+Content-addressed, incremental pipeline runner.
+
+Every topic is a chain of artifacts, topic -> script -> audio -> video ->
+upload, and each artifact gets a fingerprint: a hash of its stage
+parameters (the prompt, voice settings, render settings, ...) and the
+content hash of its upstream artifact. The manifest
+(cache/pipeline_manifest.json) records the fingerprint each artifact was
+built with and its output's hash; a node is rebuilt only if it is new, its
+fingerprint changed, or its output went missing. Rebuilding a node changes
+its output hash, which makes the next stage stale in turn, so editing a
+script by hand re-narrates and re-renders just that chain.
+
+Outputs that already exist but predate the manifest are adopted (hashed and
+recorded) instead of being rebuilt.
+
+Uploads are the exception to automatic rebuilds: YouTube cannot replace the
+media of a published video, so rebuilding an upload means publishing a
+second copy. A video that was already uploaded is held (its recorded video
+id is kept) when its upstream changes, unless --reupload is given.
+
+Several processes may share the manifest (see job_queue.py workers): saves
+take a lock file and merge this process's entries into what is on disk.
+
+Usage:
+    python pipeline.py [--niche ai --niche tech] [--until video] [--dry-run] [--limit N] [--reupload]
+"""
+import os
+import sys
+import json
+import asyncio
+import hashlib
+import argparse
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from topic_store import get_store
+
+# ---------- CONFIGURATION ----------
+MANIFEST_FILE = os.path.join("cache", "pipeline_manifest.json")
+SCRIPTS_DIR = "generated_scripts"
+AUDIO_DIR = "generated_audio"
+VIDEOS_DIR = "generated_videos"
+STAGES = ("script", "audio", "video", "upload")
+# Topic status after each stage completes.
+STAGE_STATUS = {"script": "scripted", "video": "rendered", "upload": "uploaded"}
+# -----------------------------------
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(stage, params, upstream_hash):
+    blob = json.dumps([stage, params, upstream_hash], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def _locked(path):
+    """Exclusive advisory lock on `path` (no-op where fcntl is unavailable)."""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class Manifest:
+    def __init__(self, path=MANIFEST_FILE):
+        self.path = path
+        self.nodes = self._read(warn=True)
+        self._changed = set()
+
+    def _read(self, warn=False):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            if warn:
+                print(f"⚠️ {self.path} unreadable; every artifact will be re-checked.")
+            return {}
+
+    def get(self, node):
+        return self.nodes.get(node)
+
+    def record(self, node, fp, output, output_hash, save=True):
+        entry = {"fingerprint": fp, "output": output, "output_hash": output_hash,
+                 "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+        if output and os.path.exists(output):
+            stat = os.stat(output)
+            entry["stamp"] = [stat.st_size, stat.st_mtime]
+        self.nodes[node] = entry
+        self._changed.add(node)
+        if save:
+            self.save()
+
+    def output_hash(self, node, output):
+        """Recorded hash of a node's output, re-hashed only if the file changed on disk."""
+        entry = self.nodes[node]
+        if not output:
+            return entry["output_hash"]
+        stat = os.stat(output)
+        if entry.get("stamp") != [stat.st_size, stat.st_mtime]:
+            entry["output_hash"] = file_hash(output)
+            entry["stamp"] = [stat.st_size, stat.st_mtime]
+            self._changed.add(node)
+        return entry["output_hash"]
+
+    def save(self):
+        """Write the nodes this process recorded over the current file contents."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with _locked(self.path + ".lock"):
+            nodes = self._read()
+            nodes.update({node: self.nodes[node] for node in self._changed})
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(nodes, f, indent=1)
+            os.replace(tmp_path, self.path)
+        self.nodes = nodes
+        self._changed.clear()
+
+
+# ---------- stages ----------
+
+def output_path(stage, topic):
+    niche, key = topic["niche"], topic["topic_key"]
+    if stage == "script":
+        return os.path.join(SCRIPTS_DIR, niche, f"{key}.txt")
+    if stage == "audio":
+        return os.path.join(AUDIO_DIR, niche, f"{key}.mp3")
+    if stage == "video":
+        return os.path.join(VIDEOS_DIR, niche.lower(), f"{key}.mp4")
+    return None     # uploads produce a video id, kept in the manifest
+
+
+def stage_params(stage, topic, script_engine="textgen"):
+    if stage == "script" and script_engine == "local":
+        from batch_script_generator import PROMPT_TEMPLATE, model_name
+        return {"prompt": PROMPT_TEMPLATE.format(title=topic["title"]), "model": model_name}
+    if stage == "script":
+        from generate_scripts import TEXTGEN_API_URL, build_prompt
+        return {"prompt": build_prompt(topic["title"], topic["niche"]), "api": TEXTGEN_API_URL}
+    if stage == "audio":
+        from voice_engine import voice_params
+        return dict(voice_params(topic["niche"]), optimizer="smart_optimize_response")
+    if stage == "video":
+        from video_maker import render_params
+        return render_params(topic["niche"])
+    return {"title": topic["title"], "tags": [topic["niche"]]}
+
+
+_local_generator = None
+_prefix_cache = None
+
+
+def build_script_local(topic, upstream, output):
+    """
+    Script from the local model. The model, and the key/value cache of the
+    shared prompt preamble, are built once per (worker) process.
+    """
+    global _local_generator, _prefix_cache
+    from batch_script_generator import PROMPT_TEMPLATE, PROMPT_PREFIX, model_name
+    from local_script_generator import load_local_model, generate_script, PrefixCache
+    if _local_generator is None:
+        _local_generator = load_local_model(model_name)
+        _prefix_cache = PrefixCache(_local_generator)
+    script = generate_script(PROMPT_TEMPLATE.format(title=topic["title"]), _local_generator,
+                             prefix_cache=_prefix_cache, prefix=PROMPT_PREFIX)
+    if "Begin now:" in script:
+        script = script.split("Begin now:")[-1].strip()
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(script)
+    return output
+
+
+def build_script(topic, upstream, output):
+    from generate_scripts import generate_refined_script
+    script = generate_refined_script(topic["title"], topic["niche"])
+    if script is None:
+        return None
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(script)
+    return output
+
+
+async def build_audio_async(topic, upstream, output):
+    from script_optimizer import smart_optimize_response
+    from voice_engine import generate_voice
+    with open(upstream, "r", encoding="utf-8") as f:
+        text = smart_optimize_response(f.read())
+    await generate_voice(text, filename=output, niche=topic["niche"])
+    return output
+
+
+def build_audio(topic, upstream, output):
+    return asyncio.run(build_audio_async(topic, upstream, output))
+
+
+def build_video(topic, upstream, output):
+    from video_maker import create_video, get_background_video
+    create_video(upstream, get_background_video(topic["niche"]), output)
+    return output
+
+
+def build_upload(topic, upstream, output):
+    from youtube_uploader import upload_video
+    return upload_video(upstream, topic["title"], f"{topic['title']}\n\n#{topic['niche']}", [topic["niche"]])
+
+
+BUILDERS = {"script": build_script, "audio": build_audio, "video": build_video, "upload": build_upload}
+
+
+class Pipeline:
+    def __init__(self, until="video", dry_run=False, manifest=None, script_engine="textgen", reupload=False):
+        self.stages = STAGES[:STAGES.index(until) + 1]
+        self.dry_run = dry_run
+        self.script_engine = script_engine
+        self.reupload = reupload
+        self.manifest = manifest or Manifest()
+        self.counts = {stage: {"fresh": 0, "adopted": 0, "rebuilt": 0, "failed": 0, "held": 0}
+                       for stage in self.stages}
+        self._params = {}
+
+    def _stage_params(self, stage, topic):
+        # Stage parameters only vary by niche (plus the title for scripts/uploads).
+        key = (stage, topic["niche"], topic["title"] if stage in ("script", "upload") else None)
+        if key not in self._params:
+            self._params[key] = stage_params(stage, topic, self.script_engine)
+        return self._params[key]
+
+    def builder(self, stage, prefer_async=False):
+        if stage == "script" and self.script_engine == "local":
+            return build_script_local
+        if stage == "audio" and prefer_async:
+            return build_audio_async
+        return BUILDERS[stage]
+
+    def _staleness(self, node, fp, output):
+        entry = self.manifest.get(node)
+        if entry is None:
+            return "adopt" if output and os.path.exists(output) else "new"
+        if entry["fingerprint"] != fp:
+            return "inputs changed"
+        if output and not os.path.exists(output):
+            return "output missing"
+        return None
+
+    def _held(self, stage, node):
+        """True if `node` is an existing upload that must not be published again."""
+        entry = self.manifest.get(node)
+        if stage != "upload" or self.reupload or entry is None:
+            return False
+        print(f"  ⏸️ {node} (video changed; already uploaded as {entry['output_hash']}, pass --reupload)")
+        self.counts[stage]["held"] += 1
+        return True
+
+    def start(self, topic):
+        """The chain state carried from stage to stage for one topic."""
+        return {"topic": topic, "hash": None, "path": None, "dirty": False}
+
+    def plan_node(self, stage, item):
+        """
+        Decide what `stage` needs for this chain. Returns (None, item) when the
+        node is up to date or adopted (item advanced past it), else
+        (job, item) where job = (node, fingerprint, output) must be built
+        and handed to finish_node().
+        """
+        topic = item["topic"]
+        node = f"{stage}:{topic['niche']}/{topic['topic_key']}"
+        output = output_path(stage, topic)
+        if item["dirty"]:
+            if self._held(stage, node):
+                return None, item
+            # Dry run: the upstream would be rebuilt, so this node would be too.
+            print(f"  🔁 {node} (upstream rebuilt)")
+            self.counts[stage]["rebuilt"] += 1
+            return None, item
+
+        fp = fingerprint(stage, self._stage_params(stage, topic), item["hash"])
+        reason = self._staleness(node, fp, output)
+        if reason is None:
+            self.counts[stage]["fresh"] += 1
+            return None, dict(item, hash=self.manifest.output_hash(node, output), path=output)
+        if reason == "adopt":
+            self.counts[stage]["adopted"] += 1
+            output_hash = file_hash(output)
+            if not self.dry_run:
+                self.manifest.record(node, fp, output, output_hash, save=False)
+            return None, dict(item, hash=output_hash, path=output)
+
+        if self._held(stage, node):
+            return None, item
+        print(f"  🔁 {node} ({reason})")
+        self.counts[stage]["rebuilt"] += 1
+        if self.dry_run:
+            return None, dict(item, dirty=True)
+        if output:
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+        return (node, fp, output), item
+
+    def finish_node(self, stage, item, job, result):
+        """Record a built node; returns the advanced item, or None if the build failed."""
+        node, fp, output = job
+        if result is None:
+            self.counts[stage]["rebuilt"] -= 1
+            self.counts[stage]["failed"] += 1
+            return None
+        output_hash = file_hash(output) if output else result
+        self.manifest.record(node, fp, output, output_hash)
+        if stage in STAGE_STATUS:
+            get_store().set_status(item["topic"]["id"], STAGE_STATUS[stage], forward_only=True)
+        return dict(item, hash=output_hash, path=output)
+
+    def run_topic(self, topic):
+        """Bring one topic's chain up to date, stopping at the first failure."""
+        item = self.start(topic)
+        for stage in self.stages:
+            job, item = self.plan_node(stage, item)
+            if job is None:
+                continue
+            try:
+                result = self.builder(stage)(item["topic"], item["path"], job[2])
+            except Exception as e:
+                print(f"  ❌ {job[0]} failed: {e}")
+                result = None
+            item = self.finish_node(stage, item, job, result)
+            if item is None:
+                return False
+        return True
+
+    def run(self, topics):
+        for topic in topics:
+            self.run_topic(topic)
+        if not self.dry_run:
+            self.manifest.save()
+        self.print_summary(len(topics))
+
+    def print_summary(self, topic_count):
+        verb = "would rebuild" if self.dry_run else "rebuilt"
+        print(f"\n📊 Pipeline over {topic_count} topics ({'dry run' if self.dry_run else 'done'}):")
+        for stage, c in self.counts.items():
+            print(f"  {stage:<7} {verb} {c['rebuilt']}, up to date {c['fresh']}, "
+                  f"adopted {c['adopted']}, failed {c['failed']}"
+                  + (f", held {c['held']}" if c["held"] else ""))
+
+
+def main(argv=None):
+    from generate_scripts import niches as default_niches
+
+    parser = argparse.ArgumentParser(description="Rebuild only the stale script/audio/video/upload artifacts.")
+    parser.add_argument("--niche", action="append", help="niche to process (repeatable)")
+    parser.add_argument("--until", choices=STAGES, default="video", help="last stage to run")
+    parser.add_argument("--dry-run", action="store_true", help="show what would be rebuilt, build nothing")
+    parser.add_argument("--limit", type=int, default=None, help="topics per niche")
+    parser.add_argument("--engine", choices=["textgen", "local"], default="textgen", help="script generator")
+    parser.add_argument("--reupload", action="store_true",
+                        help="upload changed videos again even if they were already published")
+    args = parser.parse_args(argv)
+
+    store = get_store()
+    topics = []
+    for niche in args.niche or default_niches:
+        topics.extend(store.select_topics(niche, status=None, limit=args.limit))
+    print(f"🚀 Checking {len(topics)} topics through {' -> '.join(STAGES[:STAGES.index(args.until) + 1])}\n")
+    Pipeline(until=args.until, dry_run=args.dry_run, script_engine=args.engine,
+             reupload=args.reupload).run(topics)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,73 +1,197 @@
+"""
+Persistent, incremental ranking of trending titles.
+
+Titles are kept in an SQLite index (ranking.db) keyed by their normalised
+form (dedupe.normalize_title), so the same story seen from several sources
+collapses into one entry. Adding a title is an upsert plus a few B-tree
+index updates, O(log n); nothing is re-tagged or re-sorted. Top-K queries,
+overall or per category, read straight off the score indexes.
+
+A title's score combines the signals we already collect:
+
+    base  = 1 + CATEGORY_WEIGHT * category hits + SOURCE_WEIGHT * (sources - 1)
+    score = log2(base) + timestamp / (RECENCY_HALF_LIFE_HOURS * 3600)
+
+where timestamp is the published time when the title carries one, else when
+it was first indexed. Ordering by this score is the same as ordering by
+base * 2 ** (-age / half_life) at any moment, so stored scores never need
+recomputing as time passes.
+
+Usage:
+    python rank_titles.py [trending_topics.json] [--top 10] [--category AI]
+"""
 import json
-import re
-from collections import defaultdict
-
-# === STEP 1: Load trending topics ===
-with open("trending_topics.json", "r") as f:
-    titles = json.load(f)
-
-# === STEP 2: Define categories and smart keyword tags ===
-CATEGORIES = {
-    "AI": [
-        "AI", "artificial intelligence", "ChatGPT", "GPT", "LLM", "machine learning",
-        "deep learning", "neural network", "OpenAI", "Anthropic", "Claude", "prompt",
-        "AI-generated", "AI model", "Midjourney", "stability ai", "autogen", "transformer"
-    ],
-    "Cybersecurity": [
-        "cyber", "hacking", "hacker", "infosec", "ransomware", "malware", "phishing",
-        "exploit", "CVE", "breach", "DDoS", "zero-day", "security", "pentest", "cyberattack"
-    ],
-    "Finance": [
-        "market", "stocks", "earnings", "NASDAQ", "S&P", "Dow", "crypto", "bitcoin",
-        "economy", "inflation", "tariff", "trade", "interest rate", "Federal Reserve"
-    ],
-    "Politics": [
-        "Biden", "Trump", "election", "senate", "congress", "government", "democrat",
-        "republican", "campaign", "president", "political", "nominee"
-    ],
-    "Science": [
-        "experiment", "research", "neutrino", "particle", "biology", "space", "NASA",
-        "quantum", "physics", "science", "telescope"
-    ],
-    "Tech": [
-        "Tesla", "Apple", "Google", "Microsoft", "Meta", "Amazon", "iPhone", "Android",
-        "Pixel", "AI chip", "processor", "semiconductor", "technology", "software", "update"
-    ]
-}
-
-def tag_title(title):
-    """Tag title with matching categories."""
-    tags = set()
-    lower_title = title.lower()
-    for category, keywords in CATEGORIES.items():
-        for kw in keywords:
-            if re.search(r'\b' + re.escape(kw.lower()) + r'\b', lower_title):
-                tags.add(category)
-                break  # one match is enough for this category
-    return list(tags)
-
-# === STEP 3: Score and rank titles ===
-ranked = []
-
-for title in titles:
-    tags = tag_title(title)
-    score = len(tags)
-    ranked.append({
-        "title": title,
-        "score": score,
-        "tags": tags
-    })
-
-# === STEP 4: Sort by score descending ===
-ranked_sorted = sorted(ranked, key=lambda x: x["score"], reverse=True)
-
-# === STEP 5: Save output ===
-with open("ranked_topics.json", "w") as f:
-    json.dump(ranked_sorted, f, indent=2)
-
-print("✅ Ranked titles saved to ranked_topics.json")
-
-# === Optional: Print Top 10 ranked titles ===
-print("\n📊 Top Ranked Titles:")
-for i, item in enumerate(ranked_sorted[:10], 1):
-    print(f"{i}. {item['title']} ({', '.join(item['tags']) or 'Uncategorized'})")
+import math
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+from dedupe import normalize_title
+from tagger import get_tagger
+from topic_store import infer_source, parse_published
+
+# ---------- CONFIGURATION ----------
+INDEX_FILE = "ranking.db"
+RANKED_FILE = "ranked_topics.json"
+RANKED_EXPORT = 100                  # titles written to ranked_topics.json
+CATEGORY_WEIGHT = 1.0
+SOURCE_WEIGHT = 2.0
+RECENCY_HALF_LIFE_HOURS = 24
+# -----------------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ranked (
+    key           TEXT PRIMARY KEY,
+    title         TEXT NOT NULL,
+    tags          TEXT NOT NULL,
+    category_hits INTEGER NOT NULL,
+    source_count  INTEGER NOT NULL,
+    timestamp     REAL NOT NULL,
+    score         REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ranked_score ON ranked (score DESC);
+CREATE TABLE IF NOT EXISTS ranked_sources (
+    key    TEXT NOT NULL,
+    source TEXT NOT NULL,
+    PRIMARY KEY (key, source)
+);
+CREATE TABLE IF NOT EXISTS ranked_tags (
+    category TEXT NOT NULL,
+    key      TEXT NOT NULL,
+    score    REAL NOT NULL,
+    PRIMARY KEY (category, key)
+);
+CREATE INDEX IF NOT EXISTS idx_ranked_tags_score ON ranked_tags (category, score DESC);
+"""
+
+
+def title_key(title):
+    return hashlib.md5(normalize_title(title).encode("utf-8")).hexdigest()[:16]
+
+
+def published_timestamp(title):
+    """Epoch seconds from a "(Published: ...)" marker (ISO 8601 or RFC 822), else None."""
+    published = parse_published(title)
+    if not published:
+        return None
+    try:
+        return datetime.fromisoformat(published.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(published).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def score(category_hits, source_count, timestamp):
+    base = 1 + CATEGORY_WEIGHT * category_hits + SOURCE_WEIGHT * (source_count - 1)
+    return math.log2(base) + timestamp / (RECENCY_HALF_LIFE_HOURS * 3600)
+
+
+class RankingIndex:
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def add(self, titles, source=None, now=None):
+        """
+        Index titles seen from `source` (default: infer_source(title)).
+        A known story only gains a source and, if it's older than recorded,
+        an earlier timestamp. Returns the number of new entries.
+        """
+        titles = [t.strip() for t in titles if t and t.strip()]
+        now = now or time.time()
+        added = 0
+        with self._lock, self.conn:
+            for title, tags in zip(titles, get_tagger().tag_many(titles)):
+                added += self._upsert(title, tags, source or infer_source(title),
+                                      published_timestamp(title) or now)
+        return added
+
+    def _upsert(self, title, tags, source, timestamp):
+        key = title_key(title)
+        self.conn.execute("INSERT OR IGNORE INTO ranked_sources (key, source) VALUES (?, ?)", (key, source))
+        # Titles without a recognisable source still count as one source.
+        source_count = max(1, self.conn.execute(
+            "SELECT COUNT(*) FROM ranked_sources WHERE key = ? AND source != 'unknown'", (key,)).fetchone()[0])
+        row = self.conn.execute("SELECT tags, timestamp FROM ranked WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            tags = json.loads(row["tags"])
+            timestamp = min(timestamp, row["timestamp"])
+        new_score = score(len(tags), source_count, timestamp)
+        if row is None:
+            self.conn.execute(
+                "INSERT INTO ranked (key, title, tags, category_hits, source_count, timestamp, score) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, title, json.dumps(tags), len(tags), source_count, timestamp, new_score))
+        else:
+            self.conn.execute("UPDATE ranked SET source_count = ?, timestamp = ?, score = ? WHERE key = ?",
+                              (source_count, timestamp, new_score, key))
+        self.conn.executemany("INSERT OR REPLACE INTO ranked_tags (category, key, score) VALUES (?, ?, ?)",
+                              [(category, key, new_score) for category in tags])
+        return row is None
+
+    def top(self, k=10, category=None):
+        """The k best titles overall or within one category, best first."""
+        if category is None:
+            sql, params = "SELECT * FROM ranked ORDER BY score DESC LIMIT ?", (k,)
+        else:
+            sql = ("SELECT r.* FROM ranked_tags t JOIN ranked r ON r.key = t.key "
+                   "WHERE t.category = ? ORDER BY t.score DESC LIMIT ?")
+            params = (category, k)
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [
+            {
+                "title": row["title"],
+                "score": round(row["score"], 4),
+                "tags": json.loads(row["tags"]),
+                "sources": row["source_count"],
+                "timestamp": datetime.fromtimestamp(row["timestamp"]).isoformat(timespec="seconds"),
+            }
+            for row in rows
+        ]
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM ranked").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add titles to the ranking index and show the top ones.")
+    parser.add_argument("input", nargs="?", default="trending_topics.json")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--category", default=None)
+    args = parser.parse_args(argv)
+
+    with open(args.input, "r", encoding="utf-8") as f:
+        titles = json.load(f)
+
+    index = RankingIndex()
+    added = index.add(titles)
+    print(f"✅ Indexed {added} new titles ({len(index)} in {INDEX_FILE})")
+
+    with open(RANKED_FILE, "w", encoding="utf-8") as f:
+        json.dump(index.top(RANKED_EXPORT), f, indent=2)
+    print(f"✅ Top {RANKED_EXPORT} ranked titles saved to {RANKED_FILE}")
+
+    print("\n📊 Top Ranked Titles" + (f" in {args.category}:" if args.category else ":"))
+    for i, item in enumerate(index.top(args.top, args.category), 1):
+        print(f"{i}. {item['title']} ({', '.join(item['tags']) or 'Uncategorized'})")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,10 @@
-import requests
+from http_cache import cached_get
 
 def fetch_reddit_titles(subreddit="technology", limit=5):
     headers = {"User-Agent": "Mozilla/5.0"}
     url = f"https://www.reddit.com/r/{subreddit}/hot.json?limit={limit}"
     try:
-        response = requests.get(url, headers=headers)
+        response = cached_get(url, headers=headers)
         posts = response.json()["data"]["children"]
         return [post["data"]["title"] for post in posts]
     except Exception as e:
@@ -1,7 +1,8 @@
 import os
-import requests
 from dotenv import load_dotenv
 
+import http_client
+
 load_dotenv()
 
 use_local = os.getenv("USE_LOCAL_LLM", "False") == "True"
@@ -16,7 +17,7 @@ def generate_script_local(prompt):
             {"role": "user", "content": prompt}
         ]
     }
-    response = requests.post(f"{local_url}/chat/completions", json=payload, headers=headers)
+    response = http_client.post(f"{local_url}/chat/completions", json=payload, headers=headers, timeout=(5, 600))
     return response.json()["choices"][0]["message"]["content"].strip()
 
 def generate_script(prompt):
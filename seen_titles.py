@@ -0,0 +1,186 @@
+"""
+Bounded-memory "have we used this title?" filter.
+
+Replaces used_titles.json, which was loaded whole and rewritten on every run
+and never forgot anything. Here:
+
+- writes are incremental: each new title appends one short line
+  ("<epoch>\\t<hash>") to seen_titles.log;
+- lookups are O(1): a Bloom filter answers most "never seen" queries
+  without touching the exact table, and an exact {hash: last_seen} map
+  settles the rest, so there are no false positives;
+- entries expire after ttl_days, so a story can come back later;
+- memory is fixed by `capacity`: the Bloom filter is sized for it up front
+  and the exact map drops its oldest entries beyond it. memory_bytes()
+  reports the footprint.
+
+The log is compacted (rewritten with live entries only) once it holds more
+than twice as many lines as there are live entries.
+"""
+import os
+import sys
+import json
+import math
+import time
+import hashlib
+
+LOG_FILE = "seen_titles.log"
+LEGACY_FILE = "used_titles.json"
+TTL_DAYS = float(os.getenv("SEEN_TITLES_TTL_DAYS", "30"))
+CAPACITY = int(os.getenv("SEEN_TITLES_CAPACITY", "100000"))
+ERROR_RATE = 0.01
+# Rough CPython cost of one {int: int} entry (slot + two int objects).
+EXACT_ENTRY_BYTES = 100
+
+
+def title_hash(title):
+    """128-bit hash of a title as two 64-bit ints."""
+    digest = hashlib.blake2b(title.strip().encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=ERROR_RATE):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, h1, h2):
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, h1, h2):
+        for pos in self._positions(h1, h2):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, hashes):
+        h1, h2 = hashes
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(h1, h2))
+
+
+class SeenTitles:
+    def __init__(self, path=LOG_FILE, ttl_days=TTL_DAYS, capacity=CAPACITY, error_rate=ERROR_RATE):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.entries = {}          # (h1, h2) -> last seen epoch
+        self.log_lines = 0
+        self._pending = []
+        if not os.path.exists(path) and os.path.exists(LEGACY_FILE):
+            self._import_legacy()
+        self._load()
+
+    def _import_legacy(self):
+        with open(LEGACY_FILE, "r", encoding="utf-8") as f:
+            titles = json.load(f)
+        now = int(time.time())
+        with open(self.path, "w", encoding="utf-8") as f:
+            for title in titles:
+                h1, h2 = title_hash(title)
+                f.write(f"{now}\t{h1:016x}{h2:016x}\n")
+        print(f"ℹ️ Imported {len(titles)} titles from {LEGACY_FILE} into {self.path}")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        cutoff = time.time() - self.ttl_seconds
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                self.log_lines += 1
+                try:
+                    stamp, digest = line.rstrip("\n").split("\t")
+                    seen_at = int(stamp)
+                    key = (int(digest[:16], 16), int(digest[16:], 16))
+                except ValueError:
+                    continue
+                if seen_at >= cutoff and seen_at >= self.entries.get(key, 0):
+                    self.entries[key] = seen_at
+        self._enforce_capacity()
+        for key in self.entries:
+            self.bloom.add(*key)
+        if self.log_lines > 2 * max(len(self.entries), 1):
+            self.compact()
+
+    def _enforce_capacity(self):
+        if len(self.entries) <= self.capacity:
+            return
+        keep = sorted(self.entries.items(), key=lambda kv: kv[1])[-self.capacity:]
+        self.entries = dict(keep)
+
+    def __contains__(self, title):
+        key = title_hash(title)
+        if key not in self.bloom:
+            return False
+        seen_at = self.entries.get(key)
+        return seen_at is not None and seen_at >= time.time() - self.ttl_seconds
+
+    def __len__(self):
+        return len(self.entries)
+
+    def filter_new(self, titles):
+        """Titles not seen within the TTL, in their original order."""
+        return [title for title in titles if title not in self]
+
+    def add_many(self, titles, when=None):
+        """Mark titles as seen now (or at `when`); buffered until flush()."""
+        when = int(when or time.time())
+        for title in titles:
+            key = title_hash(title)
+            self.entries[key] = when
+            self.bloom.add(*key)
+            self._pending.append(f"{when}\t{key[0]:016x}{key[1]:016x}\n")
+        if len(self.entries) > self.capacity:
+            self._enforce_capacity()
+            # Evicted keys stay in the Bloom filter; rebuild it from the exact map.
+            self.bloom = BloomFilter(self.capacity, self.error_rate)
+            for key in self.entries:
+                self.bloom.add(*key)
+
+    def add(self, title, when=None):
+        self.add_many([title], when)
+
+    def flush(self):
+        if not self._pending:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(self._pending)
+        self.log_lines += len(self._pending)
+        self._pending = []
+        if self.log_lines > 2 * max(len(self.entries), 1):
+            self.compact()
+
+    def compact(self):
+        """Rewrite the log with only live entries."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for (h1, h2), seen_at in self.entries.items():
+                f.write(f"{seen_at}\t{h1:016x}{h2:016x}\n")
+        os.replace(tmp_path, self.path)
+        self.log_lines = len(self.entries)
+
+    def close(self):
+        self.flush()
+
+    def memory_bytes(self):
+        """Approximate footprint: Bloom bits plus the exact table at capacity."""
+        return len(self.bloom.bits) + self.capacity * EXACT_ENTRY_BYTES
+
+    def stats(self):
+        return {
+            "live_entries": len(self.entries),
+            "log_lines": self.log_lines,
+            "capacity": self.capacity,
+            "ttl_days": self.ttl_seconds / 86400,
+            "bloom_bytes": len(self.bloom.bits),
+            "bloom_hashes": self.bloom.hashes,
+            "memory_bytes": self.memory_bytes(),
+        }
+
+
+if __name__ == "__main__":
+    seen = SeenTitles()
+    if len(sys.argv) > 1:
+        title = " ".join(sys.argv[1:])
+        print(f"{'✅ seen' if title in seen else '🆕 new'}: {title}")
+    print(json.dumps(seen.stats(), indent=2))
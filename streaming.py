@@ -0,0 +1,277 @@
+"""
+Streaming stage runner: ingest -> script -> audio -> video -> upload.
+
+Instead of running each stage over every topic before the next starts, each
+stage has its own workers pulling from a bounded queue and pushing into the
+next stage's queue. A worker blocks when the downstream queue is full, so a
+fast stage can't run ahead of a slow one: at most `queue` items (and their
+files) wait between any two stages.
+
+Each stage picks where its work runs:
+
+    async    - coroutines on the event loop (edge-tts narration)
+    thread   - a thread pool, for blocking network clients (textgen API,
+               YouTube upload, the trending harvester)
+    process  - a process pool, for CPU-bound work (ffmpeg renders, local
+               model inference)
+
+Per-stage throughput, utilisation and queue depth are printed every
+METRICS_INTERVAL seconds and written to cache/stream_metrics.json.
+
+Artifacts go through the incremental Pipeline (pipeline.py), so only stale
+nodes are rebuilt.
+
+Usage:
+    python streaming.py [--niche ai] [--until video] [--fetch] [--new] [--engine textgen|local]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# ---------- CONFIGURATION ----------
+STAGE_CONFIG = {
+    "ingest": {"workers": 1, "executor": "thread", "queue": 4},
+    "script": {"workers": 4, "executor": "thread", "queue": 8},
+    "audio": {"workers": 8, "executor": "async", "queue": 8},
+    "video": {"workers": max(1, (os.cpu_count() or 2) // 2), "executor": "process", "queue": 4},
+    "upload": {"workers": 2, "executor": "thread", "queue": 4},
+}
+METRICS_INTERVAL = 10
+METRICS_FILE = os.path.join("cache", "stream_metrics.json")
+# -----------------------------------
+
+
+@dataclass
+class StageStats:
+    processed: int = 0      # input items handled
+    emitted: int = 0        # items passed downstream
+    dropped: int = 0        # handled, nothing to pass on (filtered or chain stopped)
+    failed: int = 0
+    busy_seconds: float = 0.0
+    max_depth: int = 0
+
+
+@dataclass
+class StageSpec:
+    name: str
+    fn: object
+    workers: int = 1
+    executor: str = "thread"
+    queue: int = 8
+    stats: StageStats = field(default_factory=StageStats)
+
+
+class StreamingRunner:
+    def __init__(self, metrics_interval=METRICS_INTERVAL, metrics_file=METRICS_FILE):
+        self.stages = []
+        self.metrics_interval = metrics_interval
+        self.metrics_file = metrics_file
+        self._executors = {}
+        self._queues = []
+        self._started = None
+        self.completed = 0
+
+    def add_stage(self, name, fn, workers=1, executor="thread", queue=8):
+        """
+        `fn(item)` may be a coroutine function (run on the loop) or a plain
+        function (run on the stage's executor). It returns one item, a list
+        of items to fan out, or None to pass nothing on.
+        """
+        if executor not in ("async", "thread", "process"):
+            raise ValueError(f"Unknown executor type: {executor}")
+        self.stages.append(StageSpec(name, fn, workers, executor, queue))
+
+    async def offload(self, stage_name, fn, *args):
+        """Run a blocking call on a stage's executor (threads for async stages)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executors[stage_name], fn, *args)
+
+    def _make_executor(self, spec):
+        if spec.executor == "process":
+            return ProcessPoolExecutor(max_workers=spec.workers)
+        return ThreadPoolExecutor(max_workers=spec.workers, thread_name_prefix=f"stream-{spec.name}")
+
+    async def _put(self, index, item):
+        queue = self._queues[index]
+        await queue.put(item)
+        stats = self.stages[index].stats
+        stats.max_depth = max(stats.max_depth, queue.qsize())
+
+    async def _work(self, index):
+        spec = self.stages[index]
+        inbox = self._queues[index]
+        last = index + 1 == len(self.stages)
+        while True:
+            item = await inbox.get()
+            started = time.perf_counter()
+            try:
+                if asyncio.iscoroutinefunction(spec.fn):
+                    result = await spec.fn(item)
+                else:
+                    result = await self.offload(spec.name, spec.fn, item)
+            except Exception as e:
+                print(f"❌ {spec.name} failed: {e}")
+                spec.stats.failed += 1
+                result = None
+            spec.stats.busy_seconds += time.perf_counter() - started
+            spec.stats.processed += 1
+            outputs = result if isinstance(result, list) else ([] if result is None else [result])
+            if not outputs:
+                spec.stats.dropped += 1
+            for output in outputs:
+                spec.stats.emitted += 1
+                if last:
+                    self.completed += 1
+                else:
+                    await self._put(index + 1, output)   # blocks while downstream is full
+            inbox.task_done()
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            self.print_metrics(compact=True)
+            self.save_metrics()
+
+    async def run(self, items):
+        """Push `items` through every stage; returns the final metrics."""
+        self._started = time.perf_counter()
+        self._queues = [asyncio.Queue(maxsize=spec.queue) for spec in self.stages]
+        self._executors = {spec.name: self._make_executor(spec) for spec in self.stages}
+        workers = [[asyncio.create_task(self._work(i)) for _ in range(spec.workers)]
+                   for i, spec in enumerate(self.stages)]
+        reporter = asyncio.create_task(self._report())
+        try:
+            for item in items:
+                await self._put(0, item)
+            # Drain stage by stage: once a stage's queue is empty and its
+            # workers are idle, everything it produced is already downstream.
+            for index, tasks in enumerate(workers):
+                await self._queues[index].join()
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            reporter.cancel()
+            for tasks in workers:
+                for task in tasks:
+                    task.cancel()
+            for executor in self._executors.values():
+                executor.shutdown(wait=True)
+        self.save_metrics()
+        return self.metrics()
+
+    def metrics(self):
+        elapsed = max(time.perf_counter() - (self._started or time.perf_counter()), 1e-9)
+        result = {}
+        for index, spec in enumerate(self.stages):
+            s = spec.stats
+            result[spec.name] = {
+                "executor": spec.executor,
+                "workers": spec.workers,
+                "processed": s.processed,
+                "emitted": s.emitted,
+                "dropped": s.dropped,
+                "failed": s.failed,
+                "throughput_per_min": round(s.processed / elapsed * 60, 2),
+                "utilization": round(s.busy_seconds / (elapsed * spec.workers), 3),
+                "queue_depth": self._queues[index].qsize() if self._queues else 0,
+                "queue_max": s.max_depth,
+                "queue_size": spec.queue,
+            }
+        return {"elapsed_seconds": round(elapsed, 1), "completed": self.completed, "stages": result}
+
+    def save_metrics(self):
+        os.makedirs(os.path.dirname(self.metrics_file) or ".", exist_ok=True)
+        tmp_path = self.metrics_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.metrics(), f, indent=2)
+        os.replace(tmp_path, self.metrics_file)
+
+    def print_metrics(self, compact=False):
+        metrics = self.metrics()
+        if compact:
+            parts = [f"{name} {m['processed']} ({m['throughput_per_min']}/min) q={m['queue_depth']}/{m['queue_size']}"
+                     for name, m in metrics["stages"].items()]
+            print(f"⏱️ {metrics['elapsed_seconds']:.0f}s | " + " | ".join(parts))
+            return
+        print(f"\n📊 Streamed for {metrics['elapsed_seconds']:.1f}s, {metrics['completed']} items completed:")
+        for name, m in metrics["stages"].items():
+            print(f"  {name:<7} {m['executor']:<7} x{m['workers']:<2} processed {m['processed']:>4} "
+                  f"({m['throughput_per_min']}/min), failed {m['failed']}, busy {m['utilization']:.0%}, "
+                  f"max queue {m['queue_max']}/{m['queue_size']}")
+
+
+# ---------- topic pipeline ----------
+
+def _ingest_stage(pipeline, fetch, status, limit):
+    def ingest(niche):
+        from topic_store import get_store
+        if fetch:
+            from fetch_real_trending_topics import process_niches
+            process_niches([niche], record_run=False)
+        return [pipeline.start(topic) for topic in get_store().select_topics(niche, status=status, limit=limit)]
+    return ingest
+
+
+def _pipeline_stage(runner, pipeline, stage):
+    builder = pipeline.builder(stage, prefer_async=True)
+
+    async def step(item):
+        # Staleness checks and manifest writes stay on the loop thread; only
+        # the build itself goes to the stage's executor.
+        job, item = pipeline.plan_node(stage, item)
+        if job is None:
+            return item
+        args = (item["topic"], item["path"], job[2])
+        try:
+            if asyncio.iscoroutinefunction(builder):
+                result = await builder(*args)
+            else:
+                result = await runner.offload(stage, builder, *args)
+        except Exception as e:
+            print(f"  ❌ {job[0]} failed: {e}")
+            result = None
+        return pipeline.finish_node(stage, item, job, result)
+    return step
+
+
+def build_runner(pipeline, fetch=False, status=None, limit=None, config=None):
+    config = dict(STAGE_CONFIG, **(config or {}))
+    if pipeline.script_engine == "local":
+        # Local inference is CPU-bound; keep it off the GIL.
+        config["script"] = dict(config["script"], executor="process", workers=1)
+    runner = StreamingRunner()
+    runner.add_stage("ingest", _ingest_stage(pipeline, fetch, status, limit), **config["ingest"])
+    for stage in pipeline.stages:
+        runner.add_stage(stage, _pipeline_stage(runner, pipeline, stage), **config[stage])
+    return runner
+
+
+def main(argv=None):
+    from pipeline import Pipeline, STAGES
+    from generate_scripts import niches as default_niches
+
+    parser = argparse.ArgumentParser(description="Stream topics through script/audio/video/upload concurrently.")
+    parser.add_argument("--niche", action="append", help="niche to process (repeatable)")
+    parser.add_argument("--until", choices=STAGES, default="video")
+    parser.add_argument("--fetch", action="store_true", help="harvest fresh topics for each niche first")
+    parser.add_argument("--new", action="store_true", help="only topics not yet scripted")
+    parser.add_argument("--limit", type=int, default=None, help="topics per niche")
+    parser.add_argument("--engine", choices=["textgen", "local"], default="textgen")
+    args = parser.parse_args(argv)
+
+    pipeline = Pipeline(until=args.until, script_engine=args.engine)
+    runner = build_runner(pipeline, fetch=args.fetch, status="new" if args.new else None, limit=args.limit)
+    asyncio.run(runner.run(args.niche or default_niches))
+    pipeline.manifest.save()
+    runner.print_metrics()
+    pipeline.print_summary(runner.stages[0].stats.emitted)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,119 @@
+"""
+Keyword tagger shared by rank_titles and combine_sources.
+
+Every category's keywords (categories.json) are compiled once into a single
+case-insensitive regex alternation, longest keyword first, anchored on word
+boundaries so "ai" no longer matches "said" and "game" no longer matches
+"endgame". A trailing plural "s" is allowed ("tariffs", "hackers").
+With prefix=True only the start of the word is anchored, so a keyword also
+matches longer words built on it ("cyber" -> "cybersecurity", "exploit" ->
+"exploited"); combine_sources filters Hacker News stories that way.
+
+tag_many() joins a whole batch of titles and scans it in one pass, mapping
+each match back to its title by offset.
+
+Run `python tagger.py` to benchmark it against the old per-keyword
+re.search loop.
+"""
+import re
+import sys
+import json
+import time
+import bisect
+
+CATEGORIES_FILE = "categories.json"
+
+
+def load_categories(path=CATEGORIES_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class KeywordTagger:
+    def __init__(self, categories, prefix=False):
+        self.categories = list(categories)
+        self.keyword_tags = {}     # lowercased keyword -> categories, config order
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                tags = self.keyword_tags.setdefault(keyword.lower(), [])
+                if category not in tags:
+                    tags.append(category)
+        alternation = "|".join(re.escape(k) for k in sorted(self.keyword_tags, key=len, reverse=True))
+        ending = "" if prefix else r"s?(?!\w)"
+        self.pattern = re.compile(rf"(?<!\w)({alternation}){ending}", re.IGNORECASE)
+
+    def _ordered(self, found):
+        return [category for category in self.categories if category in found]
+
+    def tag(self, title):
+        """Categories matched by `title`, in config order."""
+        found = set()
+        for match in self.pattern.finditer(title):
+            found.update(self.keyword_tags[match.group(1).lower()])
+        return self._ordered(found)
+
+    def matches(self, title):
+        return self.pattern.search(title) is not None
+
+    def tag_many(self, titles):
+        """Tag a batch of titles with a single scan; returns one tag list per title."""
+        titles = [title.replace("\n", " ") for title in titles]
+        starts, offset = [], 0
+        for title in titles:
+            starts.append(offset)
+            offset += len(title) + 1
+        found = [set() for _ in titles]
+        for match in self.pattern.finditer("\n".join(titles)):
+            idx = bisect.bisect_right(starts, match.start()) - 1
+            found[idx].update(self.keyword_tags[match.group(1).lower()])
+        return [self._ordered(tags) for tags in found]
+
+
+_default_tagger = None
+
+
+def get_tagger():
+    """Tagger for categories.json, compiled on first use."""
+    global _default_tagger
+    if _default_tagger is None:
+        _default_tagger = KeywordTagger(load_categories())
+    return _default_tagger
+
+
+def _per_keyword_tag(categories, title):
+    """The tagging loop rank_titles used before this module, kept for benchmarking."""
+    tags = set()
+    lower_title = title.lower()
+    for category, keywords in categories.items():
+        for kw in keywords:
+            if re.search(r'\b' + re.escape(kw.lower()) + r'\b', lower_title):
+                tags.add(category)
+                break
+    return list(tags)
+
+
+def benchmark(titles, repeat=3):
+    categories = load_categories()
+    started = time.perf_counter()
+    tagger = KeywordTagger(categories)
+    compile_seconds = time.perf_counter() - started
+
+    def best(fn):
+        runs = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            runs.append(time.perf_counter() - started)
+        return min(runs)
+
+    old = best(lambda: [_per_keyword_tag(categories, t) for t in titles])
+    new = best(lambda: tagger.tag_many(titles))
+    print(f"🏷️ {len(titles)} titles, {len(tagger.keyword_tags)} keywords "
+          f"(compiled in {compile_seconds * 1000:.1f} ms)")
+    print(f"   per-keyword re.search: {old:.3f}s   single pass: {new:.3f}s   ({old / new:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    with open(sys.argv[1] if len(sys.argv) > 1 else "trending_topics.json", "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    benchmark((corpus * (5000 // max(len(corpus), 1) + 1))[:5000])
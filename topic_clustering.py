@@ -1,19 +1,152 @@
-import nltk
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
+"""
+Incremental headline clustering.
+
+A TopicClusterer keeps its state on disk (cache/topic_clusters_k<k>.pkl) and
+learns from each new batch with MiniBatchKMeans.partial_fit, so new
+headlines land in the existing clusters without a refit. Titles are
+vectorised with a HashingVectorizer, which has no vocabulary to grow, and
+fed in chunks of BATCH_SIZE; only the centroids, per-cluster counts and a
+few sample titles per cluster are kept, so memory stays bounded however
+many titles stream through.
+
+With features="embedding" (or TOPIC_CLUSTER_FEATURES=embedding) titles are
+clustered on their cached sentence embeddings (embeddings.py) instead, so a
+headline is encoded once no matter how often it's re-clustered.
+
+scikit-learn is imported on first use, and nothing is downloaded.
+"""
+import os
+import pickle
+import threading
+from collections import deque
+
+# ---------- CONFIGURATION ----------
+STATE_DIR = "cache"
+FEATURES = os.getenv("TOPIC_CLUSTER_FEATURES", "hashing")    # "hashing" or "embedding"
+N_FEATURES = 2 ** 18
+BATCH_SIZE = 1000
+SAMPLES_PER_CLUSTER = 10
+# -----------------------------------
+
+
+class TopicClusterer:
+    def __init__(self, num_clusters=3, state_path=None, features=FEATURES):
+        self.num_clusters = num_clusters
+        self.features = features
+        suffix = "" if features == "hashing" else f"_{features}"
+        self.state_path = state_path or os.path.join(STATE_DIR, f"topic_clusters_k{num_clusters}{suffix}.pkl")
+        self._lock = threading.Lock()
+        self._vectorizer = None
+        self.model = None
+        self.counts = [0] * num_clusters
+        self.samples = [deque(maxlen=SAMPLES_PER_CLUSTER) for _ in range(num_clusters)]
+        self.pending = []     # titles held back until there are enough to seed k clusters
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, "rb") as f:
+                state = pickle.load(f)
+            self.model, self.counts, self.samples, self.pending = (
+                state["model"], state["counts"], state["samples"], state["pending"])
+        except (OSError, pickle.UnpicklingError, KeyError, EOFError, AttributeError, ImportError):
+            print(f"⚠️ Couldn't read {self.state_path}; starting with fresh clusters.")
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"model": self.model, "counts": self.counts,
+                         "samples": self.samples, "pending": self.pending}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _vectorize(self, titles):
+        if self.features == "embedding":
+            from embeddings import get_embedding_store
+            return get_embedding_store().embed(titles, kind="topic")
+        if self._vectorizer is None:
+            from sklearn.feature_extraction.text import HashingVectorizer
+            self._vectorizer = HashingVectorizer(n_features=N_FEATURES, stop_words="english",
+                                                 alternate_sign=False, norm="l2")
+        return self._vectorizer.transform(titles)
+
+    def _new_model(self):
+        from sklearn.cluster import MiniBatchKMeans
+        return MiniBatchKMeans(n_clusters=self.num_clusters, random_state=42,
+                               batch_size=BATCH_SIZE, n_init=3)
+
+    def update(self, titles):
+        """
+        Learn from new titles and return their cluster labels. Until k titles
+        have been seen there is nothing to fit; those get provisional labels.
+        """
+        titles = list(titles)
+        labels = []
+        with self._lock:
+            for start in range(0, len(titles), BATCH_SIZE):
+                labels.extend(self._update_batch(titles[start:start + BATCH_SIZE]))
+        return labels
+
+    def _update_batch(self, batch):
+        if self.model is None:
+            self.pending.extend(batch)
+            if len(self.pending) < self.num_clusters:
+                return [i % self.num_clusters for i in range(len(batch))]
+            self.model = self._new_model()
+            seed, self.pending = self.pending, []
+            self.model.partial_fit(self._vectorize(seed))
+            self._record(seed, self.model.predict(self._vectorize(seed)))
+            return [int(label) for label in self.model.predict(self._vectorize(batch))]
+
+        X = self._vectorize(batch)
+        self.model.partial_fit(X)
+        labels = self.model.predict(X)
+        self._record(batch, labels)
+        return [int(label) for label in labels]
+
+    def _record(self, titles, labels):
+        for title, label in zip(titles, labels):
+            self.counts[label] += 1
+            self.samples[label].append(title)
+
+    def predict(self, titles):
+        """Assign titles to existing clusters without learning from them."""
+        titles = list(titles)
+        with self._lock:
+            if self.model is None:
+                return [i % self.num_clusters for i in range(len(titles))]
+            labels = []
+            for start in range(0, len(titles), BATCH_SIZE):
+                labels.extend(int(l) for l in self.model.predict(self._vectorize(titles[start:start + BATCH_SIZE])))
+            return labels
+
+    def summary(self):
+        return [{"cluster": i, "size": self.counts[i], "samples": list(self.samples[i])}
+                for i in range(self.num_clusters)]
+
+
+_clusterers = {}
+_clusterers_lock = threading.Lock()
+
+
+def get_clusterer(num_clusters=3):
+    """The process-wide clusterer for k clusters, loaded from disk on first use."""
+    with _clusterers_lock:
+        if num_clusters not in _clusterers:
+            _clusterers[num_clusters] = TopicClusterer(num_clusters)
+        return _clusterers[num_clusters]
 
-nltk.download('punkt')
 
 def cluster_topics(topics, num_clusters=3):
-    vectorizer = TfidfVectorizer(stop_words='english')
-    X = vectorizer.fit_transform(topics)
-    model = KMeans(n_clusters=num_clusters, random_state=42)
-    model.fit(X)
-    
+    """Group topics by cluster, folding them into the persistent clusters as well."""
+    clusterer = get_clusterer(num_clusters)
+    labels = clusterer.update(topics)
+    clusterer.save()
     clustered = {}
-    for i, label in enumerate(model.labels_):
-        clustered.setdefault(label, []).append(topics[i])
-    
+    for topic, label in zip(topics, labels):
+        clustered.setdefault(label, []).append(topic)
     return clustered
 
 # Test it with sample headlines
@@ -25,7 +158,7 @@ if __name__ == "__main__":
         "Nintendo Hoards Switch 2 Consoles in US",
         "Disinformation Is Spreading Online Rapidly"
     ]
-    
+
     grouped = cluster_topics(sample_topics)
     print("\n🧠 Clustered Topics:")
     for group, items in grouped.items():
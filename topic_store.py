@@ -0,0 +1,234 @@
+"""
+SQLite-backed topic store.
+
+Replaces the one-file-per-topic trending_topics/<niche>/ trees with a single
+indexed table. Every topic row carries its niche, source, first-seen time,
+published time (when the source gave one) and a pipeline status:
+
+    new -> scripted -> rendered -> uploaded
+
+topic_key (first 12 hex chars of the title's md5, the scheme
+fetch_youtube_trending used for filenames) is the stable short name used for
+generated script/audio/video files.
+
+Usage:
+    python topic_store.py migrate [trending_topics]
+    python topic_store.py stats
+"""
+import os
+import re
+import sys
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+DB_FILE = os.getenv("TOPIC_DB", "topics.db")
+LEGACY_DIR = "trending_topics"
+STATUSES = ("new", "scripted", "rendered", "uploaded")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS topics (
+    id           INTEGER PRIMARY KEY,
+    niche        TEXT NOT NULL,
+    title        TEXT NOT NULL,
+    topic_key    TEXT NOT NULL,
+    source       TEXT NOT NULL,
+    first_seen   TEXT NOT NULL,
+    published_at TEXT,
+    status       TEXT NOT NULL DEFAULT 'new',
+    UNIQUE (niche, topic_key)
+);
+CREATE INDEX IF NOT EXISTS idx_topics_niche_status ON topics (niche, status, first_seen);
+CREATE INDEX IF NOT EXISTS idx_topics_status ON topics (status, first_seen);
+"""
+
+_PUBLISHED_RE = re.compile(r"\(Published: ([^)]*)\)\s*$")
+
+
+def niche_key(niche):
+    """Niche names are stored the way the old directories were named."""
+    return niche.strip().replace(" ", "_")
+
+
+def topic_key(title):
+    return hashlib.md5(title.encode("utf-8")).hexdigest()[:12]
+
+
+def infer_source(title):
+    """Guess the source from the markers fetch_real_trending_topics appends."""
+    if title.endswith("(Reddit)"):
+        return "reddit"
+    if title.endswith("(Tweet)"):
+        return "twitter"
+    if title.endswith("trending on Google Trends"):
+        return "google_trends"
+    match = _PUBLISHED_RE.search(title)
+    if match:
+        # YouTube gives ISO 8601 timestamps, Google News RFC 822 dates.
+        return "youtube" if "T" in match.group(1) and match.group(1).endswith("Z") else "google_news"
+    return "unknown"
+
+
+def parse_published(title):
+    match = _PUBLISHED_RE.search(title)
+    if match and match.group(1) != "unknown":
+        return match.group(1)
+    return None
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class TopicStore:
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def add_topics(self, niche, titles, source=None, first_seen=None):
+        """
+        Bulk-insert titles for a niche; existing (niche, title) pairs are left
+        alone. `source` defaults to infer_source(title). Returns rows inserted.
+        """
+        first_seen = first_seen or _now()
+        rows = [
+            (niche_key(niche), title, topic_key(title), source or infer_source(title),
+             first_seen, parse_published(title))
+            for title in (t.strip() for t in titles) if title
+        ]
+        with self._lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO topics (niche, title, topic_key, source, first_seen, published_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            return self.conn.total_changes - before
+
+    def select_topics(self, niche=None, status="new", limit=None):
+        """Topics filtered by niche and/or status (None = any), oldest first."""
+        clauses, params = [], []
+        if niche is not None:
+            clauses.append("niche = ?")
+            params.append(niche_key(niche))
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        sql = "SELECT * FROM topics"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY first_seen, id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def get_topic(self, topic_id):
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM topics WHERE id = ?", (topic_id,)).fetchone()
+        return dict(row) if row else None
+
+    def niches(self, status=None):
+        sql = "SELECT DISTINCT niche FROM topics"
+        params = ()
+        if status is not None:
+            sql += " WHERE status = ?"
+            params = (status,)
+        with self._lock:
+            return [row[0] for row in self.conn.execute(sql + " ORDER BY niche", params)]
+
+    def set_status(self, topic_ids, status, forward_only=False):
+        """
+        Set the status of one or more topics. With forward_only=True a topic
+        already further along STATUSES keeps its status (rebuilding the script
+        of an uploaded video doesn't make it "scripted" again).
+        """
+        if status not in STATUSES:
+            raise ValueError(f"Unknown topic status: {status}")
+        if isinstance(topic_ids, int):
+            topic_ids = [topic_ids]
+        sql = "UPDATE topics SET status = ? WHERE id = ?"
+        if forward_only:
+            later = STATUSES[STATUSES.index(status) + 1:]
+            if later:
+                sql += f" AND status NOT IN ({', '.join('?' * len(later))})"
+        else:
+            later = ()
+        with self._lock, self.conn:
+            self.conn.executemany(sql, [(status, topic_id, *later) for topic_id in topic_ids])
+
+    def count_by_status(self):
+        with self._lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM topics GROUP BY status").fetchall())
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM topics").fetchone()[0]
+
+    def migrate_directories(self, base_dir=LEGACY_DIR):
+        """Import every trending_topics/<niche>/*.txt file; safe to run repeatedly."""
+        if not os.path.isdir(base_dir):
+            return 0
+        inserted = 0
+        for niche in sorted(os.listdir(base_dir)):
+            niche_dir = os.path.join(base_dir, niche)
+            if not os.path.isdir(niche_dir):
+                continue
+            by_time = {}
+            for filename in os.listdir(niche_dir):
+                if not filename.endswith(".txt"):
+                    continue
+                path = os.path.join(niche_dir, filename)
+                with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                    title = f.read().strip()
+                if "Example topic for" in title or len(title) < 10:
+                    continue
+                seen = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc).isoformat(timespec="seconds")
+                by_time.setdefault(seen, []).append(title)
+            for seen, titles in by_time.items():
+                inserted += self.add_topics(niche, titles, first_seen=seen)
+        return inserted
+
+    def close(self):
+        self.conn.close()
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_store():
+    """
+    Return the process-wide store. A new, empty database is seeded from the
+    legacy trending_topics/ directories.
+    """
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = TopicStore()
+            if not len(_default_store) and os.path.isdir(LEGACY_DIR):
+                count = _default_store.migrate_directories()
+                print(f"ℹ️ Migrated {count} topics from {LEGACY_DIR}/ into {DB_FILE}")
+        return _default_store
+
+
+def main(argv):
+    command = argv[0] if argv else "stats"
+    if command == "migrate":
+        base_dir = argv[1] if len(argv) > 1 else LEGACY_DIR
+        count = TopicStore().migrate_directories(base_dir)
+        print(f"✅ Migrated {count} topics from {base_dir}/ into {DB_FILE}")
+    elif command == "stats":
+        store = get_store()
+        print(f"🗃️ {len(store)} topics in {DB_FILE}: {store.count_by_status()}")
+        print(f"   {len(store.niches())} niches")
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
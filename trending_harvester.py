@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Concurrent harvesting engine for trending topics.
+
+Fans out across niches *and* sources at once with asyncio. The source fetchers
+are ordinary blocking functions (feedparser, praw, googleapiclient, ...), so each
+call runs in a worker thread while the event loop enforces, per source:
+
+- a concurrency limit (how many calls may be in flight at once),
+- a rate limit (minimum spacing between call starts, with optional jitter),
+- a timeout (a call that takes longer is abandoned and counted as a timeout).
+
+At the end a summary shows where the time went for every source.
+"""
+import time
+import random
+import asyncio
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+# ---------- CONFIGURATION ----------
+# Per-source limits. "interval" is the minimum gap between call starts in
+# seconds; "jitter" adds a random 0..jitter seconds on top of it.
+SOURCE_LIMITS = {
+    "news":    {"concurrency": 8, "interval": 0.0, "jitter": 0.0, "timeout": 20},
+    "youtube": {"concurrency": 4, "interval": 0.1, "jitter": 0.0, "timeout": 20},
+    "reddit":  {"concurrency": 1, "interval": 1.0, "jitter": 0.0, "timeout": 30},
+    "twitter": {"concurrency": 2, "interval": 0.5, "jitter": 0.0, "timeout": 30},
+    # trends_engine batches and spaces out its own payloads; most calls are cache hits.
+    "trends":  {"concurrency": 1, "interval": 0.0, "jitter": 0.0, "timeout": 60},
+}
+DEFAULT_LIMITS = {"concurrency": 4, "interval": 0.0, "jitter": 0.0, "timeout": 30}
+# -----------------------------------
+
+
+@dataclass
+class SourceStats:
+    """Counters for one source, filled in while the harvest runs."""
+    calls: int = 0
+    ok: int = 0
+    failed: int = 0
+    timeouts: int = 0
+    topics: int = 0
+    busy_seconds: float = 0.0   # time spent inside the fetcher
+    wait_seconds: float = 0.0   # time spent queued behind limits
+
+    @property
+    def avg_latency(self):
+        return self.busy_seconds / self.calls if self.calls else 0.0
+
+
+class RateLimiter:
+    """Spaces out call starts so they are at least `interval` (+ jitter) apart."""
+
+    def __init__(self, interval=0.0, jitter=0.0):
+        self.interval = interval
+        self.jitter = jitter
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval and not self.jitter:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            if delay > 0:
+                await asyncio.sleep(delay)
+            gap = self.interval + random.uniform(0, self.jitter)
+            self._next_start = max(now, self._next_start) + gap
+
+
+class _Source:
+    """A fetcher plus the limits and counters that go with it."""
+
+    def __init__(self, name, fetch, limits):
+        self.name = name
+        self.fetch = fetch
+        self.timeout = limits["timeout"]
+        self.semaphore = asyncio.Semaphore(limits["concurrency"])
+        self.limiter = RateLimiter(limits["interval"], limits["jitter"])
+        self.stats = SourceStats()
+
+
+class TrendingHarvester:
+    """
+    Runs every source for every niche concurrently.
+
+    `sources` maps a source name to a blocking callable `fetch(niche) -> list[str]`.
+    Names found in SOURCE_LIMITS pick up those limits; `limits` overrides them.
+    """
+
+    def __init__(self, sources, limits=None):
+        merged = {name: dict(DEFAULT_LIMITS, **SOURCE_LIMITS.get(name, {})) for name in sources}
+        for name, override in (limits or {}).items():
+            if name in merged:
+                merged[name].update(override)
+        self._sources = sources
+        self._limits = merged
+        self.stats = {name: SourceStats() for name in sources}
+        self.wall_seconds = 0.0
+
+    async def _run_one(self, source, niche, loop, executor):
+        queued_at = time.monotonic()
+        async with source.semaphore:
+            await source.limiter.wait()
+            started = time.monotonic()
+            source.stats.wait_seconds += started - queued_at
+            source.stats.calls += 1
+            try:
+                topics = await asyncio.wait_for(
+                    loop.run_in_executor(executor, source.fetch, niche),
+                    timeout=source.timeout,
+                )
+                source.stats.ok += 1
+                source.stats.topics += len(topics)
+                return topics
+            except asyncio.TimeoutError:
+                source.stats.timeouts += 1
+                print(f"⏱️ {source.name} timed out for '{niche}' after {source.timeout}s")
+            except Exception as e:
+                source.stats.failed += 1
+                print(f"❌ {source.name} error for '{niche}': {e}")
+            finally:
+                source.stats.busy_seconds += time.monotonic() - started
+        return []
+
+    async def _harvest_niche(self, niche, sources, loop, executor):
+        results = await asyncio.gather(
+            *(self._run_one(source, niche, loop, executor) for source in sources)
+        )
+        topics = set()
+        for found in results:
+            topics.update(found)
+        return list(topics)
+
+    async def harvest_async(self, niches):
+        """Harvest all niches; returns {niche: [topics]} in the order given."""
+        sources = [_Source(name, fetch, self._limits[name]) for name, fetch in self._sources.items()]
+        # Abandoned (timed-out) calls keep their thread until they return, so
+        # leave headroom beyond the sum of the concurrency limits.
+        max_workers = 2 * sum(self._limits[s.name]["concurrency"] for s in sources)
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="harvest")
+        try:
+            results = await asyncio.gather(
+                *(self._harvest_niche(niche, sources, loop, executor) for niche in niches)
+            )
+        finally:
+            # Don't block on timed-out stragglers when leaving the pool.
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.wall_seconds = time.monotonic() - started
+        self.stats = {s.name: s.stats for s in sources}
+        return dict(zip(niches, results))
+
+    def harvest(self, niches):
+        """Blocking wrapper around harvest_async()."""
+        return asyncio.run(self.harvest_async(niches))
+
+    def print_summary(self):
+        """Print where the time went, per source."""
+        busy_total = sum(s.busy_seconds for s in self.stats.values())
+        print("\n⏲️ Harvest summary")
+        print(f"  {'source':<8} {'calls':>5} {'ok':>5} {'fail':>5} {'t/o':>4} "
+              f"{'topics':>6} {'busy s':>8} {'avg s':>6} {'queued s':>9}")
+        for name, s in self.stats.items():
+            print(f"  {name:<8} {s.calls:>5} {s.ok:>5} {s.failed:>5} {s.timeouts:>4} "
+                  f"{s.topics:>6} {s.busy_seconds:>8.1f} {s.avg_latency:>6.2f} {s.wait_seconds:>9.1f}")
+        speedup = busy_total / self.wall_seconds if self.wall_seconds else 0.0
+        print(f"  wall clock {self.wall_seconds:.1f}s vs {busy_total:.1f}s of sequential fetch time "
+              f"({speedup:.1f}x)")
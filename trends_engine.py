@@ -0,0 +1,145 @@
+"""
+Batched Google Trends engine.
+
+pytrends accepts up to five keywords per build_payload(), so niches are queried
+four at a time together with a shared anchor keyword over one reused TrendReq
+session. Trends scales every payload to its own peak, which makes raw numbers
+from different batches incomparable; dividing each niche's peak by the
+anchor's peak in the same payload puts every niche on one scale
+(100 = as popular as the anchor).
+
+Scores are cached on disk with a TTL, so niches fetched within the last few
+hours are not queried again.
+"""
+import os
+import json
+import time
+import random
+import threading
+
+# ---------- CONFIGURATION ----------
+ANCHOR_KEYWORD = os.getenv("TRENDS_ANCHOR", "podcast")
+BATCH_SIZE = 4                      # pytrends max is 5; one slot goes to the anchor
+TIMEFRAME = "now 7-d"
+TRENDING_SCORE = float(os.getenv("TRENDS_TRENDING_SCORE", "50"))
+CACHE_FILE = os.path.join("cache", "trends_cache.json")
+CACHE_TTL_HOURS = float(os.getenv("TRENDS_CACHE_TTL_HOURS", "6"))
+MIN_REQUEST_INTERVAL = 1.0          # seconds between payloads...
+REQUEST_JITTER = 2.0                # ...plus up to this much random delay
+# -----------------------------------
+
+
+class TrendsEngine:
+    def __init__(self, anchor=ANCHOR_KEYWORD, cache_file=CACHE_FILE, ttl_hours=CACHE_TTL_HOURS):
+        self.anchor = anchor
+        self.cache_file = cache_file
+        self.ttl_seconds = ttl_hours * 3600
+        self.cache = self._load_cache()
+        self.pending = []
+        self.requests_made = 0
+        self.cache_hits = 0
+        self._pytrend = None
+        self._last_request = 0.0
+        self._lock = threading.Lock()
+
+    def _load_cache(self):
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ Ignoring unreadable Trends cache: {e}")
+        return {}
+
+    def _save_cache(self):
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        tmp_path = self.cache_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.cache, f, indent=2)
+        os.replace(tmp_path, self.cache_file)
+
+    def _client(self):
+        if self._pytrend is None:
+            from pytrends.request import TrendReq
+            self._pytrend = TrendReq(hl="en-US", tz=360, retries=2, backoff_factor=1)
+        return self._pytrend
+
+    def _is_fresh(self, niche):
+        entry = self.cache.get(niche)
+        return entry is not None and time.time() - entry["fetched_at"] < self.ttl_seconds
+
+    def _query_batch(self, niches):
+        """Run one payload for `niches` + anchor and cache anchor-normalised scores."""
+        keywords = [n for n in niches if n != self.anchor] + [self.anchor]
+        wait = self._last_request + MIN_REQUEST_INTERVAL + random.uniform(0, REQUEST_JITTER) - time.time()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            pytrend = self._client()
+            pytrend.build_payload(keywords, timeframe=TIMEFRAME, geo="", gprop="")
+            df = pytrend.interest_over_time()
+        except Exception as e:
+            print(f"❌ Google Trends error for {niches}: {e}")
+            return
+        finally:
+            self._last_request = time.time()
+            self.requests_made += 1
+
+        anchor_peak = float(df[self.anchor].max()) if not df.empty else 0.0
+        now = time.time()
+        for niche in niches:
+            peak = float(df[niche].max()) if not df.empty and niche in df else 0.0
+            if niche == self.anchor:
+                score = 100.0 if anchor_peak else 0.0
+            elif anchor_peak:
+                score = 100.0 * peak / anchor_peak
+            else:
+                # Anchor had no signal this week; fall back to the payload scale.
+                score = peak
+            self.cache[niche] = {"score": round(score, 2), "fetched_at": now}
+
+    def warm(self, niches):
+        """Queue niches so later lookups can share payloads with them."""
+        with self._lock:
+            for niche in niches:
+                if niche not in self.pending and not self._is_fresh(niche):
+                    self.pending.append(niche)
+
+    def scores(self, niches):
+        """Return {niche: score or None}, querying stale niches in batches."""
+        with self._lock:
+            stale = [n for n in niches if not self._is_fresh(n)]
+            self.cache_hits += len(niches) - len(stale)
+            # Fill each payload with other queued niches so they ride along.
+            queue = stale + [n for n in self.pending if n not in stale]
+            queried = bool(stale)
+            while stale:
+                batch = queue[:BATCH_SIZE]
+                queue = queue[BATCH_SIZE:]
+                self._query_batch(batch)
+                self.pending = [n for n in self.pending if n not in batch]
+                stale = [n for n in stale if n not in batch]
+            if queried:
+                self._save_cache()
+            return {n: self.cache[n]["score"] if n in self.cache else None for n in niches}
+
+    def trending_topics(self, niche):
+        """Return ["<niche> trending on Google Trends"] if its score clears the bar."""
+        score = self.scores([niche])[niche]
+        if score is not None and score > TRENDING_SCORE:
+            return [f"{niche} trending on Google Trends"]
+        return []
+
+    def print_stats(self):
+        print(f"📈 Google Trends: {self.requests_made} payloads, {self.cache_hits} cached lookups")
+
+
+_default_engine = None
+
+
+def get_trends_engine():
+    """Return the process-wide engine (one TrendReq session per run)."""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = TrendsEngine()
+    return _default_engine
@@ -5,7 +5,12 @@ import subprocess
 from pathlib import Path
 from voice_engine import generate_voice
 from script_optimizer import smart_optimize_response
-import requests
+import http_client
+
+VIDEO_SCALE = "1280:720"
+VIDEO_CODEC = "libx264"
+AUDIO_CODEC = "aac"
+STATIC_BG = "assets/static_bg.png"
 
 def ensure_asset(asset_path, download_url):
     """
@@ -15,7 +20,7 @@ def ensure_asset(asset_path, download_url):
     if not os.path.exists(asset_path):
         print(f"Asset '{asset_path}' not found, attempting to download from {download_url} ...")
         try:
-            response = requests.get(download_url, timeout=10)
+            response = http_client.get(download_url, timeout=(5, 10))
             response.raise_for_status()  # Raise an error for bad status codes
             with open(asset_path, "wb") as f:
                 f.write(response.content)
@@ -52,6 +57,18 @@ def get_background_video(niche):
     # Otherwise, return None (we will fall back to a static image)
     return None
 
+def render_params(niche):
+    """Everything besides the audio that shapes a niche's render (used to fingerprint videos)."""
+    bg_video = get_background_video(niche)
+    background = bg_video if bg_video and os.path.exists(bg_video) else STATIC_BG
+    stamp = None
+    # The static fallback is a generated placeholder; only real footage is fingerprinted.
+    if background != STATIC_BG:
+        stat = os.stat(background)
+        stamp = [stat.st_size, int(stat.st_mtime)]
+    return {"background": background, "background_stamp": stamp, "scale": VIDEO_SCALE,
+            "vcodec": VIDEO_CODEC, "acodec": AUDIO_CODEC}
+
 def create_video(audio_path, bg_video, output_path):
     if bg_video and os.path.exists(bg_video):
         # Use ffmpeg to loop the background video indefinitely until the audio ends.
@@ -62,14 +79,14 @@ def create_video(audio_path, bg_video, output_path):
             "-i", bg_video,
             "-i", audio_path,
             "-shortest",
-            "-c:v", "libx264",
-            "-c:a", "aac",
-            "-vf", "scale=1280:720",
+            "-c:v", VIDEO_CODEC,
+            "-c:a", AUDIO_CODEC,
+            "-vf", f"scale={VIDEO_SCALE}",
             output_path
         ]
     else:
         # Use a fallback static image as background.
-        static_image = "assets/static_bg.png"
+        static_image = STATIC_BG
         # Ensure the static image exists (try to download or generate one automatically)
         fallback_url = "https://dummyimage.com/1280x720/000/fff.png&text=Background"
         ensure_asset(static_image, fallback_url)
@@ -80,9 +97,9 @@ def create_video(audio_path, bg_video, output_path):
             "-i", static_image,
             "-i", audio_path,
             "-shortest",
-            "-c:v", "libx264",
-            "-c:a", "aac",
-            "-vf", "scale=1280:720",
+            "-c:v", VIDEO_CODEC,
+            "-c:a", AUDIO_CODEC,
+            "-vf", f"scale={VIDEO_SCALE}",
             output_path
         ]
     subprocess.run(cmd, check=True)
@@ -1,16 +1,23 @@
 # voice_engine.py
-import edge_tts
 import asyncio
 
-async def generate_voice(text, filename="temp_audio.mp3", niche="general"):
-    voice = "en-US-AriaNeural"
+VOICE = "en-US-AriaNeural"
+RATE = "+5%"
+
+def voice_style(niche):
     # Default style is informational. Use a more energetic style for tech.
-    style = "informational"
-    if niche.lower() == "tech":
-        style = "narration-professional"
+    return "narration-professional" if niche.lower() == "tech" else "informational"
+
+def voice_params(niche="general"):
+    """Everything that shapes the narration for a niche (used to fingerprint audio)."""
+    return {"engine": "edge-tts", "voice": VOICE, "rate": RATE, "style": voice_style(niche)}
+
+async def generate_voice(text, filename="temp_audio.mp3", niche="general"):
+    import edge_tts
+    style = voice_style(niche)
     try:
         # Attempt to use style; if unsupported, fall back.
-        communicator = edge_tts.Communicate(text, voice=voice, rate="+5%", style=style)
+        communicator = edge_tts.Communicate(text, voice=VOICE, rate=RATE, style=style)
     except TypeError:
-        communicator = edge_tts.Communicate(text, voice=voice, rate="+5%")
+        communicator = edge_tts.Communicate(text, voice=VOICE, rate=RATE)
     await communicator.save(filename)
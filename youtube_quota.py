@@ -0,0 +1,330 @@
+"""
+Quota-aware YouTube Data API layer.
+
+search().list costs 100 units per call, which is what used to burn the daily
+quota. This module instead:
+
+- reads a channel's recent uploads from its uploads playlist through
+  playlistItems().list (1 unit per page of 50),
+- fetches statistics with videos().list, 50 ids per call (1 unit),
+- caches every response on disk so repeat lookups are free,
+- records units spent per quota day and refuses calls that would exceed
+  the budget (QuotaExceededError),
+- plans a run up front: estimate_cost()/plan_run() price the work and rank
+  it to fit in a given budget; searches already in the cache are free.
+"""
+import os
+import json
+import math
+import time
+import hashlib
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+# ---------- CONFIGURATION ----------
+QUOTA_COSTS = {
+    "search.list": 100,
+    "playlistItems.list": 1,
+    "videos.list": 1,
+    "channels.list": 1,
+}
+DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+# Quota resets at midnight Pacific time.
+QUOTA_TZ = ZoneInfo("America/Los_Angeles")
+CACHE_DIR = os.path.join("cache", "youtube")
+LEDGER_FILE = os.path.join("cache", "youtube_quota.json")
+CACHE_TTL = {                       # seconds
+    "search.list": 6 * 3600,
+    "playlistItems.list": 3600,
+    "videos.list": 3600,
+    "channels.list": 7 * 24 * 3600,
+}
+MAX_IDS_PER_CALL = 50
+UPLOADS_SCAN = 50                   # recent uploads considered per channel
+# -----------------------------------
+
+
+class QuotaExceededError(Exception):
+    """Raised instead of making a call that would go over the quota budget."""
+
+
+def _quota_day():
+    return datetime.now(QUOTA_TZ).strftime("%Y-%m-%d")
+
+
+class QuotaLedger:
+    """Thread-safe tally of units spent today, persisted across runs."""
+
+    def __init__(self, budget=None, path=LEDGER_FILE):
+        self.path = path
+        self.budget = DAILY_QUOTA if budget is None else budget
+        self._lock = threading.Lock()
+        self.day, self.used = self._load()
+        self.calls = {}
+        self.cache_hits = 0
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("day") == _quota_day():
+                    return data["day"], data["used"]
+            except (OSError, json.JSONDecodeError, KeyError):
+                pass
+        return _quota_day(), 0
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"day": self.day, "used": self.used}, f)
+
+    @property
+    def remaining(self):
+        return max(0, self.budget - self.used)
+
+    def charge(self, method):
+        """Reserve the units for one call of `method` or raise QuotaExceededError."""
+        cost = QUOTA_COSTS[method]
+        with self._lock:
+            if self.day != _quota_day():
+                self.day, self.used = _quota_day(), 0
+            if self.used + cost > self.budget:
+                raise QuotaExceededError(
+                    f"{method} needs {cost} units, only {self.remaining} left of {self.budget}")
+            self.used += cost
+            self.calls[method] = self.calls.get(method, 0) + 1
+            self._save()
+
+    def record_hit(self):
+        with self._lock:
+            self.cache_hits += 1
+
+    def print_stats(self):
+        calls = ", ".join(f"{m} x{n}" for m, n in self.calls.items()) or "no calls"
+        print(f"📺 YouTube quota: {self.used}/{self.budget} units used today ({calls}; "
+              f"{self.cache_hits} cached responses)")
+
+
+def cache_path(method, params, cache_dir=CACHE_DIR):
+    blob = json.dumps([method, params], sort_keys=True)
+    return os.path.join(cache_dir, hashlib.sha256(blob.encode("utf-8")).hexdigest() + ".json")
+
+
+def cached_response(method, params, cache_dir=CACHE_DIR):
+    """The cached response for this call if it is still within CACHE_TTL, else None."""
+    path = cache_path(method, params, cache_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if time.time() - cached["fetched_at"] < CACHE_TTL[method]:
+            return cached["response"]
+    except (OSError, json.JSONDecodeError, KeyError):
+        pass
+    return None
+
+
+_default_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger():
+    """Return the process-wide ledger shared by all YouTube clients."""
+    global _default_ledger
+    with _ledger_lock:
+        if _default_ledger is None:
+            _default_ledger = QuotaLedger()
+        return _default_ledger
+
+
+class YouTubeData:
+    """
+    Thin wrapper around a googleapiclient service that caches responses and
+    charges the shared ledger. The underlying service isn't thread-safe, so
+    use one wrapper per thread; the ledger and disk cache are shared.
+    """
+
+    def __init__(self, youtube, ledger=None, cache_dir=CACHE_DIR):
+        self.youtube = youtube
+        self.ledger = ledger or get_ledger()
+        self.cache_dir = cache_dir
+
+    def _execute(self, method, params):
+        path = cache_path(method, params, self.cache_dir)
+        cached = cached_response(method, params, self.cache_dir)
+        if cached is not None:
+            self.ledger.record_hit()
+            return cached
+
+        self.ledger.charge(method)
+        resource, _, call = method.partition(".")
+        response = getattr(getattr(self.youtube, resource)(), call)(**params).execute()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": time.time(), "response": response}, f)
+        os.replace(tmp_path, path)
+        return response
+
+    def search_videos(self, **params):
+        """search().list through the cache (100 units on a miss)."""
+        return self._execute("search.list", params).get("items", [])
+
+    def recent_uploads(self, channel_id, max_results=UPLOADS_SCAN):
+        """Newest-first uploads of a channel, via its uploads playlist."""
+        playlist_id = uploads_playlist_id(channel_id)
+        items, page_token = [], None
+        while len(items) < max_results:
+            params = {
+                "part": "snippet,contentDetails",
+                "playlistId": playlist_id,
+                "maxResults": min(MAX_IDS_PER_CALL, max_results - len(items)),
+            }
+            if page_token:
+                params["pageToken"] = page_token
+            response = self._execute("playlistItems.list", params)
+            items.extend(response.get("items", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        return items
+
+    def uploads_since(self, channel_id, published_after=None, known_ids=(), limit=UPLOADS_SCAN):
+        """
+        Uploads newer than `published_after` (ISO 8601), newest first. Paging
+        stops at the first upload that is at or before the mark or already
+        known, so an up-to-date channel costs a single 1-unit call.
+        """
+        playlist_id = uploads_playlist_id(channel_id)
+        known = set(known_ids)
+        items, page_token = [], None
+        while len(items) < limit:
+            params = {
+                "part": "snippet,contentDetails",
+                "playlistId": playlist_id,
+                "maxResults": min(MAX_IDS_PER_CALL, limit - len(items)),
+            }
+            if page_token:
+                params["pageToken"] = page_token
+            response = self._execute("playlistItems.list", params)
+            for item in response.get("items", []):
+                published = video_published_at(item)
+                if item["contentDetails"]["videoId"] in known or \
+                        (published_after and published <= published_after):
+                    return items
+                items.append(item)
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        return items[:limit]
+
+    def video_statistics(self, video_ids):
+        """Return {video_id: statistics}, 50 ids per videos().list call."""
+        stats = {}
+        for start in range(0, len(video_ids), MAX_IDS_PER_CALL):
+            chunk = video_ids[start:start + MAX_IDS_PER_CALL]
+            response = self._execute("videos.list", {"part": "statistics", "id": ",".join(chunk)})
+            for item in response.get("items", []):
+                stats[item["id"]] = item.get("statistics", {})
+        return stats
+
+    def channel_top_videos(self, channel_id, max_results=5, scan=UPLOADS_SCAN):
+        """
+        The most viewed of a channel's `scan` most recent uploads, shaped like
+        search().list items ({"id": {"videoId"}, "snippet", "statistics"}).
+        Costs ~2 units instead of the 100 a search would.
+        """
+        return self.top_videos(self.recent_uploads(channel_id, scan), max_results)
+
+    def top_videos(self, uploads, max_results=5):
+        """The `max_results` most viewed of some playlistItems entries, as search items."""
+        stats = self.video_statistics([item["contentDetails"]["videoId"] for item in uploads])
+        videos = as_search_items(uploads, stats)
+        videos.sort(key=lambda v: int(v["statistics"].get("viewCount", 0)), reverse=True)
+        return videos[:max_results]
+
+
+def video_published_at(item):
+    """Publish time of a playlistItems entry (falls back to when it was added)."""
+    return item.get("contentDetails", {}).get("videoPublishedAt") or item.get("snippet", {}).get("publishedAt", "")
+
+
+def as_search_items(uploads, stats=None):
+    """Reshape playlistItems entries like search().list items."""
+    stats = stats or {}
+    return [
+        {
+            "id": {"kind": "youtube#video", "videoId": item["contentDetails"]["videoId"]},
+            "snippet": dict(item.get("snippet", {}), publishedAt=video_published_at(item)),
+            "statistics": stats.get(item["contentDetails"]["videoId"], {}),
+        }
+        for item in uploads
+    ]
+
+
+def uploads_playlist_id(channel_id):
+    """A channel's uploads playlist is its id with the "UC" prefix swapped for "UU"."""
+    if channel_id.startswith("UC"):
+        return "UU" + channel_id[2:]
+    return channel_id
+
+
+# ---------- planning ----------
+
+def channel_cost(scan=UPLOADS_SCAN):
+    """Units to read one channel's recent uploads plus their statistics."""
+    pages = math.ceil(scan / MAX_IDS_PER_CALL)
+    return pages * QUOTA_COSTS["playlistItems.list"] + pages * QUOTA_COSTS["videos.list"]
+
+
+def estimate_cost(channel_count=0, niche_count=0, scan=UPLOADS_SCAN):
+    """Worst-case (cold cache) units for a run."""
+    return channel_count * channel_cost(scan) + niche_count * QUOTA_COSTS["search.list"]
+
+
+def plan_run(channels=(), niches=(), budget=None, priority=None, scan=UPLOADS_SCAN, cached=None,
+             channel_priority=None):
+    """
+    Price a run and pick the work that fits in `budget` (default: what's left
+    today). Channels are cheap and go first, in descending
+    `channel_priority(channel)` order; niche searches are then taken in
+    descending `priority(niche)` order until the budget runs out. Niches for
+    which `cached(niche)` is true cost nothing and are always planned.
+    Returns {"estimate", "budget", "channels", "skipped_channels", "niches",
+    "cached_niches", "skipped_niches", "planned_cost"}.
+    """
+    budget = get_ledger().remaining if budget is None else budget
+    cached_niches = [niche for niche in niches if cached and cached(niche)]
+    niches = [niche for niche in niches if niche not in cached_niches]
+    plan = {"estimate": estimate_cost(len(channels), len(niches), scan), "budget": budget,
+            "channels": [], "skipped_channels": [], "niches": list(cached_niches),
+            "cached_niches": cached_niches, "skipped_niches": [], "planned_cost": 0}
+    left = budget
+    ranked = sorted(channels, key=channel_priority, reverse=True) if channel_priority else list(channels)
+    for channel in ranked:
+        if left >= channel_cost(scan):
+            plan["channels"].append(channel)
+            left -= channel_cost(scan)
+        else:
+            plan["skipped_channels"].append(channel)
+    ranked = sorted(niches, key=priority, reverse=True) if priority else list(niches)
+    for niche in ranked:
+        if left >= QUOTA_COSTS["search.list"]:
+            plan["niches"].append(niche)
+            left -= QUOTA_COSTS["search.list"]
+        else:
+            plan["skipped_niches"].append(niche)
+    plan["planned_cost"] = budget - left
+    return plan
+
+
+def print_plan(plan):
+    print(f"🧮 YouTube quota plan: worst case {plan['estimate']} units, budget {plan['budget']}; "
+          f"planned {plan['planned_cost']} units for {len(plan['channels'])} channels "
+          f"({len(plan['skipped_channels'])} skipped) and "
+          f"{len(plan['niches'])} niche searches ({len(plan['cached_niches'])} cached, "
+          f"{len(plan['skipped_niches'])} niches skipped)")
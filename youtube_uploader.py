@@ -1,14 +1,13 @@
 # youtube_uploader.py
 import os
 import pickle
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 
 # Define the required YouTube scopes for uploading videos
 SCOPES = ["https://www.googleapis.com/auth/youtube.upload"]
 
 def get_authenticated_service():
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
     creds = None
     # This file must be downloaded from the Google Cloud Console.
     CLIENT_SECRETS_FILE = "client_secret.json"
@@ -38,6 +37,7 @@ def upload_video(file_path, title, description, tags, categoryId="27"):
     Returns:
         The uploaded video’s YouTube ID.
     """
+    from googleapiclient.errors import HttpError
     youtube = get_authenticated_service()
     body = {
         "snippet": {